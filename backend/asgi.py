@@ -1,9 +1,28 @@
 import os
 
 from django.core.asgi import get_asgi_application
+from django.utils.module_loading import import_string
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
 
+from django.conf import settings  # noqa: E402  (requer apps carregados)
 
+if getattr(settings, "PREAQUECER_INICIALIZACAO", False):
+    from fleet.startup import preaquecer
+
+    preaquecer()
+
+# Importadas na primeira conexão: workers que só servem a API não carregam os streams
+ROTAS_STREAM = {
+    "/api/eventos/viagens/": "fleet.eventos.stream_viagens",
+}
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] in ROTAS_STREAM:
+        stream = import_string(ROTAS_STREAM[scope["path"]])
+        await stream(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
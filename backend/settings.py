@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -30,8 +31,11 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "fleet.empresas.EmpresaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "fleet.throttling.RateLimitHeadersMiddleware",
+    "fleet.perfilador.PerfiladorMiddleware",
 ]
 
 ROOT_URLCONF = "backend.urls"
@@ -58,9 +62,18 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Banco de teste em arquivo: no SQLite em memória, conexões de threads
+        # diferentes falham com "table is locked" em vez de esperar o lock
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
+# Multiempresa: empresas grandes podem ter um banco próprio (Empresa.banco).
+# Cada banco extra entra em DATABASES com o mesmo schema
+# (python manage.py migrate --database=<alias>, depois do default).
+DATABASE_ROUTERS = ["fleet.empresas.RoteadorEmpresas"]
+EMPRESA_PADRAO = "padrao"
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -76,6 +89,19 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    "fleet.senhas.PBKDF2ConfiguravelHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# Hash de senhas em pool limitado (fleet.senhas), fora da thread da requisição
+SENHAS_PBKDF2_ITERACOES = 1_000_000
+SENHAS_MAX_WORKERS = 4
+SENHAS_FILA_MAX = 200
+
 LANGUAGE_CODE = "pt-br"
 
 TIME_ZONE = "America/Sao_Paulo"
@@ -93,14 +119,29 @@ AUTH_USER_MODEL = "fleet.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "fleet.empresas.JWTEmpresaAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_THROTTLE_CLASSES": (
+        "fleet.throttling.UsuarioBucketThrottle",
+        "fleet.throttling.IPBucketThrottle",
+        "fleet.throttling.RotaBucketThrottle",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "usuario": "600/min",
+        "ip": "1200/min",
+        "listagem": "60/min",
+        "autenticacao": "10/min",
+    },
 }
 
+# Onde ficam os buckets de throttling: "memoria" (por processo) ou "cache"
+# (CACHES do Django, compartilhado entre workers quando for Redis/memcached)
+THROTTLE_STORE = "memoria"
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Sistema de Gestão de Frotas API",
     "DESCRIPTION": "API para gestão de veículos, motoristas, manutenções, abastecimentos e viagens.",
@@ -122,3 +163,95 @@ MANAGER_REGISTRATION_CODE = "GESTOR2025"
 DRIVER_REGISTRATION_CODE = "MOTORISTA2025"
 
 
+# Detector de anomalias de abastecimento (média/variância exponencialmente ponderadas)
+ANOMALIA_EWM_ALPHA = 0.2
+ANOMALIA_LIMIAR_Z = 3.0
+ANOMALIA_MIN_AMOSTRAS = 5
+
+# Feed de alterações (/api/changes/): remoções ficam disponíveis por este período
+ALTERACOES_RETENCAO_DIAS = 30
+# O feed só entrega alterações mais antigas que isto (transações ainda em curso
+# ou relógios de servidores um pouco atrasados não fazem o cursor pular entradas)
+ALTERACOES_JANELA_MS = 2000
+
+# Stream de eventos de viagens (SSE em backend/asgi.py)
+# "memoria" entrega apenas no próprio processo; "redis" distribui entre workers.
+EVENTOS_BROKER = "memoria"
+EVENTOS_REDIS_URL = "redis://localhost:6379/0"
+EVENTOS_FILA_MAX = 100
+EVENTOS_INTERVALO_PING = 15
+
+# /api/batch/: itens por lote e quantos rodam ao mesmo tempo (sob ASGI)
+BATCH_MAX_REQUISICOES = 20
+BATCH_CONCORRENCIA = 4
+
+# Schema OpenAPI pré-calculado (python manage.py gerar_schema)
+SCHEMA_DIR = BASE_DIR / "openapi"
+SCHEMA_CACHE_MAX_AGE = 86400
+
+# Perfil de inicialização, escolhido pela variável de ambiente FLEET_PERFIL:
+# - "completo" (padrão): admin, documentação, sessões e templates
+# - "api": workers que servem apenas JSON em /api/ (inicialização mais rápida)
+PERFIL = os.environ.get("FLEET_PERFIL", "completo")
+PREAQUECER_INICIALIZACAO = PERFIL == "api"
+
+if PERFIL == "api":
+    INSTALLED_APPS = [
+        app
+        for app in INSTALLED_APPS
+        if app
+        not in {
+            "django.contrib.admin",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+            "django.contrib.staticfiles",
+            "drf_spectacular",
+        }
+    ]
+    MIDDLEWARE = [
+        "django.middleware.security.SecurityMiddleware",
+        "django.middleware.common.CommonMiddleware",
+        "fleet.empresas.EmpresaMiddleware",
+        "fleet.throttling.RateLimitHeadersMiddleware",
+    ]
+    # Sem o perfilador ligado, o módulo nem é carregado no worker
+    if os.environ.get("FLEET_PERFILADOR") == "1":
+        MIDDLEWARE.append("fleet.perfilador.PerfiladorMiddleware")
+    TEMPLATES = []
+    REST_FRAMEWORK = {
+        **{k: v for k, v in REST_FRAMEWORK.items() if k != "DEFAULT_SCHEMA_CLASS"},
+        "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+    }
+
+# Admin: acima deste número de linhas a paginação usa contagem estimada
+# (PostgreSQL, ou SQLite depois de um ANALYZE)
+ADMIN_CONTAGEM_ESTIMADA_LIMIAR = 100_000
+
+# Relatórios pivô: o cache é invalidado nas escritas; o timeout cobre atualizações em lote
+RELATORIOS_CACHE_TIMEOUT = 3600
+
+# Perfilador de requisições (/api/_debug/profiles/). Desligado por padrão; quando
+# ligado, perfila esta fração das requisições e as de administradores que
+# enviarem o cabeçalho abaixo
+PERFILADOR_ATIVO = os.environ.get("FLEET_PERFILADOR") == "1"
+PERFILADOR_AMOSTRA = 0.0
+PERFILADOR_CABECALHO = "X-Fleet-Profile"
+PERFILADOR_DIR = BASE_DIR / "perfis"
+PERFILADOR_MAX_PERFIS = 200
+
+# Log de consultas lentas com EXPLAIN (/api/_debug/consultas-lentas/ e
+# python manage.py consultas_lentas). None desliga; o buffer guarda as últimas
+# CONSULTAS_LENTAS_MAX em "memoria" (por processo) ou "cache" (CACHES do Django)
+CONSULTAS_LENTAS_LIMIAR_MS = 200
+CONSULTAS_LENTAS_MAX = 500
+CONSULTAS_LENTAS_STORE = "memoria"
+
+# Fila de tarefas em segundo plano (python manage.py executar_tarefas)
+TAREFAS_DIR = BASE_DIR / "tarefas"
+TAREFAS_WORKERS = 2
+TAREFAS_MAX_TENTATIVAS = 3
+TAREFAS_BACKOFF_SEGUNDOS = 30
+# Tarefas sem sinal de vida por mais tempo que isto voltam para a fila
+TAREFAS_TIMEOUT_SEGUNDOS = 600
+# Intervalo da thread que renova o sinal de vida da tarefa em execução
+TAREFAS_SINAL_VIDA_SEGUNDOS = 60
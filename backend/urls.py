@@ -1,11 +1,6 @@
-from django.contrib import admin
+from django.apps import apps
 from django.http import HttpResponse
 from django.urls import include, path
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
 
 def root_view(request):
     html = """
@@ -64,19 +59,32 @@ def root_view(request):
 
 urlpatterns = [
     path("", root_view, name="root"),
-    path("admin/", admin.site.urls),
     path("api/", include("fleet.urls")),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path(
-        "api/docs/swagger/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="swagger-ui",
-    ),
-    path(
-        "api/docs/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
-        name="redoc",
-    ),
 ]
 
+# Admin e documentação só existem no perfil completo (ver settings.PERFIL)
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
+
+if apps.is_installed("drf_spectacular"):
+    from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+    from fleet.schema import schema_view
+
+    urlpatterns += [
+        path("api/schema/", schema_view, name="schema"),
+        path(
+            "api/docs/swagger/",
+            SpectacularSwaggerView.as_view(url_name="schema"),
+            name="swagger-ui",
+        ),
+        path(
+            "api/docs/redoc/",
+            SpectacularRedocView.as_view(url_name="schema"),
+            name="redoc",
+        ),
+    ]
+
 
@@ -6,4 +6,9 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
 
+from django.conf import settings  # noqa: E402
 
+if getattr(settings, "PREAQUECER_INICIALIZACAO", False):
+    from fleet.startup import preaquecer
+
+    preaquecer()
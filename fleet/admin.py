@@ -1,9 +1,20 @@
+import json
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import OperationalError, connections
+from django.db.models.sql.where import AND
+from django.utils.functional import cached_property
 
 from .models import (
     Abastecimento,
+    AnomaliaAbastecimento,
+    Empresa,
+    Local,
     Manutencao,
     Motorista,
+    Tarefa,
     User,
     Veiculo,
     Viagem,
@@ -11,49 +22,183 @@ from .models import (
 )
 
 
+def _sem_filtro(query) -> bool:
+    """Sem WHERE, ou só com o filtro de empresa que o `EmpresaManager` sempre aplica.
+
+    O filtro de empresa não conta como filtro: sem essa regra toda listagem de
+    um admin de empresa faria o COUNT(*) exato. Busca e `list_filter` continuam
+    com a contagem exata, que é o que o usuário espera ao filtrar.
+    """
+    where = query.where
+    if where.negated or where.connector != AND:
+        return False
+    return all(
+        getattr(filho, "lookup_name", None) == "exact"
+        and getattr(getattr(filho.lhs, "target", None), "name", None) == "empresa"
+        for filho in where.children
+    )
+
+
+def _estimativa_postgresql(cursor, qs) -> int | None:
+    # Estimativa do planejador para a própria consulta: com o filtro de empresa
+    # usa as estatísticas da coluna, e não o total da tabela (pg_class.reltuples)
+    sql, params = qs.order_by().query.sql_with_params()
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]["Plan"]["Plan Rows"])
+
+
+def _estimativa_sqlite(cursor, qs) -> int | None:
+    """Linhas segundo o `sqlite_stat1` (preenchido pelo ANALYZE).
+
+    A primeira posição de cada estatística é o total de linhas; com o filtro de
+    empresa vale a segunda posição de um índice que começa por `empresa_id`, a
+    média de linhas por empresa (exata quando a empresa tem um banco próprio).
+    """
+    tabela = qs.model._meta.db_table
+    try:
+        if not qs.query.where:
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [tabela])
+            posicao = 0
+        else:
+            cursor.execute(
+                "SELECT s.stat FROM sqlite_stat1 s, pragma_index_info(s.idx) i "
+                "WHERE s.tbl = %s AND i.seqno = 0 AND i.name = %s LIMIT 1",
+                [tabela, qs.model._meta.get_field("empresa").column],
+            )
+            posicao = 1
+    except OperationalError:
+        # Sem ANALYZE a tabela sqlite_stat1 não existe
+        return None
+    linha = cursor.fetchone()
+    numeros = linha[0].split() if linha else []
+    return int(numeros[posicao]) if len(numeros) > posicao else None
+
+
+ESTIMATIVAS = {
+    "postgresql": _estimativa_postgresql,
+    "sqlite": _estimativa_sqlite,
+}
+
+
+class PaginadorEstimado(Paginator):
+    """Usa a estimativa do banco em listagens sem filtro (ver `_sem_filtro`).
+
+    Acima de `ADMIN_CONTAGEM_ESTIMADA_LIMIAR` linhas o COUNT(*) exato é
+    trocado pela estimativa do PostgreSQL (EXPLAIN) ou do SQLite
+    (`sqlite_stat1`, depois de um ANALYZE); com filtros, sem estatísticas ou
+    em outros bancos a contagem continua exata.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        conexao = connections[qs.db]
+        estimar = ESTIMATIVAS.get(conexao.vendor)
+        if estimar is not None and _sem_filtro(qs.query):
+            with conexao.cursor() as cursor:
+                estimativa = estimar(cursor, qs)
+            limiar = getattr(settings, "ADMIN_CONTAGEM_ESTIMADA_LIMIAR", 100_000)
+            if estimativa is not None and estimativa >= limiar:
+                return estimativa
+        return super().count
+
+
+class TabelaGrandeAdmin(admin.ModelAdmin):
+    paginator = PaginadorEstimado
+    # Evita o segundo COUNT(*) da tabela inteira exibido ao lado da busca
+    show_full_result_count = False
+
+
+@admin.register(Empresa)
+class EmpresaAdmin(admin.ModelAdmin):
+    list_display = ("nome", "slug", "banco", "ativo", "em_migracao")
+    list_filter = ("banco", "ativo")
+    search_fields = ("nome", "slug")
+    # O banco só muda pelo comando mover_empresa, que copia os dados
+    readonly_fields = ("banco", "em_migracao")
+
+
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ("username", "email", "role", "is_staff", "is_active")
-    list_filter = ("role", "is_staff", "is_active")
+    list_display = ("username", "email", "role", "empresa", "is_staff", "is_active")
+    list_filter = ("role", "empresa", "is_staff", "is_active")
     search_fields = ("username", "email")
 
 
 @admin.register(Veiculo)
-class VeiculoAdmin(admin.ModelAdmin):
+class VeiculoAdmin(TabelaGrandeAdmin):
     list_display = ("placa", "marca", "modelo", "status", "tipo_combustivel")
     list_filter = ("status", "tipo_combustivel")
     search_fields = ("placa", "marca", "modelo")
 
 
 @admin.register(Motorista)
-class MotoristaAdmin(admin.ModelAdmin):
+class MotoristaAdmin(TabelaGrandeAdmin):
     list_display = ("nome_completo", "cpf", "cnh_numero", "ativo")
     list_filter = ("ativo",)
     search_fields = ("nome_completo", "cpf", "cnh_numero")
+    autocomplete_fields = ("user",)
 
 
 @admin.register(VinculoVeiculoMotorista)
-class VinculoVeiculoMotoristaAdmin(admin.ModelAdmin):
+class VinculoVeiculoMotoristaAdmin(TabelaGrandeAdmin):
     list_display = ("veiculo", "motorista", "data_inicio", "data_fim")
-    list_filter = ("data_inicio", "data_fim")
+    list_select_related = ("veiculo", "motorista")
+    date_hierarchy = "data_inicio"
+    autocomplete_fields = ("veiculo", "motorista")
 
 
 @admin.register(Manutencao)
-class ManutencaoAdmin(admin.ModelAdmin):
+class ManutencaoAdmin(TabelaGrandeAdmin):
     list_display = ("veiculo", "data", "tipo", "status", "custo")
     list_filter = ("tipo", "status")
+    list_select_related = ("veiculo",)
     search_fields = ("veiculo__placa",)
+    date_hierarchy = "data"
+    autocomplete_fields = ("veiculo",)
 
 
 @admin.register(Abastecimento)
-class AbastecimentoAdmin(admin.ModelAdmin):
+class AbastecimentoAdmin(TabelaGrandeAdmin):
     list_display = ("veiculo", "data", "litros", "custo_total", "media_km_l")
     list_filter = ("tipo_combustivel",)
+    list_select_related = ("veiculo",)
+    search_fields = ("veiculo__placa",)
+    date_hierarchy = "data"
+    autocomplete_fields = ("veiculo",)
+
+
+@admin.register(AnomaliaAbastecimento)
+class AnomaliaAbastecimentoAdmin(TabelaGrandeAdmin):
+    list_display = ("veiculo", "tipo", "valor", "esperado", "z_score", "criado_em")
+    list_filter = ("tipo",)
+    list_select_related = ("veiculo",)
+    date_hierarchy = "criado_em"
+    autocomplete_fields = ("veiculo", "abastecimento")
 
 
 @admin.register(Viagem)
-class ViagemAdmin(admin.ModelAdmin):
+class ViagemAdmin(TabelaGrandeAdmin):
     list_display = ("veiculo", "motorista", "origem", "destino", "data_hora_inicio")
-    list_filter = ("data_hora_inicio", "motorista")
+    list_filter = ("status",)
+    list_select_related = ("veiculo", "motorista")
+    search_fields = ("veiculo__placa", "origem", "destino")
+    date_hierarchy = "data_hora_inicio"
+    autocomplete_fields = ("veiculo", "motorista", "origem_local", "destino_local")
+
+
+@admin.register(Local)
+class LocalAdmin(admin.ModelAdmin):
+    list_display = ("nome", "nome_normalizado")
+    search_fields = ("nome_normalizado",)
 
 
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "status", "progresso", "tentativas", "criado_por", "criado_em")
+    list_filter = ("status", "tipo")
+    list_select_related = ("criado_por",)
+    readonly_fields = ("worker", "iniciado_em", "sinal_vida_em", "concluido_em", "baixado_em")
@@ -0,0 +1,162 @@
+"""Feed de alterações (/api/changes/).
+
+Cada registro alterado tem uma entrada, atualizada por upsert a cada escrita
+com um `seq` novo: o relógio em microssegundos, crescente dentro do processo.
+Uma transação pode confirmar depois de outra que recebeu `seq` maior; para o
+cursor não passar por cima dela, o feed só entrega entradas mais antigas que
+`ALTERACOES_JANELA_MS` (que deve cobrir a transação mais longa e a diferença
+de relógio entre os servidores).
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from . import empresas
+from .models import (
+    Abastecimento,
+    AlteracaoRegistro,
+    Manutencao,
+    Motorista,
+    OperacaoAlteracaoChoices,
+    Veiculo,
+    Viagem,
+)
+
+MODELOS_FEED = {
+    Veiculo: "veiculo",
+    Motorista: "motorista",
+    Manutencao: "manutencao",
+    Abastecimento: "abastecimento",
+    Viagem: "viagem",
+}
+
+_SALT_CURSOR = "fleet.alteracoes.cursor"
+# Cursores com o `id` do registro como sequência (antes do `seq`) estão expirados
+VERSAO_CURSOR = 2
+
+_ultima_seq = 0
+_seq_lock = threading.Lock()
+
+
+def retencao() -> timedelta:
+    return timedelta(days=getattr(settings, "ALTERACOES_RETENCAO_DIAS", 30))
+
+
+def proxima_seq(quantidade=1) -> int:
+    """Primeiro de `quantidade` valores consecutivos de `seq`, maiores que os já emitidos."""
+    global _ultima_seq
+    with _seq_lock:
+        inicio = max(time.time_ns() // 1000, _ultima_seq + 1)
+        _ultima_seq = inicio + quantidade - 1
+    return inicio
+
+
+def seq_assentada() -> int:
+    """Maior `seq` que o feed entrega agora: entradas mais novas podem ter transações em curso."""
+    return time.time_ns() // 1000 - getattr(settings, "ALTERACOES_JANELA_MS", 2000) * 1000
+
+
+def escopo(instancia) -> dict:
+    """Veículo e motorista que dão acesso ao registro a um OPERATOR (ver `escopar_queryset`)."""
+    if isinstance(instancia, Veiculo):
+        return {"escopo_veiculo": instancia.pk}
+    if isinstance(instancia, Motorista):
+        return {"escopo_motorista": instancia.pk}
+    return {
+        "escopo_veiculo": getattr(instancia, "veiculo_id", None),
+        "escopo_motorista": getattr(instancia, "motorista_id", None),
+    }
+
+
+def registrar(
+    modelo,
+    ids,
+    operacao=OperacaoAlteracaoChoices.SALVO,
+    empresa_id=None,
+    using=None,
+    escopo=None,
+) -> None:
+    """Move os registros informados para o fim da sequência do feed.
+
+    O feed fica no banco dos registros (`using`, ex.: `instance._state.db`;
+    sem ele, o da empresa ativa). Sem `empresa_id` vale a empresa ativa; fora
+    de escopo (comandos) a empresa de cada registro é lida do banco. `escopo`
+    (ver `escopo()`) vale para todos os `ids`; as remoções precisam dele.
+    """
+    nome = MODELOS_FEED[modelo]
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return
+    using = using or empresas.banco()
+    if empresa_id is None and empresas.atual() is not None:
+        empresa_id = empresas.atual().id
+    if empresa_id is None:
+        empresa_por_id = dict(
+            modelo.todos.using(using).filter(pk__in=ids).values_list("pk", "empresa_id")
+        )
+    else:
+        empresa_por_id = {}
+    inicio = proxima_seq(len(ids))
+    # Upsert: escritas concorrentes do mesmo registro não violam a constraint única
+    AlteracaoRegistro.todos.using(using).bulk_create(
+        [
+            AlteracaoRegistro(
+                modelo=nome,
+                objeto_id=pk,
+                operacao=operacao,
+                seq=inicio + n,
+                empresa_id=empresa_id or empresa_por_id.get(pk) or empresas.empresa_padrao(),
+                **(escopo or {}),
+            )
+            for n, pk in enumerate(ids)
+        ],
+        update_conflicts=True,
+        unique_fields=["modelo", "objeto_id"],
+        update_fields=[
+            "operacao",
+            "seq",
+            "registrado_em",
+            "empresa",
+            "escopo_veiculo",
+            "escopo_motorista",
+        ],
+    )
+
+
+def gerar_cursor(seq: int, id_entrada: int = 0) -> str:
+    """Cursor assinado para a posição `(seq, id_entrada)` do feed."""
+    return signing.dumps(
+        {"v": VERSAO_CURSOR, "s": seq, "i": id_entrada, "t": int(timezone.now().timestamp())},
+        salt=_SALT_CURSOR,
+    )
+
+
+def ler_cursor(cursor: str) -> tuple[int, int, bool]:
+    """Retorna (seq, id da entrada, expirado). Lança `signing.BadSignature` se inválido.
+
+    Um cursor mais antigo que a retenção pode ter perdido remoções expurgadas,
+    então o cliente precisa refazer a sincronização completa.
+    """
+    dados = signing.loads(cursor, salt=_SALT_CURSOR)
+    emitido_em = datetime.fromtimestamp(dados["t"], tz=timezone.get_current_timezone())
+    expirado = dados.get("v") != VERSAO_CURSOR or timezone.now() - emitido_em > retencao()
+    return int(dados["s"]), int(dados.get("i", 0)), expirado
+
+
+def expurgar_remocoes() -> int:
+    """Expurga as remoções antigas do feed de cada banco de empresas."""
+    limite = timezone.now() - retencao()
+    removidos = 0
+    for banco in empresas.bancos():
+        apagados, _ = (
+            AlteracaoRegistro.todos.using(banco)
+            .filter(operacao=OperacaoAlteracaoChoices.REMOVIDO, registrado_em__lt=limite)
+            .delete()
+        )
+        removidos += apagados
+    return removidos
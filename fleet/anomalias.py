@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import (
+    AnomaliaAbastecimento,
+    EstatisticaConsumo,
+    TipoAnomaliaChoices,
+)
+
+
+def _parametros():
+    return (
+        getattr(settings, "ANOMALIA_EWM_ALPHA", 0.2),
+        getattr(settings, "ANOMALIA_LIMIAR_Z", 3.0),
+        getattr(settings, "ANOMALIA_MIN_AMOSTRAS", 5),
+    )
+
+
+def avaliar(abastecimento, est_veiculo, est_combustivel, capacidade_tanque=None):
+    """Avalia um abastecimento e atualiza as estatísticas em O(1).
+
+    Retorna as anomalias encontradas (não salvas). As estatísticas recebidas
+    são alteradas em memória; quem chama decide quando persisti-las.
+    """
+    alpha, limiar_z, min_amostras = _parametros()
+    anomalias = []
+
+    def anomalia(tipo, **campos):
+        anomalias.append(
+            AnomaliaAbastecimento(
+                empresa_id=abastecimento.empresa_id,
+                abastecimento_id=abastecimento.pk,
+                veiculo_id=abastecimento.veiculo_id,
+                tipo=tipo,
+                **campos,
+            )
+        )
+
+    if (
+        est_veiculo.ultimo_hodometro is not None
+        and abastecimento.hodometro < est_veiculo.ultimo_hodometro
+        and (est_veiculo.ultima_data is None or abastecimento.data >= est_veiculo.ultima_data)
+    ):
+        anomalia(
+            TipoAnomaliaChoices.HODOMETRO_REGRESSIVO,
+            valor=abastecimento.hodometro,
+            esperado=est_veiculo.ultimo_hodometro,
+            detalhe="Hodômetro menor que o do abastecimento anterior.",
+        )
+
+    if capacidade_tanque and abastecimento.litros > capacidade_tanque:
+        anomalia(
+            TipoAnomaliaChoices.LITROS_ACIMA_TANQUE,
+            valor=float(abastecimento.litros),
+            esperado=float(capacidade_tanque),
+            detalhe="Litros abastecidos acima da capacidade do tanque.",
+        )
+
+    if abastecimento.media_km_l is not None:
+        valor = float(abastecimento.media_km_l)
+        # Veículos com poucas amostras são comparados com a referência do combustível
+        referencia = est_veiculo if est_veiculo.amostras >= min_amostras else est_combustivel
+        z = referencia.z_score(valor) if referencia.amostras >= min_amostras else None
+        if z is not None and abs(z) > limiar_z:
+            anomalia(
+                TipoAnomaliaChoices.CONSUMO_ATIPICO,
+                valor=valor,
+                esperado=round(referencia.media, 2),
+                z_score=round(z, 2),
+                detalhe=f"Consumo fora de {limiar_z} desvios da média.",
+            )
+        est_veiculo.atualizar(valor, alpha)
+        est_combustivel.atualizar(valor, alpha)
+
+    if est_veiculo.ultimo_hodometro is None or abastecimento.hodometro > est_veiculo.ultimo_hodometro:
+        est_veiculo.ultimo_hodometro = abastecimento.hodometro
+        est_veiculo.ultima_data = abastecimento.data
+    return anomalias
+
+
+def processar_abastecimento(abastecimento):
+    """Atualiza as estatísticas com um novo abastecimento e grava as anomalias."""
+    banco = abastecimento._state.db
+    estatisticas = EstatisticaConsumo.todos.using(banco).select_for_update()
+    with transaction.atomic(using=banco):
+        est_veiculo, _ = estatisticas.get_or_create(
+            empresa_id=abastecimento.empresa_id,
+            veiculo_id=abastecimento.veiculo_id,
+            tipo_combustivel=abastecimento.tipo_combustivel,
+        )
+        est_combustivel, _ = estatisticas.get_or_create(
+            empresa_id=abastecimento.empresa_id,
+            veiculo=None,
+            tipo_combustivel=abastecimento.tipo_combustivel,
+        )
+        anomalias = avaliar(
+            abastecimento,
+            est_veiculo,
+            est_combustivel,
+            abastecimento.veiculo.capacidade_tanque_l,
+        )
+        est_veiculo.save()
+        est_combustivel.save()
+        if anomalias:
+            AnomaliaAbastecimento.todos.using(banco).bulk_create(anomalias)
+    return anomalias
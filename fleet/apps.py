@@ -5,4 +5,13 @@ class FleetConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "fleet"
 
+    def ready(self) -> None:
+        from django.apps import apps
+        from django.db.backends.signals import connection_created
 
+        from . import consultas_lentas, signals  # noqa: F401
+
+        connection_created.connect(consultas_lentas.instalar)
+        if apps.is_installed("drf_spectacular"):
+            # Registra a extensão de autenticação do schema OpenAPI
+            from . import schema  # noqa: F401
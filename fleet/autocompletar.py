@@ -0,0 +1,147 @@
+"""Índice de prefixos em memória para o autocompletar de veículos e motoristas.
+
+Cada processo guarda, por empresa, um array ordenado de chaves normalizadas
+(sem acento, minúsculas) e busca com `bisect`: placa, CPF e CNH entram só
+com letras e dígitos; marca/modelo e nome a partir do início de cada
+palavra ("silva" encontra "João da Silva"). Veículos inativos e motoristas
+desativados ficam de fora.
+
+O índice é refeito sob demanda quando a versão do grupo "autocompletar"
+(fleet.cache) muda, o que os sinais fazem a cada escrita em Veiculo ou
+Motorista; com um cache compartilhado, todos os workers percebem a troca.
+"""
+
+import threading
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from . import cache, empresas
+from .models import Motorista, StatusVeiculoChoices, Veiculo
+
+GRUPO = "autocompletar"
+VEICULO = "veiculo"
+MOTORISTA = "motorista"
+# Campos que mudam o índice; save(update_fields=...) sem eles não o invalida
+CAMPOS_INDICE = {
+    "empresa",
+    "empresa_id",
+    "placa",
+    "marca",
+    "modelo",
+    "status",
+    "nome_completo",
+    "cpf",
+    "cnh_numero",
+    "ativo",
+}
+
+
+def texto(valor: str) -> str:
+    """Minúsculas, sem acentos e com pontuação trocada por espaço."""
+    sem_acento = unicodedata.normalize("NFKD", valor or "").encode("ascii", "ignore").decode()
+    return " ".join("".join(c if c.isalnum() else " " for c in sem_acento.lower()).split())
+
+
+def compacto(valor: str) -> str:
+    """Só letras e dígitos (placa, CPF, CNH): "ABC-1D23" e "abc1d23" coincidem."""
+    return texto(valor).replace(" ", "")
+
+
+def _palavras(valor: str) -> list[str]:
+    """O texto a partir do início de cada palavra."""
+    normalizado = texto(valor)
+    palavras = normalizado.split(" ")
+    return [" ".join(palavras[i:]) for i in range(len(palavras)) if normalizado]
+
+
+@dataclass(frozen=True)
+class Indice:
+    versao: int
+    chaves: list[str]
+    # Paralela a `chaves`: (tipo, id, campo)
+    alvos: list[tuple[str, int, str]]
+    itens: dict[tuple[str, int], dict]
+
+
+def construir(versao: int) -> Indice:
+    entradas = []
+    itens = {}
+    veiculos = (
+        Veiculo.objects.exclude(status=StatusVeiculoChoices.INATIVO)
+        .order_by()
+        .values_list("pk", "placa", "marca", "modelo", "status")
+    )
+    for pk, placa, marca, modelo, status in veiculos:
+        itens[(VEICULO, pk)] = {
+            "tipo": VEICULO,
+            "id": pk,
+            "rotulo": f"{placa} — {marca} {modelo}",
+            "status": status,
+        }
+        entradas.append((compacto(placa), VEICULO, pk, "placa"))
+        entradas.extend(
+            (chave, VEICULO, pk, "marca_modelo") for chave in _palavras(f"{marca} {modelo}")
+        )
+    motoristas = (
+        Motorista.objects.filter(ativo=True)
+        .order_by()
+        .values_list("pk", "nome_completo", "cpf", "cnh_numero")
+    )
+    for pk, nome, cpf, cnh in motoristas:
+        itens[(MOTORISTA, pk)] = {"tipo": MOTORISTA, "id": pk, "rotulo": nome}
+        entradas.extend((chave, MOTORISTA, pk, "nome_completo") for chave in _palavras(nome))
+        entradas.append((compacto(cpf), MOTORISTA, pk, "cpf"))
+        entradas.append((compacto(cnh), MOTORISTA, pk, "cnh_numero"))
+    entradas = sorted(e for e in entradas if e[0])
+    return Indice(
+        versao=versao,
+        chaves=[chave for chave, *_alvo in entradas],
+        alvos=[tuple(alvo) for _chave, *alvo in entradas],
+        itens=itens,
+    )
+
+
+_indices: dict[object, Indice] = {}
+_lock = threading.Lock()
+
+
+def obter_indice() -> Indice:
+    """Índice da empresa ativa, refeito só quando a versão muda."""
+    ativa = empresas.atual()
+    empresa = ativa.id if ativa is not None else None
+    versao = cache.obter_versao(GRUPO)
+    indice = _indices.get(empresa)
+    if indice is None or indice.versao != versao:
+        with _lock:
+            indice = _indices.get(empresa)
+            if indice is None or indice.versao != versao:
+                indice = _indices[empresa] = construir(versao)
+    return indice
+
+
+def _varrer(indice: Indice, prefixo: str):
+    posicao = bisect_left(indice.chaves, prefixo)
+    while posicao < len(indice.chaves) and indice.chaves[posicao].startswith(prefixo):
+        yield indice.alvos[posicao]
+        posicao += 1
+
+
+def buscar(consulta: str, limite=10, tipo=None, visiveis=None) -> list[dict]:
+    """Os `limite` primeiros itens (na ordem das chaves) que começam com `consulta`.
+
+    `visiveis` ({tipo: ids}) restringe o resultado, ex.: ao que um motorista pode ver.
+    """
+    indice = obter_indice()
+    prefixos = {texto(consulta), compacto(consulta)} - {""}
+    resultado = {}
+    for prefixo in sorted(prefixos, key=len, reverse=True):
+        for tipo_alvo, pk, campo in _varrer(indice, prefixo):
+            if len(resultado) >= limite:
+                break
+            if (tipo and tipo_alvo != tipo) or (tipo_alvo, pk) in resultado:
+                continue
+            if visiveis is not None and pk not in visiveis[tipo_alvo]:
+                continue
+            resultado[(tipo_alvo, pk)] = {**indice.itens[(tipo_alvo, pk)], "campo": campo}
+    return list(resultado.values())
@@ -0,0 +1,35 @@
+import time
+
+from django.core.cache import cache
+
+from . import empresas
+
+
+def _chave_versao(nome: str) -> str:
+    return f"fleet:versao:{nome}"
+
+
+def _versao_inicial() -> int:
+    # Se o cache for limpo, a versão recomeça de um valor novo, e não de 1: quem
+    # guarda dados fora do cache (ex.: o índice do autocompletar) percebe a troca
+    return time.time_ns() // 1000
+
+
+def obter_versao(nome: str) -> int:
+    """Versão atual de um grupo de dados; muda sempre que o grupo é invalidado."""
+    return cache.get_or_set(_chave_versao(nome), _versao_inicial, timeout=None)
+
+
+def invalidar(nome: str) -> None:
+    try:
+        cache.incr(_chave_versao(nome))
+    except ValueError:
+        cache.set(_chave_versao(nome), _versao_inicial(), timeout=None)
+
+
+def chave_versionada(nome: str, *partes) -> str:
+    # Cada empresa tem as próprias entradas; a versão é compartilhada
+    ativa = empresas.atual()
+    empresa = ativa.id if ativa is not None else "todas"
+    sufixo = ":".join(str(p) for p in partes)
+    return f"fleet:{nome}:v{obter_versao(nome)}:e{empresa}:{sufixo}"
@@ -0,0 +1,275 @@
+"""Exportação colunar tipada (Arrow IPC, Parquet ou NumPy `.npz`).
+
+As linhas saem de `QuerySet.values_list(...).iterator()` e são gravadas em
+blocos de `lote` linhas (record batches / row groups / um `.npy` por coluna
+e bloco), então a memória usada não cresce com o tamanho da tabela.
+
+Tipos preservados: inteiros e chaves estrangeiras como int64, `Decimal`
+como decimal128 com a precisão do campo (no `.npz`, int64 escalado por
+10**casas), datas, datetimes em UTC, booleanos, floats e texto.
+
+`pyarrow` (arrow/parquet) e `numpy` (npz) são dependências opcionais.
+"""
+
+import json
+import zipfile
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import models
+
+FORMATOS = ("parquet", "arrow", "npz")
+EXTENSOES = {"parquet": "parquet", "arrow": "arrow", "npz": "npz"}
+
+# Tipos lógicos da exportação, independentes da biblioteca de destino
+INTEIRO, DECIMAL, REAL, DATA, DATA_HORA, BOOLEANO, TEXTO = (
+    "int64", "decimal", "float64", "date", "timestamp", "bool", "string"
+)
+
+
+def _tipo_logico(campo) -> str:
+    if isinstance(campo, models.ForeignKey):
+        return _tipo_logico(campo.target_field)
+    if isinstance(campo, (models.AutoField, models.BigAutoField, models.IntegerField)):
+        return INTEIRO
+    if isinstance(campo, models.DecimalField):
+        return DECIMAL
+    if isinstance(campo, models.FloatField):
+        return REAL
+    if isinstance(campo, models.DateTimeField):
+        return DATA_HORA
+    if isinstance(campo, models.DateField):
+        return DATA
+    if isinstance(campo, models.BooleanField):
+        return BOOLEANO
+    return TEXTO
+
+
+def esquema(modelo) -> list[dict]:
+    """Colunas exportadas: nome, tipo lógico, nulidade e precisão dos decimais."""
+    colunas = []
+    for campo in modelo._meta.concrete_fields:
+        if isinstance(campo, models.JSONField):
+            continue
+        coluna = {
+            "nome": campo.attname,
+            "tipo": _tipo_logico(campo),
+            "nulo": campo.null,
+        }
+        if coluna["tipo"] == DECIMAL:
+            coluna["digitos"] = campo.max_digits
+            coluna["casas"] = campo.decimal_places
+        colunas.append(coluna)
+    return colunas
+
+
+def formatos_disponiveis() -> list[str]:
+    disponiveis = []
+    try:
+        import pyarrow  # noqa: F401
+
+        disponiveis += ["parquet", "arrow"]
+    except ImportError:
+        pass
+    try:
+        import numpy  # noqa: F401
+
+        disponiveis.append("npz")
+    except ImportError:
+        pass
+    return disponiveis
+
+
+def _blocos(queryset, colunas, lote):
+    """Agrupa as linhas do iterator em listas por coluna, `lote` linhas por vez."""
+    nomes = [c["nome"] for c in colunas]
+    bloco = [[] for _ in nomes]
+    for linha in queryset.values_list(*nomes).iterator(chunk_size=lote):
+        for valores, valor in zip(bloco, linha):
+            valores.append(valor)
+        if len(bloco[0]) >= lote:
+            yield bloco
+            bloco = [[] for _ in nomes]
+    if bloco[0]:
+        yield bloco
+
+
+# Arrow / Parquet
+
+
+def _esquema_arrow(colunas):
+    import pyarrow as pa
+
+    tipos = {
+        INTEIRO: pa.int64(),
+        REAL: pa.float64(),
+        DATA: pa.date32(),
+        DATA_HORA: pa.timestamp("us", tz="UTC"),
+        BOOLEANO: pa.bool_(),
+        TEXTO: pa.string(),
+    }
+    campos = []
+    for coluna in colunas:
+        if coluna["tipo"] == DECIMAL:
+            tipo = pa.decimal128(coluna["digitos"], coluna["casas"])
+        else:
+            tipo = tipos[coluna["tipo"]]
+        campos.append(pa.field(coluna["nome"], tipo, nullable=coluna["nulo"]))
+    return pa.schema(campos, metadata={"fleet.esquema": json.dumps(colunas)})
+
+
+def _gravar_arrow(blocos, colunas, caminho, formato, progresso):
+    import pyarrow as pa
+
+    esquema_arrow = _esquema_arrow(colunas)
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+
+        escritor = pq.ParquetWriter(caminho, esquema_arrow)
+    else:
+        escritor = pa.ipc.new_file(caminho, esquema_arrow)
+    linhas = 0
+    try:
+        for bloco in blocos:
+            lote = pa.record_batch(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(bloco, esquema_arrow)],
+                schema=esquema_arrow,
+            )
+            # Cada bloco vira um record batch (Arrow) ou um row group (Parquet)
+            escritor.write_batch(lote)
+            linhas += lote.num_rows
+            progresso(linhas)
+    finally:
+        escritor.close()
+    return linhas
+
+
+# NumPy .npz
+
+
+def _arrays_numpy(valores, coluna):
+    import numpy as np
+
+    nulos = np.array([v is None for v in valores], dtype=bool)
+    tipo = coluna["tipo"]
+    if tipo == DECIMAL:
+        escala = Decimal(10) ** coluna["casas"]
+        dados = np.array([0 if v is None else int(v * escala) for v in valores], dtype=np.int64)
+    elif tipo == INTEIRO:
+        dados = np.array([0 if v is None else v for v in valores], dtype=np.int64)
+    elif tipo == REAL:
+        dados = np.array([np.nan if v is None else v for v in valores], dtype=np.float64)
+    elif tipo == BOOLEANO:
+        dados = np.array([bool(v) for v in valores], dtype=bool)
+    elif tipo == DATA:
+        dados = np.array(valores, dtype="datetime64[D]")
+    elif tipo == DATA_HORA:
+        dados = np.array(
+            [None if v is None else v.astimezone(dt_timezone.utc).replace(tzinfo=None) for v in valores],
+            dtype="datetime64[us]",
+        )
+    else:
+        dados = np.array(["" if v is None else str(v) for v in valores], dtype=np.str_)
+    return dados, nulos
+
+
+def _gravar_npz(blocos, colunas, caminho, progresso):
+    """Um `.npy` por coluna e bloco (`coluna/00000.npy`), mais o esquema.
+
+    Decimais são inteiros escalados por 10**casas; colunas anuláveis têm a
+    máscara em `coluna.nulo/00000.npy`. Use `ler_npz` para concatenar.
+    """
+    import numpy as np
+
+    linhas = 0
+    with zipfile.ZipFile(caminho, "w", compression=zipfile.ZIP_DEFLATED) as arquivo:
+
+        def gravar(nome, array):
+            with arquivo.open(f"{nome}.npy", "w", force_zip64=True) as destino:
+                np.lib.format.write_array(destino, array, allow_pickle=False)
+
+        gravar("_esquema", np.array(json.dumps(colunas)))
+        for numero, bloco in enumerate(blocos):
+            for valores, coluna in zip(bloco, colunas):
+                dados, nulos = _arrays_numpy(valores, coluna)
+                gravar(f"{coluna['nome']}/{numero:05d}", dados)
+                if coluna["nulo"]:
+                    gravar(f"{coluna['nome']}.nulo/{numero:05d}", nulos)
+            linhas += len(bloco[0])
+            progresso(linhas)
+    return linhas
+
+
+def ler_npz(caminho) -> tuple[list[dict], dict]:
+    """Lê um `.npz` gerado por `exportar`: (esquema, {coluna: array})."""
+    import numpy as np
+
+    with np.load(caminho, allow_pickle=False) as arquivo:
+        colunas = json.loads(str(arquivo["_esquema"]))
+        dados = {}
+        for coluna in colunas:
+            for sufixo in ("", ".nulo"):
+                prefixo = f"{coluna['nome']}{sufixo}/"
+                partes = sorted(nome for nome in arquivo.files if nome.startswith(prefixo))
+                if partes:
+                    dados[coluna["nome"] + sufixo] = np.concatenate([arquivo[p] for p in partes])
+    return colunas, dados
+
+
+def _valor_npz(valor, nulo, coluna):
+    if nulo:
+        return None
+    tipo = coluna["tipo"]
+    if tipo == DECIMAL:
+        return Decimal(int(valor)).scaleb(-coluna["casas"])
+    if tipo == DATA:
+        return valor.astype(object)
+    if tipo == DATA_HORA:
+        return valor.astype(object).replace(tzinfo=dt_timezone.utc)
+    return valor.item()
+
+
+def ler_linhas(caminho, formato, limite=None) -> tuple[list[dict], list[tuple]]:
+    """Relê um arquivo exportado como tuplas de valores Python (para conferência)."""
+    if formato == "npz":
+        colunas, dados = ler_npz(caminho)
+        total = len(dados[colunas[0]["nome"]]) if colunas else 0
+        total = total if limite is None else min(total, limite)
+        linhas = [
+            tuple(
+                _valor_npz(
+                    dados[c["nome"]][i],
+                    c["nulo"] and bool(dados[c["nome"] + ".nulo"][i]),
+                    c,
+                )
+                for c in colunas
+            )
+            for i in range(total)
+        ]
+        return colunas, linhas
+
+    import pyarrow as pa
+
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+
+        tabela = pq.read_table(caminho)
+    else:
+        with pa.memory_map(str(caminho)) as origem:
+            tabela = pa.ipc.open_file(origem).read_all()
+    colunas = json.loads(tabela.schema.metadata[b"fleet.esquema"])
+    if limite is not None:
+        tabela = tabela.slice(0, limite)
+    return colunas, list(zip(*(tabela.column(c["nome"]).to_pylist() for c in colunas)))
+
+
+def exportar(queryset, caminho, formato="parquet", lote=50_000, progresso=None) -> int:
+    """Grava `queryset` em `caminho` no formato pedido; retorna o número de linhas."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido. Use: {', '.join(FORMATOS)}.")
+    colunas = esquema(queryset.model)
+    blocos = _blocos(queryset, colunas, lote)
+    progresso = progresso or (lambda linhas: None)
+    if formato == "npz":
+        return _gravar_npz(blocos, colunas, caminho, progresso)
+    return _gravar_arrow(blocos, colunas, caminho, formato, progresso)
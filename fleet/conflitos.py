@@ -0,0 +1,92 @@
+"""Detecção de viagens sobrepostas para o mesmo veículo ou motorista.
+
+Na escrita, uma consulta por intervalo (apoiada nos índices
+`(veiculo, data_hora_inicio)` e `(motorista, data_hora_inicio)`) rejeita
+sobreposições. A auditoria em lote usa uma varredura (sweep line) por
+veículo e por motorista, em O(n log n + k) para k sobreposições.
+"""
+
+import heapq
+from datetime import datetime, timezone
+from itertools import groupby
+
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Viagem
+
+# Viagens em andamento não têm fim: são tratadas como abertas até o infinito
+FIM_ABERTO = datetime.max.replace(tzinfo=timezone.utc)
+
+RECURSOS = ("veiculo", "motorista")
+
+
+def filtro_sobreposicao(inicio, fim) -> Q:
+    """Viagens cujo intervalo intercepta [inicio, fim); `fim=None` é aberto."""
+    filtro = Q(data_hora_inicio__isnull=False) & (
+        Q(data_hora_fim__isnull=True) | Q(data_hora_fim__gt=inicio)
+    )
+    if fim is not None:
+        filtro &= Q(data_hora_inicio__lt=fim)
+    return filtro
+
+
+def sem_conflito_ao_iniciar(inicio) -> Q:
+    """Condição para o UPDATE de início: nenhuma outra viagem ativa no mesmo recurso."""
+    condicao = Q()
+    for recurso in RECURSOS:
+        condicao &= ~Exists(
+            Viagem.objects.filter(filtro_sobreposicao(inicio, None))
+            .filter(**{recurso: OuterRef(recurso)})
+            .exclude(pk=OuterRef("pk"))
+        )
+    return condicao
+
+
+def buscar_conflitos(veiculo_id, motorista_id, inicio, fim, excluir_pk=None) -> dict:
+    """Retorna {"veiculo": [ids], "motorista": [ids]} com as viagens conflitantes."""
+    if inicio is None:
+        return {}
+    base = Viagem.objects.filter(filtro_sobreposicao(inicio, fim))
+    if excluir_pk is not None:
+        base = base.exclude(pk=excluir_pk)
+    conflitos = {}
+    for recurso, valor in (("veiculo", veiculo_id), ("motorista", motorista_id)):
+        ids = list(base.filter(**{f"{recurso}_id": valor}).values_list("id", flat=True)[:10])
+        if ids:
+            conflitos[recurso] = ids
+    return conflitos
+
+
+def varrer_sobreposicoes(linhas):
+    """Recebe (chave, id, inicio, fim) ordenadas por (chave, inicio).
+
+    Gera (chave, id_a, id_b) para cada par de intervalos sobrepostos.
+    """
+    for chave, grupo in groupby(linhas, key=lambda linha: linha[0]):
+        ativos: list[tuple[datetime, int]] = []  # heap de (fim, id)
+        for _chave, viagem_id, inicio, fim in grupo:
+            while ativos and ativos[0][0] <= inicio:
+                heapq.heappop(ativos)
+            for _fim, outro_id in ativos:
+                yield chave, outro_id, viagem_id
+            heapq.heappush(ativos, (fim or FIM_ABERTO, viagem_id))
+
+
+def auditar(queryset=None, limite=None) -> dict:
+    queryset = Viagem.objects.all() if queryset is None else queryset
+    queryset = queryset.filter(data_hora_inicio__isnull=False)
+    relatorio = {}
+    for recurso in RECURSOS:
+        linhas = (
+            queryset.order_by(f"{recurso}_id", "data_hora_inicio")
+            .values_list(f"{recurso}_id", "id", "data_hora_inicio", "data_hora_fim")
+            .iterator(chunk_size=5000)
+        )
+        pares = []
+        total = 0
+        for chave, id_a, id_b in varrer_sobreposicoes(linhas):
+            total += 1
+            if limite is None or len(pares) < limite:
+                pares.append({recurso: chave, "viagem_a": id_a, "viagem_b": id_b})
+        relatorio[recurso] = {"total": total, "pares": pares}
+    return relatorio
@@ -0,0 +1,226 @@
+"""Log de consultas lentas com o plano de execução (EXPLAIN).
+
+Um `execute_wrapper` instalado em toda conexão nova mede cada comando SQL.
+Os que passam de `CONSULTAS_LENTAS_LIMIAR_MS` entram num buffer circular
+(`CONSULTAS_LENTAS_MAX` itens) com o SQL normalizado (literais e listas de
+parâmetros trocados por `?`), o trecho do `fleet` que o executou (view ou
+serializer, e a função mais interna), as linhas afetadas e o plano. O
+EXPLAIN roda só na primeira ocorrência de cada SQL normalizado (SELECT, em
+SQLite e PostgreSQL; sem ANALYZE, a consulta não é repetida).
+
+O buffer fica em memória no processo (`CONSULTAS_LENTAS_STORE = "memoria"`)
+ou no cache do Django (`"cache"`), para juntar os workers como no throttling.
+"""
+
+import hashlib
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CHAVE_CACHE = "fleet:consultas_lentas"
+MAX_PLANOS = 1000
+# Chamadores mais úteis de apontar; fora deles vale a função do fleet mais interna
+MODULOS_CHAMADORES = ("fleet.views", "fleet.serializers")
+MODULOS_IGNORADOS = {
+    __name__,
+    "fleet.empresas",
+    "fleet.perfilador",
+    "fleet.throttling",
+}
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|(?<![\w.\"])-?\d+(?:\.\d+)?\b")
+_PARAMETROS = re.compile(r"%s|\?")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_EXPLICAVEL = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+_local = threading.local()
+_planos: OrderedDict[str, str | None] = OrderedDict()
+_planos_lock = threading.Lock()
+
+
+def limiar_ms() -> float | None:
+    return getattr(settings, "CONSULTAS_LENTAS_LIMIAR_MS", None)
+
+
+def normalizar(sql: str) -> str:
+    sql = _LITERAIS.sub("?", sql)
+    sql = _PARAMETROS.sub("?", sql)
+    sql = _LISTAS.sub("(...)", sql)
+    return " ".join(sql.split())
+
+
+class MemoriaStore:
+    def __init__(self):
+        self._itens = deque(maxlen=getattr(settings, "CONSULTAS_LENTAS_MAX", 500))
+        self._lock = threading.Lock()
+
+    def adicionar(self, item) -> None:
+        with self._lock:
+            self._itens.append(item)
+
+    def itens(self) -> list[dict]:
+        with self._lock:
+            return list(self._itens)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+
+class CacheStore:
+    """Buffer no cache do Django; como no throttling, a escrita não é atômica."""
+
+    def adicionar(self, item) -> None:
+        itens = cache.get(CHAVE_CACHE, [])
+        itens.append(item)
+        cache.set(CHAVE_CACHE, itens[-getattr(settings, "CONSULTAS_LENTAS_MAX", 500):], None)
+
+    def itens(self) -> list[dict]:
+        return cache.get(CHAVE_CACHE, [])
+
+    def limpar(self) -> None:
+        cache.delete(CHAVE_CACHE)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def obter_store():
+    tipo = getattr(settings, "CONSULTAS_LENTAS_STORE", "memoria")
+    if tipo not in _stores:
+        with _stores_lock:
+            if tipo not in _stores:
+                _stores[tipo] = CacheStore() if tipo == "cache" else MemoriaStore()
+    return _stores[tipo]
+
+
+def listar() -> list[dict]:
+    """Consultas lentas registradas, da mais recente à mais antiga."""
+    return obter_store().itens()[::-1]
+
+
+def _quadro(frame) -> str:
+    codigo = frame.f_code
+    nome = getattr(codigo, "co_qualname", codigo.co_name)
+    return f"{frame.f_globals.get('__name__')}.{nome}:{frame.f_lineno}"
+
+
+def _chamador(frame, modulo) -> str | None:
+    if modulo in MODULOS_CHAMADORES:
+        return _quadro(frame)
+    # Métodos herdados do DRF (create, list, save...) rodam em módulos do DRF
+    # com `self` sendo a viewset ou o serializer do fleet
+    instancia = frame.f_locals.get("self") if "self" in frame.f_code.co_varnames else None
+    classe = type(instancia)
+    if classe.__module__ in MODULOS_CHAMADORES:
+        return f"{classe.__module__}.{classe.__qualname__}.{frame.f_code.co_name}"
+    return None
+
+
+def _origem() -> tuple[str | None, str | None]:
+    """(view ou serializer mais interno, função do fleet mais interna) na pilha atual."""
+    chamador = origem = None
+    frame = sys._getframe(2)
+    while frame is not None and chamador is None:
+        modulo = frame.f_globals.get("__name__", "")
+        if modulo in MODULOS_IGNORADOS:
+            frame = frame.f_back
+            continue
+        if origem is None and modulo.startswith("fleet."):
+            origem = _quadro(frame)
+        chamador = _chamador(frame, modulo)
+        frame = frame.f_back
+    return chamador, origem
+
+
+def _explicar(conexao, sql, params) -> str | None:
+    if not conexao.features.supports_explaining_query_execution:
+        return None
+    # Dentro de uma transação, um savepoint: no PostgreSQL um erro no EXPLAIN
+    # abortaria a transação da requisição
+    protecao = (
+        transaction.atomic(using=conexao.alias) if conexao.in_atomic_block else nullcontext()
+    )
+    _local.explicando = True
+    try:
+        with protecao, conexao.cursor() as cursor:
+            cursor.execute(f"{conexao.ops.explain_query_prefix()} {sql}", params)
+            linhas = cursor.fetchall()
+    except Exception as exc:
+        return f"(EXPLAIN falhou: {exc})"
+    finally:
+        _local.explicando = False
+    return "\n".join(" ".join(str(coluna) for coluna in linha) for linha in linhas)
+
+
+def _plano(conexao, sql, params, many, assinatura) -> str | None:
+    with _planos_lock:
+        if assinatura in _planos:
+            _planos.move_to_end(assinatura)
+            return _planos[assinatura]
+    plano = None
+    if not many and _EXPLICAVEL.match(sql):
+        plano = _explicar(conexao, sql, params)
+    with _planos_lock:
+        _planos[assinatura] = plano
+        if len(_planos) > MAX_PLANOS:
+            _planos.popitem(last=False)
+    return plano
+
+
+class RegistroConsultasLentas:
+    def __init__(self, conexao):
+        self.conexao = conexao
+
+    def __call__(self, execute, sql, params, many, context):
+        limiar = limiar_ms()
+        if limiar is None or getattr(_local, "explicando", False):
+            return execute(sql, params, many, context)
+        inicio = time.perf_counter()
+        resultado = execute(sql, params, many, context)
+        duracao = (time.perf_counter() - inicio) * 1000
+        if duracao >= limiar:
+            self._registrar(sql, params, many, context, duracao)
+        return resultado
+
+    def _registrar(self, sql, params, many, context, duracao) -> None:
+        normalizado = normalizar(sql)
+        assinatura = hashlib.sha1(normalizado.encode()).hexdigest()[:12]
+        chamador, origem = _origem()
+        # SELECT (e INSERT ... RETURNING) no SQLite só contam linhas depois da leitura
+        linhas = getattr(context.get("cursor"), "rowcount", -1)
+        if self.conexao.vendor == "sqlite" and " RETURNING " in sql:
+            linhas = -1
+        obter_store().adicionar(
+            {
+                "quando": datetime.now().isoformat(timespec="milliseconds"),
+                "banco": self.conexao.alias,
+                "duracao_ms": round(duracao, 3),
+                "assinatura": assinatura,
+                "sql_normalizado": normalizado,
+                "sql": sql[:2000],
+                "chamador": chamador,
+                "origem": origem,
+                "linhas": linhas if linhas is not None and linhas >= 0 else None,
+                "plano": _plano(self.conexao, sql, params, many, assinatura),
+            }
+        )
+
+
+def instalar(sender, connection, **kwargs) -> None:
+    """Receptor de `connection_created`: um wrapper por conexão (persiste entre reconexões).
+
+    Entra no início da lista: `execute_wrapper()` remove o último ao sair, e a
+    conexão pode ser aberta justamente dentro de um desses blocos.
+    """
+    if not any(isinstance(w, RegistroConsultasLentas) for w in connection.execute_wrappers):
+        connection.execute_wrappers.insert(0, RegistroConsultasLentas(connection))
@@ -0,0 +1,80 @@
+"""Média de consumo (km/L) de cada abastecimento, em aritmética Decimal.
+
+A média de um abastecimento usa a distância desde o abastecimento anterior
+do mesmo veículo, na ordem (data, hodometro, id). Ao inserir, editar ou
+remover um abastecimento só ele e o seu sucessor mudam de valor.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Q
+
+from . import alteracoes
+from .models import Abastecimento
+
+CENTESIMO = Decimal("0.01")
+# media_km_l é DecimalField(max_digits=8, decimal_places=2)
+MEDIA_MAXIMA = Decimal("999999.99")
+
+
+def calcular_media(hodometro, litros, hodometro_anterior) -> Decimal | None:
+    if hodometro_anterior is None or not litros or litros <= 0:
+        return None
+    distancia = hodometro - hodometro_anterior
+    if distancia <= 0:
+        return None
+    media = (Decimal(distancia) / Decimal(litros)).quantize(CENTESIMO, rounding=ROUND_HALF_UP)
+    return media if media <= MEDIA_MAXIMA else None
+
+
+def _antes(data, hodometro, pk) -> Q:
+    anteriores = Q(data__lt=data) | Q(data=data, hodometro__lt=hodometro)
+    if pk is None:
+        # Registro ainda sem id fica depois dos empates já gravados
+        return anteriores | Q(data=data, hodometro=hodometro)
+    return anteriores | Q(data=data, hodometro=hodometro, pk__lt=pk)
+
+
+def _depois(data, hodometro, pk) -> Q:
+    return (
+        Q(data__gt=data)
+        | Q(data=data, hodometro__gt=hodometro)
+        | Q(data=data, hodometro=hodometro, pk__gt=pk)
+    )
+
+
+def hodometro_anterior(veiculo_id, data, hodometro, pk=None):
+    return (
+        Abastecimento.objects.filter(_antes(data, hodometro, pk), veiculo_id=veiculo_id)
+        .exclude(pk=pk)
+        .order_by("-data", "-hodometro", "-pk")
+        .values_list("hodometro", flat=True)
+        .first()
+    )
+
+
+def sucessor(veiculo_id, data, hodometro, pk):
+    return (
+        Abastecimento.objects.filter(_depois(data, hodometro, pk), veiculo_id=veiculo_id)
+        .order_by("data", "hodometro", "pk")
+        .values_list("pk", flat=True)
+        .first()
+    )
+
+
+def recalcular(ids) -> int:
+    """Recalcula a média dos abastecimentos informados; retorna quantos mudaram."""
+    alterados = []
+    for linha in Abastecimento.objects.filter(pk__in=[i for i in ids if i is not None]).values(
+        "pk", "veiculo_id", "data", "hodometro", "litros", "media_km_l"
+    ):
+        anterior = hodometro_anterior(
+            linha["veiculo_id"], linha["data"], linha["hodometro"], linha["pk"]
+        )
+        media = calcular_media(linha["hodometro"], linha["litros"], anterior)
+        if media != linha["media_km_l"]:
+            Abastecimento.objects.filter(pk=linha["pk"]).update(media_km_l=media)
+            alterados.append(linha["pk"])
+    if alterados:
+        alteracoes.registrar(Abastecimento, alterados)
+    return len(alterados)
@@ -0,0 +1,176 @@
+"""Custo por km mensal de cada veículo, separado em efeito preço e efeito consumo.
+
+Só entram abastecimentos com distância válida desde o anterior (a mesma
+regra da média km/L), então em cada mês
+
+    custo/km = preço (R$/L) × consumo (L/km)
+
+e a variação entre dois meses se divide exatamente em
+
+    efeito_preco    = Δpreço   × média dos consumos
+    efeito_consumo  = Δconsumo × média dos preços
+
+O hodômetro anterior vem de uma função de janela (LAG) e as contas são
+feitas sobre colunas em memória, uma passada por veículo.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import F, Sum, Window
+from django.db.models.functions import Lag, RowNumber, TruncMonth
+
+from .models import Abastecimento, IndicePrecoCombustivel
+from .precos import TODOS_POSTOS
+
+ORDEM = [F("data").asc(), F("hodometro").asc(), F("id").asc()]
+
+
+def _anteriores_ao_periodo(abastecimentos, data_inicio) -> dict[int, int]:
+    """Último hodômetro de cada veículo antes de `data_inicio` (uma consulta)."""
+    if data_inicio is None:
+        return {}
+    ultimos = (
+        abastecimentos.filter(data__lt=data_inicio)
+        .annotate(
+            posicao=Window(
+                RowNumber(),
+                partition_by=[F("veiculo_id")],
+                order_by=[F("data").desc(), F("hodometro").desc(), F("id").desc()],
+            )
+        )
+        .filter(posicao=1)
+        .values_list("veiculo_id", "hodometro")
+    )
+    return dict(ultimos)
+
+
+def _colunas(abastecimentos, data_inicio, data_fim):
+    """Colunas (veículo, mês, combustível, litros, custo, distância) em ordem."""
+    periodo = abastecimentos
+    if data_inicio:
+        periodo = periodo.filter(data__gte=data_inicio)
+    if data_fim:
+        periodo = periodo.filter(data__lte=data_fim)
+    linhas = (
+        periodo.annotate(
+            anterior=Window(Lag("hodometro"), partition_by=[F("veiculo_id")], order_by=ORDEM)
+        )
+        .order_by("veiculo_id", "data", "hodometro", "id")
+        .values_list(
+            "veiculo_id", "veiculo__placa", "data", "tipo_combustivel",
+            "litros", "custo_total", "hodometro", "anterior",
+        )
+    )
+    anteriores = _anteriores_ao_periodo(abastecimentos, data_inicio)
+    colunas = defaultdict(list)
+    veiculo_atual = None
+    for veiculo_id, placa, data, tipo, litros, custo, hodometro, anterior in linhas:
+        if veiculo_id != veiculo_atual:
+            # A janela começa no período; o primeiro da série usa o anterior a ele
+            veiculo_atual = veiculo_id
+            anterior = anteriores.get(veiculo_id)
+        distancia = hodometro - anterior if anterior is not None else 0
+        if distancia <= 0 or not litros or litros <= 0:
+            continue
+        colunas["veiculo"].append(veiculo_id)
+        colunas["placa"].append(placa)
+        colunas["mes"].append(data.strftime("%Y-%m"))
+        colunas["tipo"].append(tipo)
+        colunas["litros"].append(float(litros))
+        colunas["custo"].append(float(custo))
+        colunas["km"].append(distancia)
+    return colunas
+
+
+def indice_mensal(data_inicio=None, data_fim=None, posto=TODOS_POSTOS) -> dict[tuple, float]:
+    """Preço médio por litro de cada (mês, combustível), somando as linhas diárias do índice."""
+    indice = IndicePrecoCombustivel.objects.filter(posto=posto, litros__gt=0)
+    if data_inicio:
+        indice = indice.filter(data__gte=data_inicio)
+    if data_fim:
+        indice = indice.filter(data__lte=data_fim)
+    meses = (
+        indice.annotate(mes=TruncMonth("data"))
+        .values("mes", "tipo_combustivel")
+        .annotate(litros_total=Sum("litros"), custo=Sum("custo_total"))
+        .order_by("mes", "tipo_combustivel")
+    )
+    return {
+        (linha["mes"].strftime("%Y-%m"), linha["tipo_combustivel"]): float(
+            Decimal(linha["custo"]) / Decimal(linha["litros_total"])
+        )
+        for linha in meses
+    }
+
+
+def _arredondar(valor, casas=4):
+    return None if valor is None else round(valor, casas)
+
+
+def custo_por_km(data_inicio=None, data_fim=None, veiculo_id=None, posto=TODOS_POSTOS) -> dict:
+    abastecimentos = Abastecimento.objects.all()
+    if veiculo_id is not None:
+        abastecimentos = abastecimentos.filter(veiculo_id=veiculo_id)
+    colunas = _colunas(abastecimentos, data_inicio, data_fim)
+    indice = indice_mensal(data_inicio, data_fim, posto)
+
+    # Somas por (veículo, mês); litros por combustível para o preço de referência
+    somas: dict[tuple, list] = {}
+    litros_por_tipo: dict[tuple, dict] = defaultdict(lambda: defaultdict(float))
+    placas = {}
+    for veiculo, placa, mes, tipo, litros, custo, km in zip(
+        colunas["veiculo"], colunas["placa"], colunas["mes"], colunas["tipo"],
+        colunas["litros"], colunas["custo"], colunas["km"],
+    ):
+        placas[veiculo] = placa
+        soma = somas.setdefault((veiculo, mes), [0.0, 0.0, 0])
+        soma[0] += litros
+        soma[1] += custo
+        soma[2] += km
+        litros_por_tipo[(veiculo, mes)][tipo] += litros
+
+    veiculos = []
+    anterior = None
+    for (veiculo, mes), (litros, custo, km) in sorted(somas.items()):
+        if anterior is None or anterior[0] != veiculo:
+            veiculos.append({"veiculo_id": veiculo, "placa": placas[veiculo], "meses": []})
+            anterior = None
+        preco = custo / litros
+        consumo = litros / km
+        por_tipo = litros_por_tipo[(veiculo, mes)]
+        # Preço do índice ponderado pelos litros de cada combustível do veículo no mês
+        referencias = [(indice.get((mes, tipo)), qtd) for tipo, qtd in por_tipo.items()]
+        preco_indice = (
+            sum(p * qtd for p, qtd in referencias) / sum(qtd for _p, qtd in referencias)
+            if all(p is not None for p, _qtd in referencias)
+            else None
+        )
+        linha = {
+            "mes": mes,
+            "km": km,
+            "litros": round(litros, 2),
+            "custo": round(custo, 2),
+            "preco_litro": _arredondar(preco),
+            "preco_indice": _arredondar(preco_indice),
+            "litros_km": _arredondar(consumo, 6),
+            "custo_km": _arredondar(custo / km),
+            "variacao_custo_km": None,
+            "efeito_preco": None,
+            "efeito_consumo": None,
+        }
+        if anterior is not None:
+            _veiculo, preco_ant, consumo_ant = anterior
+            linha["variacao_custo_km"] = _arredondar(preco * consumo - preco_ant * consumo_ant)
+            linha["efeito_preco"] = _arredondar((preco - preco_ant) * (consumo + consumo_ant) / 2)
+            linha["efeito_consumo"] = _arredondar((consumo - consumo_ant) * (preco + preco_ant) / 2)
+        veiculos[-1]["meses"].append(linha)
+        anterior = (veiculo, preco, consumo)
+
+    return {
+        "indice_precos": [
+            {"mes": mes, "tipo_combustivel": tipo, "preco_litro": _arredondar(preco)}
+            for (mes, tipo), preco in sorted(indice.items())
+        ],
+        "veiculos": veiculos,
+    }
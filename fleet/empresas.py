@@ -0,0 +1,217 @@
+"""Multiempresa: escopo automático por empresa e roteamento entre bancos.
+
+Cada registro da frota pertence a uma `Empresa`. A empresa do usuário
+autenticado fica em um `ContextVar` durante a requisição; o manager padrão
+dos modelos da frota filtra por ela e o roteador envia as consultas para o
+banco da empresa (`Empresa.banco`), de modo que empresas grandes podem ter
+um banco próprio. Fora de uma requisição (comandos, shell) nada é filtrado
+e o banco é o `default`, a menos que se use `usar(empresa)`.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import models
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+@dataclass(frozen=True)
+class EmpresaAtiva:
+    id: int
+    banco: str
+
+
+_atual: ContextVar[EmpresaAtiva | None] = ContextVar("fleet_empresa", default=None)
+
+
+def atual() -> EmpresaAtiva | None:
+    return _atual.get()
+
+
+def ativar(empresa):
+    """Define a empresa da execução atual; retorna o token para `desativar`."""
+    valor = EmpresaAtiva(empresa.pk, empresa.banco) if empresa is not None else None
+    return _atual.set(valor)
+
+
+def banco() -> str:
+    """Alias do banco da empresa ativa (para `transaction.atomic(using=...)`)."""
+    ativa = atual()
+    return ativa.banco if ativa is not None else "default"
+
+
+def bancos() -> list[str]:
+    """Todos os bancos que podem guardar dados de empresas (manutenção, expurgos)."""
+    return list(settings.DATABASES)
+
+
+def desativar(token=None) -> None:
+    if token is None:
+        _atual.set(None)
+    else:
+        _atual.reset(token)
+
+
+@contextmanager
+def usar(empresa):
+    token = ativar(empresa)
+    try:
+        yield
+    finally:
+        desativar(token)
+
+
+_padrao_id = None
+
+
+def empresa_padrao() -> int:
+    """Id da empresa padrão (criada na migração), usada fora de qualquer escopo."""
+    global _padrao_id
+    if _padrao_id is None:
+        from .models import Empresa
+
+        _padrao_id = (
+            Empresa.objects.filter(slug=getattr(settings, "EMPRESA_PADRAO", "padrao"))
+            .values_list("pk", flat=True)
+            .get()
+        )
+    return _padrao_id
+
+
+def empresa_atual_ou_padrao() -> int:
+    """Default do campo `empresa`: novos registros herdam a empresa ativa."""
+    ativa = atual()
+    return ativa.id if ativa is not None else empresa_padrao()
+
+
+class EmpresaManager(models.Manager):
+    def get_queryset(self):
+        qs = super().get_queryset()
+        ativa = atual()
+        return qs if ativa is None else qs.filter(empresa_id=ativa.id)
+
+
+def escopar(qs):
+    """Aplica o filtro da empresa ativa a um queryset montado fora da requisição.
+
+    O manager só filtra quando o queryset é criado; `queryset = X.objects.all()`
+    no corpo de uma classe é avaliado na importação, sem empresa ativa.
+    """
+    from .models import ModeloEmpresa
+
+    ativa = atual()
+    if ativa is None or not issubclass(qs.model, ModeloEmpresa):
+        return qs
+    return qs.filter(empresa_id=ativa.id)
+
+
+def _modelo_da_empresa(model) -> bool:
+    from .models import Local, ModeloEmpresa
+
+    return issubclass(model, ModeloEmpresa) or model is Local
+
+
+class RoteadorEmpresas:
+    """Modelos da frota (e o dicionário de locais) vão para o banco da empresa ativa.
+
+    Usuários, empresas e tarefas ficam sempre no `default`. O feed de
+    alterações também é da empresa: cada banco tem a sua sequência, que o
+    `mover_empresa` preserva ao copiar as entradas. Todos os bancos recebem o
+    schema completo.
+    """
+
+    def _banco(self, model, **hints):
+        if not _modelo_da_empresa(model):
+            return None
+        instancia = hints.get("instance")
+        # A instância só decide o banco se também for da empresa (não o User do `user.motorista`)
+        if instancia is not None and _modelo_da_empresa(type(instancia)) and instancia._state.db:
+            return instancia._state.db
+        ativa = atual()
+        return ativa.banco if ativa is not None else None
+
+    db_for_read = _banco
+    db_for_write = _banco
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # empresa e user são FKs sem constraint (db_constraint=False) entre bancos
+        return True
+
+
+class EmpresaIndisponivel(exceptions.APIException):
+    status_code = 503
+    default_detail = "Os dados da empresa estão sendo migrados. Tente novamente em instantes."
+    default_code = "empresa_indisponivel"
+
+
+def verificar_disponivel(empresa) -> None:
+    """Recusa o acesso aos dados de uma empresa que está sendo migrada."""
+    if empresa is not None and empresa.em_migracao:
+        raise EmpresaIndisponivel()
+
+
+def _ativar_usuario(user) -> None:
+    empresa = getattr(user, "empresa", None)
+    verificar_disponivel(empresa)
+    ativar(empresa)
+
+
+class JWTEmpresaAuthentication(JWTAuthentication):
+    """Autenticação JWT que também ativa a empresa do usuário."""
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        _ativar_usuario(user)
+        return user
+
+
+def _resposta_indisponivel(exc):
+    from django.http import JsonResponse
+
+    return JsonResponse({"detail": str(exc.detail)}, status=exc.status_code)
+
+
+class EmpresaMiddleware:
+    """Ativa a empresa de usuários de sessão (admin) e limpa o escopo ao final.
+
+    Síncrono e assíncrono: sob ASGI não força views async para uma thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        try:
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                _ativar_usuario(user)
+            return self.get_response(request)
+        except EmpresaIndisponivel as exc:
+            return _resposta_indisponivel(exc)
+        finally:
+            desativar()
+
+    async def __acall__(self, request):
+        try:
+            # O usuário de sessão já vem com a empresa (UsuarioManager.select_related)
+            auser = getattr(request, "auser", None)
+            user = await auser() if auser is not None else None
+            if user is not None and user.is_authenticated:
+                _ativar_usuario(user)
+            return await self.get_response(request)
+        except EmpresaIndisponivel as exc:
+            return _resposta_indisponivel(exc)
+        finally:
+            desativar()
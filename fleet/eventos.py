@@ -0,0 +1,276 @@
+"""Publicação de mudanças de viagens via server-sent events (SSE).
+
+As mudanças são publicadas em um barramento em memória. Com vários workers,
+o barramento repassa cada mensagem por um broker (`EVENTOS_BROKER`): o broker
+"memoria" entrega no próprio processo e serve de substituto local; o broker
+"redis" (opcional, requer o pacote `redis`) distribui entre processos.
+"""
+
+import asyncio
+import json
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+CANAL_VIAGENS = "fleet:viagens"
+
+
+class Assinatura:
+    def __init__(
+        self, loop, veiculos=None, motoristas=None, status=None, tamanho_fila=100, empresa=None
+    ):
+        self.loop = loop
+        self.empresa = empresa
+        self.veiculos = veiculos
+        self.motoristas = motoristas
+        self.status = status
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_fila)
+        self.encerrada = False
+
+    def aceita(self, evento: dict) -> bool:
+        return (
+            (self.empresa is None or evento.get("empresa") == self.empresa)
+            and (not self.veiculos or evento["veiculo"] in self.veiculos)
+            and (not self.motoristas or evento["motorista"] in self.motoristas)
+            and (not self.status or evento["status"] in self.status)
+        )
+
+    def entregar(self, evento: dict) -> None:
+        # Executado no loop do assinante
+        if self.encerrada:
+            return
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Cliente lento: encerra o stream em vez de acumular memória
+            self.encerrada = True
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            self.fila.put_nowait(None)
+
+
+class BrokerMemoria:
+    def __init__(self):
+        self._callbacks = []
+
+    def assinar(self, callback) -> None:
+        self._callbacks.append(callback)
+
+    def publicar(self, canal: str, mensagem: str) -> None:
+        for callback in self._callbacks:
+            callback(canal, mensagem)
+
+
+class BrokerRedis:
+    def __init__(self, url: str):
+        import redis  # dependência opcional
+
+        self._cliente = redis.Redis.from_url(url)
+        self._callbacks = []
+        self._thread = None
+
+    def assinar(self, callback) -> None:
+        self._callbacks.append(callback)
+        if self._thread is None:
+            pubsub = self._cliente.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CANAL_VIAGENS)
+            self._thread = threading.Thread(target=self._escutar, args=(pubsub,), daemon=True)
+            self._thread.start()
+
+    def _escutar(self, pubsub) -> None:
+        for mensagem in pubsub.listen():
+            canal = mensagem["channel"].decode()
+            dados = mensagem["data"].decode()
+            for callback in self._callbacks:
+                callback(canal, dados)
+
+    def publicar(self, canal: str, mensagem: str) -> None:
+        self._cliente.publish(canal, mensagem)
+
+
+class Barramento:
+    def __init__(self, broker):
+        self._assinaturas: set[Assinatura] = set()
+        self._lock = threading.Lock()
+        self._broker = broker
+        broker.assinar(self._receber)
+
+    def __len__(self) -> int:
+        return len(self._assinaturas)
+
+    def assinar(self, assinatura: Assinatura) -> Assinatura:
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura) -> None:
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publicar(self, evento: dict) -> None:
+        self._broker.publicar(CANAL_VIAGENS, json.dumps(evento, default=str))
+
+    def _receber(self, canal: str, mensagem: str) -> None:
+        evento = json.loads(mensagem)
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            if assinatura.aceita(evento):
+                assinatura.loop.call_soon_threadsafe(assinatura.entregar, evento)
+
+
+_barramento = None
+_barramento_lock = threading.Lock()
+
+
+def obter_barramento() -> Barramento:
+    global _barramento
+    if _barramento is None:
+        with _barramento_lock:
+            if _barramento is None:
+                if getattr(settings, "EVENTOS_BROKER", "memoria") == "redis":
+                    broker = BrokerRedis(settings.EVENTOS_REDIS_URL)
+                else:
+                    broker = BrokerMemoria()
+                _barramento = Barramento(broker)
+    return _barramento
+
+
+def evento_viagem(viagem) -> dict:
+    return {
+        "viagem": viagem.pk,
+        "empresa": viagem.empresa_id,
+        "veiculo": viagem.veiculo_id,
+        "motorista": viagem.motorista_id,
+        "status": viagem.status,
+        "hodometro_saida": viagem.hodometro_saida,
+        "hodometro_chegada": viagem.hodometro_chegada,
+        "data_hora_inicio": viagem.data_hora_inicio,
+        "data_hora_fim": viagem.data_hora_fim,
+    }
+
+
+def _ids(valor: list[str]) -> set[int] | None:
+    ids = {int(v) for item in valor for v in item.split(",") if v.strip().isdigit()}
+    return ids or None
+
+
+@sync_to_async
+def _autenticar(token: str | None):
+    """(usuário, motoristas permitidos); (None, None) se o token não vale.
+
+    Como a `JWTEmpresaAuthentication`, recusa empresas em migração
+    (`EmpresaIndisponivel`).
+    """
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import TokenError
+
+    from . import empresas
+    from .models import UserRole
+
+    if not token:
+        return None, None
+    autenticacao = JWTAuthentication()
+    try:
+        user = autenticacao.get_user(autenticacao.get_validated_token(token))
+    except (AuthenticationFailed, TokenError):
+        # Inclui InvalidToken e usuário removido ou inativo
+        return None, None
+    empresas.verificar_disponivel(user.empresa)
+    if user.role in {UserRole.ADMIN, UserRole.MANAGER}:
+        return user, None
+    # Motorista só acompanha as próprias viagens
+    with empresas.usar(user.empresa):
+        motorista_id = getattr(getattr(user, "motorista", None), "pk", None)
+    return user, {motorista_id or 0}
+
+
+async def _responder_erro(send, codigo: int, detalhe: str) -> None:
+    corpo = json.dumps({"detail": detalhe}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": codigo,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": corpo})
+
+
+async def stream_viagens(scope, receive, send) -> None:
+    """App ASGI do stream `GET /api/eventos/viagens/?token=<jwt>`.
+
+    Filtros opcionais: `veiculo`, `motorista` e `status` (listas separadas por vírgula).
+    """
+    from .empresas import EmpresaIndisponivel
+
+    params = parse_qs(scope.get("query_string", b"").decode())
+    try:
+        user, motoristas_permitidos = await _autenticar((params.get("token") or [None])[0])
+    except EmpresaIndisponivel as exc:
+        await _responder_erro(send, exc.status_code, str(exc.detail))
+        return
+    if user is None:
+        await _responder_erro(send, 401, "Token ausente ou inválido.")
+        return
+
+    motoristas = _ids(params.get("motorista", []))
+    if motoristas_permitidos is not None:
+        motoristas = motoristas_permitidos
+    status = {s for item in params.get("status", []) for s in item.split(",") if s} or None
+
+    barramento = obter_barramento()
+    assinatura = barramento.assinar(
+        Assinatura(
+            asyncio.get_running_loop(),
+            veiculos=_ids(params.get("veiculo", [])),
+            motoristas=motoristas,
+            status=status,
+            tamanho_fila=getattr(settings, "EVENTOS_FILA_MAX", 100),
+            empresa=user.empresa_id,
+        )
+    )
+    desconectado = asyncio.Event()
+
+    async def escutar_desconexao():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        desconectado.set()
+        if not assinatura.fila.full():
+            assinatura.fila.put_nowait(None)
+
+    tarefa = asyncio.create_task(escutar_desconexao())
+    intervalo_ping = getattr(settings, "EVENTOS_INTERVALO_PING", 15)
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        while not desconectado.is_set():
+            try:
+                evento = await asyncio.wait_for(assinatura.fila.get(), timeout=intervalo_ping)
+            except asyncio.TimeoutError:
+                await send({"type": "http.response.body", "body": b": ping\n\n", "more_body": True})
+                continue
+            if evento is None:
+                if assinatura.encerrada:
+                    corpo = b"event: overflow\ndata: {}\n\n"
+                    await send({"type": "http.response.body", "body": corpo, "more_body": True})
+                break
+            corpo = f"event: viagem\ndata: {json.dumps(evento)}\n\n".encode()
+            await send({"type": "http.response.body", "body": corpo, "more_body": True})
+    finally:
+        barramento.cancelar(assinatura)
+        tarefa.cancel()
+    if not desconectado.is_set():
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,129 @@
+"""Execução de várias requisições GET da API em uma só (/api/batch/).
+
+A autenticação acontece uma vez na requisição do lote; cada item vira uma
+`HttpRequest` interna com o usuário já autenticado (o DRF usa
+`ForcedAuthentication`) e é despachada direto para a view resolvida, sem
+passar de novo pelos middlewares. Sob ASGI os itens rodam em paralelo em
+threads do executor, até `BATCH_CONCORRENCIA` por lote; sob WSGI rodam em
+sequência na thread da requisição.
+"""
+
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+from . import empresas
+
+PREFIXO = "/api/"
+# Cabeçalhos da requisição original repassados aos itens (o corpo não é)
+META_IGNORADOS = {"CONTENT_LENGTH", "CONTENT_TYPE", "HTTP_AUTHORIZATION", "wsgi.input"}
+
+
+class ItemInvalido(Exception):
+    def __init__(self, detalhe, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(detalhe)
+        self.detalhe = detalhe
+        self.status_code = status_code
+
+
+def max_requisicoes() -> int:
+    return getattr(settings, "BATCH_MAX_REQUISICOES", 20)
+
+
+def _validar(item) -> tuple[str, str]:
+    if not isinstance(item, dict) or not isinstance(item.get("url"), str):
+        raise ItemInvalido("Cada requisição precisa de um campo 'url'.")
+    metodo = str(item.get("method", "GET")).upper()
+    if metodo != "GET":
+        raise ItemInvalido(
+            "Apenas requisições GET são aceitas em lote.", status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+    url = urlsplit(item["url"])
+    if url.scheme or url.netloc or not url.path.startswith(PREFIXO):
+        raise ItemInvalido(f"A url deve ser um caminho da API ({PREFIXO}...).")
+    return url.path, url.query
+
+
+def _sub_requisicao(request, caminho, query, user) -> HttpRequest:
+    sub = HttpRequest()
+    sub.method = "GET"
+    sub.path = sub.path_info = caminho
+    sub.META = {
+        **{k: v for k, v in request.META.items() if k not in META_IGNORADOS},
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": caminho,
+        "QUERY_STRING": query,
+        "HTTP_ACCEPT": "application/json",
+    }
+    sub.GET = QueryDict(query)
+    sub.user = user
+    sub._force_auth_user = user
+    sub._dont_enforce_csrf_checks = True
+    return sub
+
+
+def _corpo(resposta):
+    if resposta.streaming:
+        return None
+    if hasattr(resposta, "render"):
+        resposta.render()
+    if not resposta.content:
+        return None
+    if resposta.get("Content-Type", "").startswith("application/json"):
+        return json.loads(resposta.content)
+    return resposta.content.decode(resposta.charset or "utf-8", errors="replace")
+
+
+def executar_item(request, item, user, fechar_conexoes=False) -> dict:
+    """Executa um item do lote e devolve {id, status, corpo}."""
+    resultado = {"id": item.get("id") if isinstance(item, dict) else None}
+    try:
+        caminho, query = _validar(item)
+        try:
+            rota = resolve(caminho)
+        except Resolver404:
+            raise ItemInvalido("Não encontrado.", status.HTTP_404_NOT_FOUND)
+        if rota.url_name == "batch":
+            raise ItemInvalido("Lotes não podem conter /api/batch/.")
+        sub = _sub_requisicao(request, caminho, query, user)
+        with empresas.usar(getattr(user, "empresa", None)):
+            resposta = rota.func(sub, *rota.args, **rota.kwargs)
+        resultado["status"] = resposta.status_code
+        resultado["corpo"] = _corpo(resposta)
+    except ItemInvalido as exc:
+        resultado["status"] = exc.status_code
+        resultado["corpo"] = {"detail": exc.detalhe}
+    except Exception as exc:
+        # Uma falha não derruba os demais itens do lote
+        resultado["status"] = status.HTTP_500_INTERNAL_SERVER_ERROR
+        resultado["corpo"] = {
+            "detail": repr(exc) if settings.DEBUG else "Erro interno do servidor."
+        }
+    finally:
+        if fechar_conexoes:
+            # Threads do executor não passam pelo request_finished
+            connections.close_all()
+    return resultado
+
+
+async def executar(request, itens, user, paralelo: bool) -> list[dict]:
+    """Executa os itens em ordem de chegada; o resultado mantém a ordem da entrada."""
+    if not paralelo:
+        executar_local = sync_to_async(executar_item)
+        return [await executar_local(request, item, user) for item in itens]
+
+    limite = asyncio.Semaphore(getattr(settings, "BATCH_CONCORRENCIA", 4))
+    executar_thread = sync_to_async(executar_item, thread_sensitive=False)
+
+    async def _um(item):
+        async with limite:
+            return await executar_thread(request, item, user, fechar_conexoes=True)
+
+    return list(await asyncio.gather(*(_um(item) for item in itens)))
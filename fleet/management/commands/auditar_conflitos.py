@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from fleet.conflitos import auditar
+
+
+class Command(BaseCommand):
+    help = "Lista viagens sobrepostas do mesmo veículo ou motorista em toda a frota"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limite",
+            type=int,
+            default=50,
+            help="Quantidade máxima de pares exibidos por recurso",
+        )
+
+    def handle(self, *args, **options):
+        relatorio = auditar(limite=options["limite"])
+        for recurso, resultado in relatorio.items():
+            estilo = self.style.WARNING if resultado["total"] else self.style.SUCCESS
+            self.stdout.write(estilo(f"{recurso}: {resultado['total']} sobreposições"))
+            for par in resultado["pares"]:
+                self.stdout.write(
+                    f"  {recurso} {par[recurso]}: viagem {par['viagem_a']} x viagem {par['viagem_b']}"
+                )
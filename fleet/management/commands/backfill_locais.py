@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from fleet.models import Local, Viagem
+from fleet.utils import normalizar_texto
+
+
+class Command(BaseCommand):
+    help = "Preenche o dicionário de locais e vincula origem/destino das viagens existentes"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Normalizando origens e destinos das viagens...")
+
+        # Textos distintos ainda não vinculados (um único scan por coluna)
+        textos = set(
+            Viagem.objects.filter(origem_local__isnull=True)
+            .values_list("origem", flat=True)
+            .distinct()
+        ) | set(
+            Viagem.objects.filter(destino_local__isnull=True)
+            .values_list("destino", flat=True)
+            .distinct()
+        )
+
+        nomes_por_chave: dict[str, str] = {}
+        for texto in textos:
+            chave = normalizar_texto(texto)
+            if chave:
+                nomes_por_chave.setdefault(chave, " ".join(texto.split()))
+
+        with transaction.atomic():
+            Local.objects.bulk_create(
+                [Local(nome=nome, nome_normalizado=chave) for chave, nome in nomes_por_chave.items()],
+                ignore_conflicts=True,
+                batch_size=1000,
+            )
+            ids_por_chave = dict(
+                Local.objects.filter(nome_normalizado__in=nomes_por_chave).values_list(
+                    "nome_normalizado", "id"
+                )
+            )
+
+            atualizadas = 0
+            for texto in textos:
+                local_id = ids_por_chave.get(normalizar_texto(texto))
+                if local_id is None:
+                    continue
+                atualizadas += Viagem.objects.filter(
+                    origem=texto, origem_local__isnull=True
+                ).update(origem_local_id=local_id)
+                atualizadas += Viagem.objects.filter(
+                    destino=texto, destino_local__isnull=True
+                ).update(destino_local_id=local_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {len(ids_por_chave)} locais no dicionário, {atualizadas} vínculos atualizados."
+            )
+        )
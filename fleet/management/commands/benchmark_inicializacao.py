@@ -0,0 +1,99 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from fleet.models import User, UserRole
+
+# Executado em um processo novo para medir a inicialização a frio. O token vem
+# pronto do processo pai: gerá-lo aqui já aqueceria o ORM antes da requisição
+SCRIPT_MEDICAO = r"""
+import io, json, sys, time
+inicio = time.perf_counter()
+from backend.wsgi import application
+pronto = time.perf_counter()
+
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[1], "QUERY_STRING": "",
+    "SERVER_NAME": "localhost", "SERVER_PORT": "80", "HTTP_HOST": "localhost",
+    "wsgi.input": io.BytesIO(b""), "wsgi.errors": sys.stderr, "wsgi.url_scheme": "http",
+    "HTTP_AUTHORIZATION": f"Bearer {sys.argv[2]}",
+}
+status = []
+b"".join(application(environ, lambda s, h, *a: status.append(s)))
+primeira = time.perf_counter()
+print(json.dumps({
+    "importacao_ms": (pronto - inicio) * 1000,
+    "primeira_requisicao_ms": (primeira - pronto) * 1000,
+    "total_ms": (primeira - inicio) * 1000,
+    "status": status[0],
+    "modulos": len(sys.modules),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo de importação e da primeira requisição autenticada "
+        "de cada perfil de inicialização"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticoes", type=int, default=5)
+        parser.add_argument("--caminho", default="/api/veiculos/")
+        parser.add_argument(
+            "--usuario",
+            help="Usuário da requisição (padrão: primeiro administrador ativo)",
+        )
+        parser.add_argument(
+            "--perfis", nargs="+", default=["completo", "api"], help="Perfis a comparar"
+        )
+
+    def handle(self, *args, **options):
+        token = str(RefreshToken.for_user(self._usuario(options["usuario"])).access_token)
+        for perfil in options["perfis"]:
+            env = {
+                **os.environ,
+                "FLEET_PERFIL": perfil,
+                "DJANGO_SETTINGS_MODULE": os.environ.get(
+                    "DJANGO_SETTINGS_MODULE", "backend.settings"
+                ),
+            }
+            amostras = []
+            for _ in range(options["repeticoes"]):
+                saida = subprocess.run(
+                    [sys.executable, "-c", SCRIPT_MEDICAO, options["caminho"], token],
+                    cwd=settings.BASE_DIR,
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                amostras.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+            def mediana(campo):
+                return statistics.median(a[campo] for a in amostras)
+
+            estilo = self.style.SUCCESS if amostras[0]["status"].startswith("2") else self.style.ERROR
+            self.stdout.write(
+                f"{perfil:>10}: importação {mediana('importacao_ms'):7.1f} ms | "
+                f"primeira requisição {mediana('primeira_requisicao_ms'):6.1f} ms | "
+                f"total {mediana('total_ms'):7.1f} ms | "
+                f"{int(mediana('modulos'))} módulos | "
+                + estilo(amostras[0]["status"])
+            )
+
+    def _usuario(self, username):
+        usuarios = User.objects.filter(is_active=True)
+        if username:
+            user = usuarios.filter(username=username).first()
+        else:
+            user = usuarios.filter(role=UserRole.ADMIN).order_by("pk").first()
+        if user is None:
+            raise CommandError("Usuário não encontrado; informe --usuario.")
+        return user
@@ -0,0 +1,121 @@
+import asyncio
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from fleet.senhas import obter_executor
+
+User = get_user_model()
+
+USERNAME = "benchmark_login"
+SENHA = "benchmark-senha-123"
+
+
+async def _chamar(app, metodo, caminho, corpo=b"", headers=()):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": metodo,
+        "scheme": "http",
+        "path": caminho,
+        "raw_path": caminho.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), *headers],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    corpo_enviado = False
+
+    async def receive():
+        nonlocal corpo_enviado
+        if not corpo_enviado:
+            corpo_enviado = True
+            return {"type": "http.request", "body": corpo, "more_body": False}
+        await asyncio.Event().wait()
+
+    status = []
+
+    async def send(mensagem):
+        if mensagem["type"] == "http.response.start":
+            status.append(mensagem["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def _percentil(amostras, p):
+    ordenadas = sorted(amostras)
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))] * 1000
+
+
+class Command(BaseCommand):
+    help = "Simula uma onda de logins e mede a latência de outros endpoints durante ela"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=40)
+        parser.add_argument("--caminho", default="/api/auth/me/")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=USERNAME)
+        user.set_password(SENHA)
+        user.save()
+        acesso = str(RefreshToken.for_user(user).access_token)
+        taxas = {**settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]}
+        taxas.update({escopo: "1000000/s" for escopo in taxas})
+        try:
+            with override_settings(
+                REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": taxas}
+            ):
+                asyncio.run(self._executar(options["logins"], options["caminho"], acesso))
+        finally:
+            user.delete()
+
+    async def _executar(self, total_logins, caminho, acesso):
+        from backend.asgi import application
+
+        cabecalho_auth = [(b"authorization", f"Bearer {acesso}".encode())]
+        corpo_login = f'{{"username": "{USERNAME}", "password": "{SENHA}"}}'.encode()
+        cabecalho_json = [(b"content-type", b"application/json")]
+
+        async def medir(quantidade):
+            latencias = []
+            for _ in range(quantidade):
+                inicio = time.perf_counter()
+                await _chamar(application, "GET", caminho, headers=cabecalho_auth)
+                latencias.append(time.perf_counter() - inicio)
+            return latencias
+
+        base = await medir(20)
+
+        inicio = time.perf_counter()
+        logins = asyncio.gather(
+            *[
+                _chamar(application, "POST", "/api/auth/token/", corpo_login, cabecalho_json)
+                for _ in range(total_logins)
+            ]
+        )
+        durante = []
+        while not logins.done():
+            durante.extend(await medir(1))
+        codigos = await logins
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"{total_logins} logins em {duracao:.2f} s "
+            f"({codigos.count(200)} ok, {codigos.count(503)} rejeitados pela fila)"
+        )
+        self.stdout.write(
+            f"{caminho} sem carga:     p50 {statistics.median(base) * 1000:6.1f} ms | "
+            f"p99 {_percentil(base, 0.99):6.1f} ms"
+        )
+        self.stdout.write(
+            f"{caminho} durante logins: p50 {statistics.median(durante) * 1000:6.1f} ms | "
+            f"p99 {_percentil(durante, 0.99):6.1f} ms ({len(durante)} requisições)"
+        )
+        self.stdout.write(f"Pool de senhas: {obter_executor().metricas()}")
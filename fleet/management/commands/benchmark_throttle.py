@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from rest_framework.request import Request
+
+from fleet.throttling import IPBucketThrottle, RotaBucketThrottle, UsuarioBucketThrottle
+
+
+class _Usuario:
+    is_authenticated = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class _ViewListagem:
+    action = "list"
+
+
+class Command(BaseCommand):
+    help = "Mede o custo por requisição do throttling em cada store de buckets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requisicoes", type=int, default=50_000)
+        parser.add_argument("--usuarios", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = options["requisicoes"]
+        fabrica = RequestFactory()
+        requisicoes = []
+        for i in range(options["usuarios"]):
+            request = Request(fabrica.get("/api/veiculos/", REMOTE_ADDR=f"10.0.{i // 256}.{i % 256}"))
+            request.user = _Usuario(i)
+            requisicoes.append(request)
+        classes = (UsuarioBucketThrottle, IPBucketThrottle, RotaBucketThrottle)
+        view = _ViewListagem()
+        taxas = {"usuario": "1000000/s", "ip": "1000000/s", "listagem": "1000000/s"}
+
+        for store in ("memoria", "cache"):
+            with override_settings(
+                THROTTLE_STORE=store,
+                REST_FRAMEWORK={"DEFAULT_THROTTLE_RATES": taxas},
+            ):
+                inicio = time.perf_counter()
+                for i in range(total):
+                    request = requisicoes[i % len(requisicoes)]
+                    for classe in classes:
+                        classe().allow_request(request, view)
+                decorrido = time.perf_counter() - inicio
+            self.stdout.write(
+                f"{store:>8}: {decorrido / total * 1e6:6.1f} µs por requisição "
+                f"({len(classes)} buckets, {total} requisições)"
+            )
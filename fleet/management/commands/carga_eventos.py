@@ -0,0 +1,220 @@
+import asyncio
+import json
+import threading
+import time
+import tracemalloc
+
+from asgiref.testing import ApplicationCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from fleet import eventos
+from fleet.models import User, UserRole
+
+CAMINHO = "/api/eventos/viagens/"
+# Veículo dos eventos publicados; os filtrados assinam um id que nunca aparece
+VEICULO_PUBLICADO = 1
+VEICULO_FILTRADO = 0
+
+
+class ClienteSSE:
+    """Uma conexão SSE aberta no app ASGI, lida como um cliente faria."""
+
+    def __init__(self, application, query: str, latencias: list, total_eventos: int):
+        self.comunicador = ApplicationCommunicator(
+            application,
+            {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": CAMINHO,
+                "raw_path": CAMINHO.encode(),
+                "query_string": query.encode(),
+                "headers": [(b"host", b"localhost"), (b"accept", b"text/event-stream")],
+            },
+        )
+        self.latencias = latencias
+        self.total_eventos = total_eventos
+        self.recebidos = 0
+        self.overflow = False
+        self.completo = asyncio.Event()
+        self._leitor = None
+
+    async def conectar(self, timeout: float) -> None:
+        inicio = await self.comunicador.receive_output(timeout)
+        if inicio["type"] != "http.response.start" or inicio["status"] != 200:
+            raise CommandError(f"Stream recusado: {inicio.get('status')}")
+        self._leitor = asyncio.create_task(self._ler())
+
+    async def _ler(self) -> None:
+        while True:
+            mensagem = await self.comunicador.receive_output(None)
+            # O instante de recepção é o do cliente, depois do send() do app
+            recebido = time.perf_counter()
+            corpo = mensagem.get("body", b"").decode()
+            if corpo.startswith("event: overflow"):
+                self.overflow = True
+            if not corpo.startswith("event: viagem"):
+                continue
+            dados = json.loads(corpo.split("data: ", 1)[1])
+            self.latencias.append(recebido - dados["enviado"])
+            self.recebidos += 1
+            if self.recebidos >= self.total_eventos:
+                self.completo.set()
+
+    async def desconectar(self, timeout: float) -> None:
+        await self.comunicador.send_input({"type": "http.disconnect"})
+        await self.comunicador.wait(timeout)
+        if self._leitor is not None:
+            self._leitor.cancel()
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga do stream de eventos: abre conexões SSE reais no app ASGI "
+        "e mede a latência de cada evento na recepção pelo cliente"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assinantes", type=int, default=5000, help="Conexões SSE abertas")
+        parser.add_argument("--eventos", type=int, default=50)
+        parser.add_argument(
+            "--filtrados",
+            type=float,
+            default=0.9,
+            help="Fração de conexões filtrando por um veículo que não recebe eventos",
+        )
+        parser.add_argument(
+            "--ocioso",
+            type=float,
+            default=2.0,
+            help="Segundos com as conexões abertas e sem eventos, medindo CPU e atraso do loop",
+        )
+        parser.add_argument(
+            "--usuario",
+            help="Usuário dos tokens (padrão: primeiro administrador ativo)",
+        )
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        user = self._usuario(options["usuario"])
+        token = str(RefreshToken.for_user(user).access_token)
+        asyncio.run(self._executar(token, user.empresa_id, options))
+
+    def _usuario(self, username):
+        usuarios = User.objects.filter(is_active=True, role__in=[UserRole.ADMIN, UserRole.MANAGER])
+        if username:
+            user = usuarios.filter(username=username).first()
+        else:
+            user = usuarios.filter(role=UserRole.ADMIN).order_by("pk").first()
+        if user is None:
+            raise CommandError("Administrador ou gestor não encontrado; informe --usuario.")
+        return user
+
+    async def _executar(self, token, empresa, options):
+        # Importado aqui: o módulo monta a aplicação e pré-aquece o worker
+        from backend.asgi import application
+
+        total = options["assinantes"]
+        total_eventos = options["eventos"]
+        timeout = options["timeout"]
+        filtrados = int(total * options["filtrados"])
+        barramento = eventos.obter_barramento()
+        assinaturas_antes = len(barramento)
+        latencias = []
+
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        clientes = [
+            ClienteSSE(
+                application,
+                f"token={token}&veiculo={VEICULO_FILTRADO}" if i < filtrados else f"token={token}",
+                latencias,
+                total_eventos,
+            )
+            for i in range(total)
+        ]
+        await asyncio.gather(*(cliente.conectar(timeout) for cliente in clientes))
+        tempo_conexao = time.perf_counter() - inicio
+        memoria, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f"🔌 {total} conexões SSE abertas em {tempo_conexao * 1000:.1f} ms "
+            f"({memoria / total:.0f} bytes/conexão, "
+            f"{len(barramento) - assinaturas_antes} assinaturas no barramento)"
+        )
+
+        cpu, atraso = await self._ocioso(options["ocioso"])
+        self.stdout.write(
+            f"💤 {options['ocioso']:.1f} s ociosos: CPU {cpu * 1000:.1f} ms, "
+            f"atraso máximo do loop {atraso * 1000:.1f} ms"
+        )
+
+        # Publicação a partir de outra thread, como fazem as views síncronas
+        def publicar():
+            for i in range(total_eventos):
+                barramento.publicar(
+                    {
+                        "viagem": i,
+                        "empresa": empresa,
+                        "veiculo": VEICULO_PUBLICADO,
+                        "motorista": 1,
+                        "status": "EM_ANDAMENTO",
+                        "enviado": time.perf_counter(),
+                    }
+                )
+
+        receptores = clientes[filtrados:]
+        inicio = time.perf_counter()
+        thread = threading.Thread(target=publicar)
+        thread.start()
+        await asyncio.to_thread(thread.join)
+        tempo_publicacao = time.perf_counter() - inicio
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(cliente.completo.wait() for cliente in receptores)), timeout
+            )
+        except asyncio.TimeoutError:
+            pass
+        tempo_entrega = time.perf_counter() - inicio
+
+        await asyncio.gather(*(cliente.desconectar(timeout) for cliente in clientes))
+
+        esperado = len(receptores) * total_eventos
+        indevidos = sum(cliente.recebidos for cliente in clientes[:filtrados])
+        overflow = sum(cliente.overflow for cliente in clientes)
+        latencias.sort()
+        p50 = latencias[len(latencias) // 2] if latencias else 0
+        p99 = latencias[max(int(len(latencias) * 0.99) - 1, 0)] if latencias else 0
+        self.stdout.write(
+            f"📨 {total_eventos} eventos publicados em {tempo_publicacao * 1000:.1f} ms "
+            f"({tempo_publicacao / total_eventos * 1e6:.0f} µs/evento para {total} conexões); "
+            f"entregues em {tempo_entrega * 1000:.1f} ms"
+        )
+        estilo = self.style.SUCCESS
+        if len(latencias) != esperado or indevidos or overflow:
+            estilo = self.style.ERROR
+        self.stdout.write(
+            estilo(
+                f"✅ {len(latencias)}/{esperado} entregas recebidas pelos clientes, "
+                f"latência p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms "
+                f"({indevidos} entregas a filtrados, {overflow} overflows)"
+            )
+        )
+        self.stdout.write(
+            f"🔚 Desconectados; {len(barramento) - assinaturas_antes} assinaturas restantes"
+        )
+
+    async def _ocioso(self, segundos: float) -> tuple[float, float]:
+        """CPU do processo e maior atraso do loop com as conexões paradas."""
+        passo = 0.01
+        atraso = 0.0
+        cpu = time.process_time()
+        fim = time.perf_counter() + segundos
+        while time.perf_counter() < fim:
+            antes = time.perf_counter()
+            await asyncio.sleep(passo)
+            atraso = max(atraso, time.perf_counter() - antes - passo)
+        return time.process_time() - cpu, atraso
@@ -0,0 +1,123 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from fleet import alteracoes, consultas_lentas, empresas
+from fleet.models import User, UserRole, Veiculo, Viagem
+from fleet.orcamento import ENDPOINTS
+
+
+class Command(BaseCommand):
+    help = (
+        "Mostra o log de consultas lentas (SQL normalizado, chamador, linhas e EXPLAIN). "
+        "Com --url/--endpoints, antes executa requisições GET contra o banco real"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            action="append",
+            default=[],
+            help="Caminho GET da API a executar (pode repetir)",
+        )
+        parser.add_argument(
+            "--endpoints",
+            action="store_true",
+            help="Executa os endpoints do orçamento de consultas",
+        )
+        parser.add_argument(
+            "--usuario",
+            help="Usuário das requisições (padrão: primeiro administrador ativo)",
+        )
+        parser.add_argument(
+            "--limiar",
+            type=float,
+            help="Limiar em ms para esta execução (padrão: CONSULTAS_LENTAS_LIMIAR_MS)",
+        )
+        parser.add_argument("--limite", type=int, default=20, help="Consultas mostradas")
+        parser.add_argument("--json", action="store_true", help="Saída em JSON")
+        parser.add_argument("--limpar", action="store_true", help="Esvazia o buffer")
+
+    def handle(self, *args, **options):
+        store = consultas_lentas.obter_store()
+        if options["limpar"]:
+            store.limpar()
+            self.stdout.write(self.style.SUCCESS("🧹 Buffer de consultas lentas esvaziado."))
+            return
+
+        limiar = options["limiar"]
+        if limiar is None:
+            limiar = consultas_lentas.limiar_ms()
+        if limiar is None:
+            raise CommandError("CONSULTAS_LENTAS_LIMIAR_MS está desligado; use --limiar.")
+
+        if options["url"] or options["endpoints"]:
+            user = self._usuario(options["usuario"])
+            urls = list(options["url"])
+            if options["endpoints"]:
+                with empresas.usar(user.empresa):
+                    urls += self._endpoints()
+            with override_settings(
+                CONSULTAS_LENTAS_LIMIAR_MS=limiar, ALLOWED_HOSTS=["testserver"]
+            ):
+                self._executar(urls, user)
+
+        consultas = consultas_lentas.listar()[: options["limite"]]
+        if options["json"]:
+            self.stdout.write(json.dumps(consultas, ensure_ascii=False, indent=2))
+            return
+        if not consultas:
+            self.stdout.write(f"Nenhuma consulta acima de {limiar} ms.")
+            return
+        for consulta in consultas:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"🐢 {consulta['duracao_ms']} ms [{consulta['banco']}] "
+                    f"{consulta['chamador'] or consulta['origem'] or '?'} "
+                    f"(linhas: {consulta['linhas'] if consulta['linhas'] is not None else '?'})"
+                )
+            )
+            if consulta["origem"] and consulta["origem"] != consulta["chamador"]:
+                self.stdout.write(f"   origem: {consulta['origem']}")
+            self.stdout.write(f"   {consulta['sql_normalizado'][:500]}")
+            for linha in (consulta["plano"] or "").splitlines():
+                self.stdout.write(f"   │ {linha}")
+
+    def _endpoints(self) -> list[str]:
+        valores = {
+            "veiculo": Veiculo.objects.order_by("pk").values_list("pk", flat=True).first(),
+            "viagem": Viagem.objects.order_by("pk").values_list("pk", flat=True).first(),
+            "cursor": alteracoes.gerar_cursor(0),
+        }
+        urls = []
+        for _nome, _perfil, caminho in ENDPOINTS:
+            if ("{veiculo}" in caminho and valores["veiculo"] is None) or (
+                "{viagem}" in caminho and valores["viagem"] is None
+            ):
+                continue
+            url = caminho.format(**valores)
+            if url not in urls:
+                urls.append(url)
+        return urls
+
+    def _usuario(self, username):
+        usuarios = User.objects.filter(is_active=True)
+        if username:
+            user = usuarios.filter(username=username).first()
+        else:
+            user = usuarios.filter(role=UserRole.ADMIN).order_by("pk").first()
+        if user is None:
+            raise CommandError("Usuário não encontrado; informe --usuario.")
+        return user
+
+    def _executar(self, urls, user) -> None:
+        token = str(RefreshToken.for_user(user).access_token)
+        cliente = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.stdout.write(f"Executando {len(urls)} requisições como {user.username}...")
+        for url in urls:
+            resposta = cliente.get(url)
+            estilo = self.style.SUCCESS if resposta.status_code < 400 else self.style.ERROR
+            self.stdout.write(estilo(f"  {resposta.status_code} {url}"))
+        self.stdout.write("")
@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import date, timedelta
+from fleet import empresas
 from fleet.models import Motorista
 
 User = get_user_model()
@@ -80,9 +81,10 @@ class Command(BaseCommand):
         if not nome_completo:
             nome_completo = user.username
 
-        # Criar motorista
+        # Criar motorista (na empresa do usuário)
         motorista = Motorista.objects.create(
             user=user,
+            empresa_id=user.empresa_id or empresas.empresa_padrao(),
             nome_completo=nome_completo,
             cpf=cpf,
             cnh_numero=cnh_numero,
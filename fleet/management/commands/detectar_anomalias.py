@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from fleet.anomalias import avaliar
+from fleet.models import Abastecimento, AnomaliaAbastecimento, EstatisticaConsumo
+
+
+class Command(BaseCommand):
+    help = "Recalcula as estatísticas de consumo e as anomalias a partir do histórico"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Quantidade de abastecimentos lidos/gravados por lote",
+        )
+        parser.add_argument(
+            "--banco",
+            default="default",
+            help="Alias do banco (shard) a reprocessar",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        banco = options["banco"]
+        self.stdout.write("Reprocessando histórico de abastecimentos...")
+
+        estatisticas: dict[tuple, EstatisticaConsumo] = {}
+        pendentes: list[AnomaliaAbastecimento] = []
+        processados = anomalias = 0
+
+        with transaction.atomic(using=banco):
+            AnomaliaAbastecimento.todos.using(banco).all().delete()
+            EstatisticaConsumo.todos.using(banco).all().delete()
+
+            # Uma única passada em ordem cronológica, com estado só em memória
+            historico = (
+                Abastecimento.todos.using(banco)
+                .select_related("veiculo")
+                .order_by("data", "hodometro", "id")
+                .iterator(chunk_size=chunk_size)
+            )
+            for abastecimento in historico:
+                tipo = abastecimento.tipo_combustivel
+                empresa_id = abastecimento.empresa_id
+                est_veiculo = estatisticas.setdefault(
+                    (empresa_id, abastecimento.veiculo_id, tipo),
+                    EstatisticaConsumo(
+                        empresa_id=empresa_id,
+                        veiculo_id=abastecimento.veiculo_id,
+                        tipo_combustivel=tipo,
+                    ),
+                )
+                est_combustivel = estatisticas.setdefault(
+                    (empresa_id, None, tipo),
+                    EstatisticaConsumo(empresa_id=empresa_id, veiculo=None, tipo_combustivel=tipo),
+                )
+                pendentes.extend(
+                    avaliar(
+                        abastecimento,
+                        est_veiculo,
+                        est_combustivel,
+                        abastecimento.veiculo.capacidade_tanque_l,
+                    )
+                )
+                processados += 1
+                if len(pendentes) >= chunk_size:
+                    AnomaliaAbastecimento.todos.using(banco).bulk_create(pendentes)
+                    anomalias += len(pendentes)
+                    pendentes = []
+
+            AnomaliaAbastecimento.todos.using(banco).bulk_create(pendentes)
+            anomalias += len(pendentes)
+            EstatisticaConsumo.todos.using(banco).bulk_create(
+                estatisticas.values(), batch_size=chunk_size
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {processados} abastecimentos reprocessados, {anomalias} anomalias registradas."
+            )
+        )
@@ -0,0 +1,82 @@
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from fleet import tarefas
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de tarefas em segundo plano (exportações, recálculos, backfills)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "TAREFAS_WORKERS", 2),
+            help="Quantidade de tarefas executadas em paralelo por este processo",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=2.0,
+            help="Segundos de espera quando a fila está vazia",
+        )
+        parser.add_argument(
+            "--uma-vez",
+            action="store_true",
+            help="Processa o que estiver pendente e encerra",
+        )
+
+    def handle(self, *args, **options):
+        parar = threading.Event()
+
+        def encerrar(signum, frame):
+            self.stdout.write(self.style.WARNING("Encerrando após as tarefas em andamento..."))
+            parar.set()
+
+        signal.signal(signal.SIGINT, encerrar)
+        signal.signal(signal.SIGTERM, encerrar)
+
+        recuperadas = tarefas.recuperar_abandonadas()
+        if recuperadas:
+            self.stdout.write(self.style.WARNING(f"⚠️  {recuperadas} tarefas abandonadas recuperadas"))
+
+        prefixo = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(
+                target=self._laco,
+                args=(f"{prefixo}:{n}", parar, options["intervalo"], options["uma_vez"]),
+                name=f"tarefas-{n}",
+            )
+            for n in range(max(1, options["workers"]))
+        ]
+        self.stdout.write(f"🚀 {len(threads)} workers aguardando tarefas ({prefixo})")
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            # join com timeout mantém o processo responsivo aos sinais
+            while thread.is_alive():
+                thread.join(timeout=1)
+        self.stdout.write(self.style.SUCCESS("✅ Worker encerrado"))
+
+    def _laco(self, worker, parar, intervalo, uma_vez):
+        try:
+            while not parar.is_set():
+                tarefa = tarefas.reservar(worker)
+                if tarefa is None:
+                    if uma_vez:
+                        break
+                    parar.wait(intervalo)
+                    continue
+                self.stdout.write(f"▶ #{tarefa.pk} {tarefa.tipo} (tentativa {tarefa.tentativas})")
+                tarefas.executar(tarefa)
+                tarefa.refresh_from_db(fields=["status", "mensagem"])
+                estilo = self.style.SUCCESS if tarefa.status == "CONCLUIDA" else self.style.WARNING
+                self.stdout.write(estilo(f"  #{tarefa.pk} {tarefa.get_status_display()} {tarefa.mensagem}"))
+        finally:
+            connections.close_all()
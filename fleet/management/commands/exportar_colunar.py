@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from fleet import colunar
+from fleet.tarefas import EXPORTAVEIS, ParametrosInvalidos, _queryset_exportacao, _validar_exportacao
+
+
+class Command(BaseCommand):
+    help = "Exporta o histórico de um modelo em formato colunar tipado (Parquet, Arrow ou .npz)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("modelo", choices=list(EXPORTAVEIS))
+        parser.add_argument("saida", help="Caminho do arquivo gerado")
+        parser.add_argument("--formato", choices=colunar.FORMATOS, default="parquet")
+        parser.add_argument("--data-inicio", help="AAAA-MM-DD")
+        parser.add_argument("--data-fim", help="AAAA-MM-DD")
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=50_000,
+            help="Linhas por record batch / row group",
+        )
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Relê o arquivo e confere tipos e valores com o banco",
+        )
+
+    def handle(self, *args, **options):
+        if options["formato"] not in colunar.formatos_disponiveis():
+            raise CommandError(
+                f"Formato '{options['formato']}' indisponível: instale pyarrow (parquet/arrow) ou numpy (npz)."
+            )
+        parametros = {
+            "modelo": options["modelo"],
+            "data_inicio": options["data_inicio"],
+            "data_fim": options["data_fim"],
+        }
+        try:
+            _validar_exportacao(parametros)
+        except ParametrosInvalidos as exc:
+            raise CommandError(str(exc))
+
+        qs = _queryset_exportacao(parametros)
+        linhas = colunar.exportar(qs, options["saida"], options["formato"], lote=options["lote"])
+        self.stdout.write(self.style.SUCCESS(f"✅ {linhas} linhas exportadas em {options['saida']}"))
+
+        if options["verificar"]:
+            self._verificar(qs, options["saida"], options["formato"])
+
+    def _verificar(self, qs, caminho, formato):
+        colunas, lidas = colunar.ler_linhas(caminho, formato)
+        if colunas != colunar.esquema(qs.model):
+            raise CommandError("❌ Esquema do arquivo difere do modelo.")
+        nomes = [c["nome"] for c in colunas]
+        originais = qs.values_list(*nomes).iterator(chunk_size=5000)
+        divergencias = 0
+        total = 0
+        for total, (original, lida) in enumerate(zip(originais, lidas), 1):
+            for coluna, a, b in zip(colunas, original, lida):
+                if a != b or type(a) is not type(b):
+                    divergencias += 1
+                    if divergencias <= 10:
+                        self.stdout.write(
+                            self.style.WARNING(f"  linha {total} {coluna['nome']}: {a!r} != {b!r}")
+                        )
+        if total != len(lidas) or divergencias:
+            raise CommandError(f"❌ {divergencias} valores divergentes em {total} linhas.")
+        self.stdout.write(self.style.SUCCESS(f"✅ Tipos e valores conferidos em {total} linhas"))
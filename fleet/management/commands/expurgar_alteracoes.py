@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from fleet.alteracoes import expurgar_remocoes, retencao
+
+
+class Command(BaseCommand):
+    help = "Remove do feed de alterações as remoções mais antigas que a retenção"
+
+    def handle(self, *args, **options):
+        removidos = expurgar_remocoes()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {removidos} remoções expurgadas (retenção de {retencao().days} dias)."
+            )
+        )
@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from fleet.schema import gerar, salvar
+
+
+class Command(BaseCommand):
+    help = "Gera o schema OpenAPI (JSON e YAML) servido em /api/schema/"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--destino",
+            type=Path,
+            default=None,
+            help="Diretório de saída (padrão: settings.SCHEMA_DIR)",
+        )
+
+    def handle(self, *args, **options):
+        arquivos = salvar(gerar(), options["destino"])
+        for arquivo in arquivos:
+            self.stdout.write(self.style.SUCCESS(f"✓ {arquivo}"))
@@ -1,63 +1,221 @@
-from django.core.management.base import BaseCommand
+import re
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from fleet import alteracoes, empresas
 from fleet.models import Motorista
+from fleet.utils import normalizar_texto
 
 User = get_user_model()
 
+# Pontuação de cada tipo de correspondência (maior = mais confiável)
+PONTOS_CPF = 100
+PONTOS_NOME_COMPLETO = 90
+PONTOS_USERNAME_NOME_COMPLETO = 80
+PONTOS_USERNAME_PRIMEIRO_ULTIMO = 70
+PONTOS_TOKENS_USERNAME = 50
+PONTUACAO_MINIMA = 50
+
+
+def _digitos(texto: str) -> str:
+    return re.sub(r"\D", "", texto or "")
+
+
+def _tokens(texto: str) -> list[str]:
+    return [t for t in re.split(r"[^a-z0-9]+", normalizar_texto(texto)) if t]
+
 
 class Command(BaseCommand):
-    help = "Vincula usuários OPERATOR aos motoristas existentes pelo nome"
+    help = "Vincula usuários OPERATOR aos motoristas existentes pelo nome, CPF ou username"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas mostra os vínculos que seriam feitos, sem gravar",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Quantidade de motoristas atualizados por bulk_update",
+        )
 
     def handle(self, *args, **options):
         self.stdout.write("Vinculando usuários aos motoristas...")
 
-        # Buscar todos os motoristas sem usuário vinculado
-        motoristas_sem_user = Motorista.objects.filter(user__isnull=True)
-        usuarios_operator = User.objects.filter(role="OPERATOR", motorista__isnull=True)
-
-        self.stdout.write(f"Motoristas sem usuário: {motoristas_sem_user.count()}")
-        self.stdout.write(f"Usuários OPERATOR sem motorista: {usuarios_operator.count()}")
-
-        vinculados = 0
-        for motorista in motoristas_sem_user:
-            # Tentar encontrar usuário pelo nome (first_name + last_name ou username)
-            nome_parts = motorista.nome_completo.split()
-            if len(nome_parts) >= 2:
-                first_name = nome_parts[0]
-                last_name = " ".join(nome_parts[1:])
-                
-                # Tentar encontrar por first_name e last_name
-                user = User.objects.filter(
-                    first_name__iexact=first_name,
-                    last_name__iexact=last_name,
-                    role="OPERATOR",
-                    motorista__isnull=True
-                ).first()
-                
-                if not user:
-                    # Tentar encontrar por username (pode ser similar ao nome)
-                    username_lower = motorista.nome_completo.lower().replace(" ", "")
-                    user = User.objects.filter(
-                        username__icontains=first_name.lower(),
-                        role="OPERATOR",
-                        motorista__isnull=True
-                    ).first()
-
-                if user:
-                    motorista.user = user
-                    motorista.save()
-                    vinculados += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"✓ Vinculado: {motorista.nome_completo} -> {user.username}"
-                        )
-                    )
+        # Uma consulta para cada lado; todo o casamento é feito em memória
+        motoristas = list(
+            Motorista.objects.filter(user__isnull=True).only(
+                "id", "nome_completo", "cpf", "empresa"
+            )
+        )
+        usuarios = list(
+            User.objects.filter(role="OPERATOR", motorista__isnull=True).only(
+                "id", "username", "first_name", "last_name", "empresa"
+            )
+        )
+        self.stdout.write(f"Motoristas sem usuário: {len(motoristas)}")
+        self.stdout.write(f"Usuários OPERATOR sem motorista: {len(usuarios)}")
+
+        indices = self._indexar_usuarios(usuarios)
+        # Só vincula usuário e motorista da mesma empresa
+        empresa_por_usuario = {
+            u.id: u.empresa_id or empresas.empresa_padrao() for u in usuarios
+        }
+        pontuacoes = {
+            m.id: {
+                user_id: pontos
+                for user_id, pontos in self._candidatos(m, indices).items()
+                if empresa_por_usuario[user_id] == m.empresa_id
+            }
+            for m in motoristas
+        }
+
+        vinculos, ambiguos, preteridos = self._resolver(pontuacoes)
+        usuarios_por_id = {u.id: u for u in usuarios}
+        motoristas_por_id = {m.id: m for m in motoristas}
+
+        for motorista_id, candidatos in ambiguos:
+            nomes = ", ".join(usuarios_por_id[u].username for u in candidatos)
+            self.stdout.write(
+                self.style.WARNING(
+                    f"? Ambíguo: {motoristas_por_id[motorista_id].nome_completo} -> {nomes}"
+                )
+            )
+        for motorista_id, user_id in preteridos:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"? Preterido: {motoristas_por_id[motorista_id].nome_completo} -> "
+                    f"{usuarios_por_id[user_id].username} (o usuário combina melhor com "
+                    "outro motorista)"
+                )
+            )
+
+        alterados = []
+        for motorista_id, user_id in vinculos:
+            motorista = motoristas_por_id[motorista_id]
+            motorista.user_id = user_id
+            alterados.append(motorista)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✓ Vinculado: {motorista.nome_completo} -> {usuarios_por_id[user_id].username}"
+                )
+            )
+
+        if options["dry_run"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"\n(dry-run) {len(alterados)} vínculos seriam feitos, "
+                    f"{len(ambiguos)} ambíguos, {len(preteridos)} preteridos."
+                )
+            )
+            return
+
+        chunk_size = options["chunk_size"]
+        for inicio in range(0, len(alterados), chunk_size):
+            lote = alterados[inicio : inicio + chunk_size]
+            with transaction.atomic():
+                Motorista.objects.bulk_update(lote, ["user"])
+                alteracoes.registrar(Motorista, [m.id for m in lote])
 
         self.stdout.write(
-            self.style.SUCCESS(f"\n✅ {vinculados} motoristas vinculados com sucesso!")
+            self.style.SUCCESS(f"\n✅ {len(alterados)} motoristas vinculados com sucesso!")
         )
+        if ambiguos:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️  {len(ambiguos)} motoristas com vínculo ambíguo não foram alterados."
+                )
+            )
+        if preteridos:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️  {len(preteridos)} motoristas preteridos: o melhor usuário de cada um "
+                    "pontua mais com outro motorista."
+                )
+            )
         self.stdout.write(
             "\n💡 Dica: Se ainda houver motoristas sem vínculo, você pode criar usuários "
             "com role=OPERATOR e depois executar este comando novamente, ou vincular manualmente no admin."
         )
 
+    def _indexar_usuarios(self, usuarios):
+        indices = {
+            "cpf": defaultdict(set),
+            "nome": defaultdict(set),
+            "username": defaultdict(set),
+            "token": defaultdict(set),
+        }
+        for user in usuarios:
+            cpf = _digitos(user.username)
+            if len(cpf) == 11:
+                indices["cpf"][cpf].add(user.id)
+            nome = normalizar_texto(f"{user.first_name} {user.last_name}")
+            if nome:
+                indices["nome"][nome].add(user.id)
+            indices["username"]["".join(_tokens(user.username))].add(user.id)
+            for token in set(_tokens(user.username)):
+                indices["token"][token].add(user.id)
+        return indices
+
+    def _candidatos(self, motorista, indices) -> dict[int, int]:
+        pontos: dict[int, int] = defaultdict(int)
+
+        def pontuar(user_ids, valor):
+            for user_id in user_ids:
+                pontos[user_id] = max(pontos[user_id], valor)
+
+        nome = normalizar_texto(motorista.nome_completo)
+        tokens = _tokens(motorista.nome_completo)
+        pontuar(indices["cpf"].get(_digitos(motorista.cpf), ()), PONTOS_CPF)
+        pontuar(indices["nome"].get(nome, ()), PONTOS_NOME_COMPLETO)
+        if tokens:
+            pontuar(indices["username"].get("".join(tokens), ()), PONTOS_USERNAME_NOME_COMPLETO)
+        if len(tokens) >= 2:
+            primeiro, ultimo = tokens[0], tokens[-1]
+            pontuar(
+                indices["username"].get(primeiro + ultimo, ()), PONTOS_USERNAME_PRIMEIRO_ULTIMO
+            )
+            pontuar(
+                indices["token"].get(primeiro, set()) & indices["token"].get(ultimo, set()),
+                PONTOS_TOKENS_USERNAME,
+            )
+        return {u: p for u, p in pontos.items() if p >= PONTUACAO_MINIMA}
+
+    def _resolver(self, pontuacoes):
+        """Aceita (motorista, usuário) só quando cada um é a melhor opção única do outro.
+
+        Retorna os vínculos, os ambíguos (empate) e os preteridos: motoristas cujo
+        melhor usuário pontua mais com outro motorista.
+        """
+        melhor_motorista_por_user: dict[int, tuple[int, list[int]]] = {}
+        for motorista_id, candidatos in pontuacoes.items():
+            for user_id, pontos in candidatos.items():
+                atual = melhor_motorista_por_user.get(user_id)
+                if atual is None or pontos > atual[0]:
+                    melhor_motorista_por_user[user_id] = (pontos, [motorista_id])
+                elif pontos == atual[0]:
+                    atual[1].append(motorista_id)
+
+        vinculos, ambiguos, preteridos = [], [], []
+        for motorista_id, candidatos in pontuacoes.items():
+            if not candidatos:
+                continue
+            melhor = max(candidatos.values())
+            melhores = [u for u, p in candidatos.items() if p == melhor]
+            if len(melhores) > 1:
+                ambiguos.append((motorista_id, melhores))
+                continue
+            user_id = melhores[0]
+            pontos_user, motoristas_user = melhor_motorista_por_user[user_id]
+            if pontos_user == melhor and motoristas_user == [motorista_id]:
+                vinculos.append((motorista_id, user_id))
+            elif pontos_user == melhor:
+                ambiguos.append((motorista_id, melhores))
+            else:
+                preteridos.append((motorista_id, user_id))
+        return vinculos, ambiguos, preteridos
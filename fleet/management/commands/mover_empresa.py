@@ -0,0 +1,185 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from fleet.models import (
+    Abastecimento,
+    AlteracaoRegistro,
+    AnomaliaAbastecimento,
+    Empresa,
+    EstatisticaConsumo,
+    IndicePrecoCombustivel,
+    Local,
+    Manutencao,
+    Motorista,
+    Veiculo,
+    Viagem,
+    VinculoVeiculoMotorista,
+)
+
+# Ordem de cópia: cada modelo depois dos que ele referencia (a remoção é na ordem inversa)
+MODELOS = [
+    Veiculo,
+    Motorista,
+    VinculoVeiculoMotorista,
+    Manutencao,
+    Abastecimento,
+    IndicePrecoCombustivel,
+    EstatisticaConsumo,
+    AnomaliaAbastecimento,
+    Viagem,
+    AlteracaoRegistro,
+]
+CAMPOS_LOCAL = ("origem_local_id", "destino_local_id")
+
+
+class Command(BaseCommand):
+    help = "Move os dados de uma empresa para outro banco (shard), em lotes e mantendo os ids"
+
+    def add_arguments(self, parser):
+        parser.add_argument("empresa", help="Slug da empresa")
+        parser.add_argument("banco", help="Alias de destino em settings.DATABASES")
+        parser.add_argument("--lote", type=int, default=1000, help="Linhas copiadas por lote")
+        parser.add_argument(
+            "--manter-origem",
+            action="store_true",
+            help="Não apaga os dados do banco de origem após a troca",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            empresa = Empresa.objects.get(slug=options["empresa"])
+        except Empresa.DoesNotExist:
+            raise CommandError(f"Empresa '{options['empresa']}' não encontrada.")
+        origem, destino, lote = empresa.banco, options["banco"], options["lote"]
+        if destino not in settings.DATABASES:
+            raise CommandError(f"Banco '{destino}' não está em settings.DATABASES.")
+        if origem == destino:
+            raise CommandError(f"A empresa já está no banco '{destino}'.")
+
+        # Enquanto copia, a API responde 503 e as tarefas da empresa aguardam
+        Empresa.objects.filter(pk=empresa.pk).update(em_migracao=True)
+        self.stdout.write(f"Movendo {empresa} de '{origem}' para '{destino}'...")
+        try:
+            locais = self._copiar_locais(empresa, origem, destino)
+            for modelo in MODELOS:
+                copiadas = self._copiar(modelo, empresa, origem, destino, lote, locais)
+                self.stdout.write(f"  {modelo._meta.verbose_name_plural}: {copiadas} linhas")
+            self._conferir(empresa, origem, destino)
+            conexao = connections[destino]
+            with conexao.cursor() as cursor:
+                for sql in conexao.ops.sequence_reset_sql(no_style(), MODELOS):
+                    cursor.execute(sql)
+        except Exception:
+            Empresa.objects.filter(pk=empresa.pk).update(em_migracao=False)
+            raise
+
+        # A troca do banco é o ponto de virada: daqui em diante tudo lê do destino
+        Empresa.objects.filter(pk=empresa.pk).update(banco=destino, em_migracao=False)
+        self.stdout.write(self.style.SUCCESS(f"✅ {empresa} agora usa o banco '{destino}'."))
+
+        if options["manter_origem"]:
+            self.stdout.write(self.style.WARNING(f"⚠️  Dados mantidos em '{origem}'."))
+            return
+        removidas = sum(
+            self._apagar(modelo, empresa, origem, lote) for modelo in reversed(MODELOS)
+        )
+        self.stdout.write(self.style.SUCCESS(f"🧹 {removidas} linhas removidas de '{origem}'."))
+
+    def _copiar_locais(self, empresa, origem, destino) -> dict[int, int]:
+        """Interna no destino os locais usados pelas viagens; devolve {id origem: id destino}."""
+        viagens = Viagem.todos.using(origem).filter(empresa=empresa)
+        ids = set()
+        for campo in CAMPOS_LOCAL:
+            ids |= set(viagens.exclude(**{campo: None}).values_list(campo, flat=True).distinct())
+        locais = list(
+            Local.objects.using(origem)
+            .filter(pk__in=ids)
+            .values_list("pk", "nome", "nome_normalizado")
+        )
+        Local.objects.using(destino).bulk_create(
+            [Local(nome=nome, nome_normalizado=chave) for _pk, nome, chave in locais],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        id_destino = dict(
+            Local.objects.using(destino)
+            .filter(nome_normalizado__in=[chave for _pk, _nome, chave in locais])
+            .values_list("nome_normalizado", "pk")
+        )
+        return {pk: id_destino[chave] for pk, _nome, chave in locais}
+
+    def _copiar(self, modelo, empresa, origem, destino, lote, locais) -> int:
+        """INSERT direto com os valores originais (sem auto_now, save() ou sinais).
+
+        Lotes já presentes no destino são pulados, então o comando pode ser
+        repetido após uma falha; um id ocupado por outra empresa aborta a cópia.
+        """
+        campos = modelo._meta.concrete_fields
+        nomes = [campo.attname for campo in campos]
+        posicoes_local = [nomes.index(c) for c in CAMPOS_LOCAL if c in nomes]
+        conexao = connections[destino]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            conexao.ops.quote_name(modelo._meta.db_table),
+            ", ".join(conexao.ops.quote_name(campo.column) for campo in campos),
+            ", ".join(["%s"] * len(campos)),
+        )
+        linhas_origem = modelo.todos.using(origem).filter(empresa=empresa).order_by("pk")
+        copiadas, ultimo = 0, 0
+        while True:
+            linhas = list(linhas_origem.filter(pk__gt=ultimo).values_list(*nomes)[:lote])
+            if not linhas:
+                return copiadas
+            ultimo = linhas[-1][0]
+            existentes = dict(
+                modelo.todos.using(destino)
+                .filter(pk__in=[linha[0] for linha in linhas])
+                .values_list("pk", "empresa_id")
+            )
+            outras = [pk for pk, empresa_id in existentes.items() if empresa_id != empresa.pk]
+            if outras:
+                raise CommandError(
+                    f"❌ {modelo._meta.verbose_name_plural}: ids {outras[:5]} já usados por "
+                    f"outra empresa em '{destino}'."
+                )
+            valores = []
+            for linha in linhas:
+                if linha[0] in existentes:
+                    continue
+                linha = list(linha)
+                for posicao in posicoes_local:
+                    if linha[posicao] is not None:
+                        linha[posicao] = locais[linha[posicao]]
+                valores.append(
+                    [campo.get_db_prep_save(valor, conexao) for campo, valor in zip(campos, linha)]
+                )
+            if valores:
+                with transaction.atomic(using=destino), conexao.cursor() as cursor:
+                    cursor.executemany(sql, valores)
+            copiadas += len(valores)
+
+    def _conferir(self, empresa, origem, destino) -> None:
+        for modelo in MODELOS:
+            antes = modelo.todos.using(origem).filter(empresa=empresa).count()
+            depois = modelo.todos.using(destino).filter(empresa=empresa).count()
+            if antes != depois:
+                raise CommandError(
+                    f"❌ {modelo._meta.verbose_name_plural}: {antes} linhas na origem, "
+                    f"{depois} no destino. Nada foi trocado."
+                )
+
+    def _apagar(self, modelo, empresa, origem, lote) -> int:
+        """DELETE em lotes direto no banco (sem cascata, sinais ou feed de alterações)."""
+        conexao = connections[origem]
+        tabela = conexao.ops.quote_name(modelo._meta.db_table)
+        ids = modelo.todos.using(origem).filter(empresa=empresa).values_list("pk", flat=True)
+        removidas = 0
+        while True:
+            lote_ids = list(ids[:lote])
+            if not lote_ids:
+                return removidas
+            marcadores = ", ".join(["%s"] * len(lote_ids))
+            with transaction.atomic(using=origem), conexao.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {tabela} WHERE id IN ({marcadores})", lote_ids)
+            removidas += len(lote_ids)
@@ -0,0 +1,220 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import override_settings
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from fleet.orcamento import ENDPOINTS, semear
+
+# Cache só desta execução: o `cache.clear()` entre medições não toca o cache real
+CACHES_MEDICAO = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "orcamento-consultas",
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede consultas SQL, tempo e memória de cada endpoint em vários volumes de dados, "
+        "em bancos de teste descartáveis. As consultas são comparadas com o arquivo "
+        "versionado; tempo e memória, só com uma referência gravada nesta máquina (--gravar)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamanhos",
+            default="10,1000,10000",
+            help="Volumes de linhas por tabela, separados por vírgula",
+        )
+        parser.add_argument(
+            "--consultas",
+            default=str(Path(settings.BASE_DIR) / "orcamento_consultas.json"),
+            help="Arquivo JSON versionado com o número de consultas por endpoint",
+        )
+        parser.add_argument(
+            "--referencia",
+            default=str(Path(settings.BASE_DIR) / "orcamento_consultas.local.json"),
+            help="Arquivo JSON local (não versionado) com tempo e memória de referência",
+        )
+        parser.add_argument(
+            "--gravar",
+            action="store_true",
+            help="Grava as medições como nova referência local em vez de comparar",
+        )
+        parser.add_argument("--repeticoes", type=int, default=3)
+        parser.add_argument(
+            "--tolerancia-tempo",
+            type=float,
+            default=0.5,
+            help="Aumento relativo de tempo aceito (0.5 = 50%%)",
+        )
+        parser.add_argument(
+            "--tolerancia-memoria",
+            type=float,
+            default=0.25,
+            help="Aumento relativo do pico de memória aceito",
+        )
+
+    def handle(self, *args, **options):
+        tamanhos = sorted(int(t) for t in options["tamanhos"].split(","))
+        taxas = {escopo: "1000000/s" for escopo in settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]}
+
+        # Sempre em bancos de teste recém-criados (test_<nome>), nunca nos bancos reais
+        setup_test_environment()
+        bancos = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Sem o log de consultas lentas: o EXPLAIN entraria na contagem
+            with override_settings(
+                REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": taxas},
+                CONSULTAS_LENTAS_LIMIAR_MS=None,
+                ALTERACOES_JANELA_MS=0,
+                CACHES=CACHES_MEDICAO,
+            ):
+                medicoes = self._medir(tamanhos, options["repeticoes"])
+        finally:
+            teardown_databases(bancos, verbosity=0)
+            teardown_test_environment()
+
+        falhas = self._consultas_constantes(medicoes, tamanhos)
+        caminho_consultas = Path(options["consultas"])
+        if caminho_consultas.exists():
+            falhas += self._comparar_consultas(
+                medicoes, json.loads(caminho_consultas.read_text())
+            )
+
+        caminho = Path(options["referencia"])
+        if options["gravar"]:
+            caminho.write_text(json.dumps(medicoes, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"💾 Referência local gravada em {caminho}"))
+        elif caminho.exists():
+            referencia = json.loads(caminho.read_text())
+            falhas += self._comparar(
+                medicoes, referencia, options["tolerancia_tempo"], options["tolerancia_memoria"]
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️  {caminho} não existe; tempo e memória não foram comparados "
+                    "(rode com --gravar nesta máquina para criá-lo)."
+                )
+            )
+
+        if falhas:
+            for falha in falhas:
+                self.stdout.write(self.style.ERROR(f"❌ {falha}"))
+            raise CommandError(f"{len(falhas)} regressões de desempenho.")
+        self.stdout.write(self.style.SUCCESS("✅ Orçamento de consultas respeitado"))
+
+    # Medição
+
+    def _medir(self, tamanhos, repeticoes):
+        medicoes = {}
+        for tamanho in tamanhos:
+            contexto = semear(tamanho)
+            self.stdout.write(f"\n📦 {tamanho} linhas por tabela")
+            for nome, perfil, caminho in ENDPOINTS:
+                cliente = contexto["clientes"][perfil]
+                url = caminho.format(**contexto["ids"])
+                resultado = self._medir_chamada(lambda: cliente.get(url), repeticoes)
+                medicoes.setdefault(nome, {})[str(tamanho)] = resultado
+                self._exibir(nome, resultado)
+        return medicoes
+
+    def _medir_chamada(self, chamada, repeticoes):
+        def executar():
+            # Endpoints com cache versionado devem ser medidos sem o cache
+            cache.clear()
+            resposta = chamada()
+            status = getattr(resposta, "status_code", 200)
+            if status >= 400:
+                raise CommandError(f"Endpoint respondeu {status}: {getattr(resposta, 'content', b'')[:200]!r}")
+
+        executar()  # aquecimento (content types, conexões, imports)
+        tempos = []
+        for _ in range(max(1, repeticoes)):
+            # O request_started do Client zera o log; partir do zero mantém a contagem certa
+            reset_queries()
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                executar()
+                tempos.append(time.perf_counter() - inicio)
+
+        tracemalloc.start()
+        try:
+            executar()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "consultas": len(consultas),
+            # O menor tempo é o menos sujeito a ruído da máquina
+            "tempo_ms": round(min(tempos) * 1000, 2),
+            "memoria_kb": round(pico / 1024, 1),
+        }
+
+    def _exibir(self, nome, resultado):
+        self.stdout.write(
+            f"  {nome:<26} {resultado['consultas']:>3} consultas "
+            f"{resultado['tempo_ms']:>9.2f} ms {resultado['memoria_kb']:>10.1f} KiB"
+        )
+
+    # Verificações
+
+    def _consultas_constantes(self, medicoes, tamanhos):
+        falhas = []
+        menor = str(tamanhos[0])
+        for nome, por_tamanho in medicoes.items():
+            base = por_tamanho[menor]["consultas"]
+            for tamanho in tamanhos[1:]:
+                consultas = por_tamanho[str(tamanho)]["consultas"]
+                if consultas > base:
+                    falhas.append(
+                        f"{nome}: {consultas} consultas com {tamanho} linhas contra {base} "
+                        f"com {menor} (N+1?)"
+                    )
+        return falhas
+
+    def _comparar_consultas(self, medicoes, orcamento):
+        falhas = []
+        for nome, por_tamanho in medicoes.items():
+            maximo = orcamento.get(nome)
+            for tamanho, atual in por_tamanho.items():
+                if maximo is not None and atual["consultas"] > maximo:
+                    falhas.append(
+                        f"{nome} [{tamanho}]: {atual['consultas']} consultas (orçamento {maximo})"
+                    )
+        return falhas
+
+    def _comparar(self, medicoes, referencia, tol_tempo, tol_memoria):
+        """Tempo e memória contra a referência local, com tolerância relativa."""
+        falhas = []
+        for nome, por_tamanho in medicoes.items():
+            for tamanho, atual in por_tamanho.items():
+                ref = referencia.get(nome, {}).get(tamanho)
+                if ref is None:
+                    continue
+                # Folga absoluta para medições pequenas, dominadas por ruído
+                if atual["tempo_ms"] > ref["tempo_ms"] * (1 + tol_tempo) + 5:
+                    falhas.append(
+                        f"{nome} [{tamanho}]: {atual['tempo_ms']} ms (referência {ref['tempo_ms']} ms)"
+                    )
+                if atual["memoria_kb"] > ref["memoria_kb"] * (1 + tol_memoria) + 64:
+                    falhas.append(
+                        f"{nome} [{tamanho}]: {atual['memoria_kb']} KiB (referência {ref['memoria_kb']} KiB)"
+                    )
+        return falhas
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import F, Window
+from django.db.models.functions import Lag
+
+from fleet import alteracoes
+from fleet.consumo import calcular_media
+from fleet.models import Abastecimento, Veiculo
+
+
+class Command(BaseCommand):
+    help = "Recalcula a média km/L de todo o histórico de abastecimentos (LAG por veículo)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--veiculos-por-lote",
+            type=int,
+            default=200,
+            help="Quantidade de veículos lidos e gravados por lote",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta as médias que mudariam, sem gravar",
+        )
+        parser.add_argument(
+            "--banco",
+            default="default",
+            help="Alias do banco (shard) a reprocessar",
+        )
+
+    def handle(self, *args, **options):
+        banco = options["banco"]
+        if banco not in connections:
+            raise CommandError(f"Banco '{banco}' não está em DATABASES.")
+        # Todas as empresas do banco: `todos` ignora o escopo e o roteador
+        veiculos = list(Veiculo.todos.using(banco).order_by("pk").values_list("pk", flat=True))
+        tamanho = options["veiculos_por_lote"]
+        verificados = alterados = 0
+
+        for inicio in range(0, len(veiculos), tamanho):
+            lote = veiculos[inicio : inicio + tamanho]
+            # Um único SELECT por lote: o hodômetro anterior vem da função de janela
+            linhas = (
+                Abastecimento.todos.using(banco)
+                .filter(veiculo_id__in=lote)
+                .annotate(
+                    hodometro_anterior=Window(
+                        Lag("hodometro"),
+                        partition_by=[F("veiculo_id")],
+                        order_by=[F("data").asc(), F("hodometro").asc(), F("id").asc()],
+                    )
+                )
+                .order_by()
+                .values_list("id", "hodometro", "litros", "hodometro_anterior", "media_km_l")
+            )
+            mudancas = []
+            for pk, hodometro, litros, anterior, media_atual in linhas:
+                verificados += 1
+                media = calcular_media(hodometro, litros, anterior)
+                if media != media_atual:
+                    mudancas.append(Abastecimento(pk=pk, media_km_l=media))
+
+            alterados += len(mudancas)
+            if mudancas and not options["dry_run"]:
+                with transaction.atomic(using=banco):
+                    Abastecimento.todos.using(banco).bulk_update(
+                        mudancas, ["media_km_l"], batch_size=1000
+                    )
+                    alteracoes.registrar(Abastecimento, [a.pk for a in mudancas], using=banco)
+
+        sufixo = " (dry-run, nada gravado)" if options["dry_run"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {verificados} abastecimentos verificados, {alterados} médias corrigidas{sufixo}"
+            )
+        )
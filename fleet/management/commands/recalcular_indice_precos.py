@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from fleet.precos import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Refaz o índice diário de preço de combustível a partir dos abastecimentos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--banco",
+            default="default",
+            help="Alias do banco (shard) a reprocessar",
+        )
+
+    def handle(self, *args, **options):
+        linhas = reconstruir(options["banco"])
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Índice de preços reconstruído: {linhas} linhas diárias.")
+        )
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0003_viagem_status_alter_viagem_data_hora_fim_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Local',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=200)),
+                ('nome_normalizado', models.CharField(max_length=200, unique=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'local',
+                'verbose_name_plural': 'locais',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AddField(
+            model_name='viagem',
+            name='destino_local',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='viagens_destino', to='fleet.local'),
+        ),
+        migrations.AddField(
+            model_name='viagem',
+            name='origem_local',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='viagens_origem', to='fleet.local'),
+        ),
+        migrations.AddIndex(
+            model_name='viagem',
+            index=models.Index(fields=['origem_local', 'destino_local', 'data_hora_inicio'], name='viagem_rota_inicio_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0004_local_viagem_rotas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='viagem',
+            index=models.Index(fields=['motorista', 'data_hora_inicio'], name='viagem_motorista_inicio_idx'),
+        ),
+    ]
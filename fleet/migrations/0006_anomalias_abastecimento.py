@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0005_viagem_motorista_inicio_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='veiculo',
+            name='capacidade_tanque_l',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=6, null=True),
+        ),
+        migrations.CreateModel(
+            name='AnomaliaAbastecimento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CONSUMO_ATIPICO', 'Consumo atípico'), ('HODOMETRO_REGRESSIVO', 'Hodômetro regressivo'), ('LITROS_ACIMA_TANQUE', 'Litros acima do tanque')], max_length=30)),
+                ('valor', models.FloatField(blank=True, null=True)),
+                ('esperado', models.FloatField(blank=True, null=True)),
+                ('z_score', models.FloatField(blank=True, null=True)),
+                ('detalhe', models.CharField(blank=True, max_length=300)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('abastecimento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalias', to='fleet.abastecimento')),
+                ('veiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='fleet.veiculo')),
+            ],
+            options={
+                'verbose_name': 'anomalia de abastecimento',
+                'verbose_name_plural': 'anomalias de abastecimento',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['veiculo', '-criado_em'], name='anomalia_veiculo_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EstatisticaConsumo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_combustivel', models.CharField(choices=[('GASOLINA', 'Gasolina'), ('DIESEL', 'Diesel'), ('ETANOL', 'Etanol'), ('FLEX', 'Flex'), ('GNV', 'GNV'), ('ELETRICO', 'Elétrico')], max_length=20)),
+                ('amostras', models.PositiveIntegerField(default=0)),
+                ('media', models.FloatField(default=0)),
+                ('variancia', models.FloatField(default=0)),
+                ('ultimo_hodometro', models.PositiveIntegerField(blank=True, null=True)),
+                ('ultima_data', models.DateField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('veiculo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='fleet.veiculo')),
+            ],
+            options={
+                'verbose_name': 'estatística de consumo',
+                'verbose_name_plural': 'estatísticas de consumo',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('veiculo__isnull', False)), fields=('veiculo', 'tipo_combustivel'), name='estatistica_consumo_veiculo_uniq'), models.UniqueConstraint(condition=models.Q(('veiculo__isnull', True)), fields=('tipo_combustivel',), name='estatistica_consumo_combustivel_uniq')],
+            },
+        ),
+    ]
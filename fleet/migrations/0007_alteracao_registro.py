@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0006_anomalias_abastecimento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlteracaoRegistro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=30)),
+                ('objeto_id', models.BigIntegerField()),
+                ('operacao', models.CharField(choices=[('SALVO', 'Criado/atualizado'), ('REMOVIDO', 'Removido')], max_length=10)),
+                ('registrado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'alteração de registro',
+                'verbose_name_plural': 'alterações de registros',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['operacao', 'registrado_em'], name='alteracao_expurgo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('modelo', 'objeto_id'), name='alteracao_modelo_objeto_uniq')],
+            },
+        ),
+    ]
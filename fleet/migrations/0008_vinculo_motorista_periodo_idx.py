@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0007_alteracao_registro'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vinculoveiculomotorista',
+            index=models.Index(fields=['motorista', 'data_inicio', 'data_fim', 'veiculo'], name='vinculo_motorista_periodo_idx'),
+        ),
+    ]
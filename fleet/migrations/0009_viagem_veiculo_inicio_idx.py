@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0008_vinculo_motorista_periodo_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='viagem',
+            index=models.Index(fields=['veiculo', 'data_hora_inicio'], name='viagem_veiculo_inicio_idx'),
+        ),
+    ]
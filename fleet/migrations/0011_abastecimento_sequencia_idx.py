@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0010_tarefas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='abastecimento',
+            index=models.Index(fields=['veiculo', 'data', 'hodometro'], name='abastecimento_sequencia_idx'),
+        ),
+    ]
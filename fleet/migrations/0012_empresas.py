@@ -0,0 +1,160 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:52
+
+import django.db.models.deletion
+import fleet.empresas
+import fleet.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def criar_empresa_padrao(apps, schema_editor):
+    # A tabela de empresas vale só no banco default; os demais bancos (shards)
+    # devem ser migrados depois dele.
+    if schema_editor.connection.alias != "default":
+        return
+    Empresa = apps.get_model("fleet", "Empresa")
+    Empresa.objects.using("default").get_or_create(
+        slug=getattr(settings, "EMPRESA_PADRAO", "padrao"), defaults={"nome": "Empresa padrão"}
+    )
+
+
+def vincular_usuarios(apps, schema_editor):
+    # Superusuários ficam sem empresa e enxergam todas
+    if schema_editor.connection.alias != "default":
+        return
+    Empresa = apps.get_model("fleet", "Empresa")
+    User = apps.get_model("fleet", "User")
+    padrao = Empresa.objects.using("default").get(slug=getattr(settings, "EMPRESA_PADRAO", "padrao"))
+    User.objects.using("default").filter(is_superuser=False, empresa__isnull=True).update(
+        empresa=padrao
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0011_abastecimento_sequencia_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Empresa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=200)),
+                ('slug', models.SlugField(unique=True)),
+                ('banco', models.CharField(default='default', max_length=50)),
+                ('ativo', models.BooleanField(default=True)),
+                ('em_migracao', models.BooleanField(default=False)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'empresa',
+                'verbose_name_plural': 'empresas',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.RunPython(criar_empresa_padrao, migrations.RunPython.noop),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', fleet.models.UsuarioManager()),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='estatisticaconsumo',
+            name='estatistica_consumo_veiculo_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='estatisticaconsumo',
+            name='estatistica_consumo_combustivel_uniq',
+        ),
+        migrations.AlterField(
+            model_name='motorista',
+            name='user',
+            field=models.OneToOneField(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='motorista', to=settings.AUTH_USER_MODEL, verbose_name='usuário'),
+        ),
+        migrations.AddField(
+            model_name='abastecimento',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='alteracaoregistro',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='anomaliaabastecimento',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='estatisticaconsumo',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='manutencao',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='motorista',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='empresa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='usuarios', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='veiculo',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='viagem',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddField(
+            model_name='vinculoveiculomotorista',
+            name='empresa',
+            field=models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='abastecimento',
+            index=models.Index(fields=['empresa', '-data'], name='abastecimento_empresa_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alteracaoregistro',
+            index=models.Index(fields=['empresa', 'id'], name='alteracao_empresa_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='manutencao',
+            index=models.Index(fields=['empresa', '-data'], name='manutencao_empresa_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motorista',
+            index=models.Index(fields=['empresa', 'nome_completo'], name='motorista_empresa_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veiculo',
+            index=models.Index(fields=['empresa', 'placa'], name='veiculo_empresa_placa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='viagem',
+            index=models.Index(fields=['empresa', '-data_hora_inicio'], name='viagem_empresa_inicio_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='estatisticaconsumo',
+            constraint=models.UniqueConstraint(condition=models.Q(('veiculo__isnull', False)), fields=('empresa', 'veiculo', 'tipo_combustivel'), name='estatistica_consumo_veiculo_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='estatisticaconsumo',
+            constraint=models.UniqueConstraint(condition=models.Q(('veiculo__isnull', True)), fields=('empresa', 'tipo_combustivel'), name='estatistica_consumo_combustivel_uniq'),
+        ),
+        migrations.RunPython(vincular_usuarios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:59
+
+import django.db.models.deletion
+import fleet.empresas
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0012_empresas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicePrecoCombustivel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('tipo_combustivel', models.CharField(choices=[('GASOLINA', 'Gasolina'), ('DIESEL', 'Diesel'), ('ETANOL', 'Etanol'), ('FLEX', 'Flex'), ('GNV', 'GNV'), ('ELETRICO', 'Elétrico')], max_length=20)),
+                ('posto', models.CharField(max_length=200)),
+                ('abastecimentos', models.PositiveIntegerField(default=0)),
+                ('litros', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('custo_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('empresa', models.ForeignKey(db_constraint=False, default=fleet.empresas.empresa_atual_ou_padrao, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='fleet.empresa')),
+            ],
+            options={
+                'verbose_name': 'índice de preço de combustível',
+                'verbose_name_plural': 'índices de preço de combustível',
+                'ordering': ['-data', 'tipo_combustivel', 'posto'],
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'data', 'tipo_combustivel', 'posto'), name='indice_preco_dia_uniq')],
+            },
+        ),
+    ]
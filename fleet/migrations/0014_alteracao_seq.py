@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:35
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copiar_ids(apps, schema_editor):
+    # Entradas antigas mantêm a ordem e ficam antes das novas (seq em µs)
+    AlteracaoRegistro = apps.get_model("fleet", "AlteracaoRegistro")
+    AlteracaoRegistro._base_manager.using(schema_editor.connection.alias).update(seq=F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0013_indice_preco_combustivel'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='alteracaoregistro',
+            options={'ordering': ['seq', 'id'], 'verbose_name': 'alteração de registro', 'verbose_name_plural': 'alterações de registros'},
+        ),
+        migrations.RemoveIndex(
+            model_name='alteracaoregistro',
+            name='alteracao_empresa_seq_idx',
+        ),
+        migrations.AddField(
+            model_name='alteracaoregistro',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(copiar_ids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='alteracaoregistro',
+            index=models.Index(fields=['empresa', 'seq', 'id'], name='alteracao_empresa_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0014_alteracao_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alteracaoregistro',
+            name='escopo_motorista',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alteracaoregistro',
+            name='escopo_veiculo',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
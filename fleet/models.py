@@ -1,9 +1,14 @@
 from datetime import date
 
-from django.contrib.auth.models import AbstractUser
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .empresas import EmpresaManager, empresa_atual_ou_padrao
+from .utils import normalizar_texto
+
 
 class UserRole(models.TextChoices):
     ADMIN = "ADMIN", _("Administrador")
@@ -11,6 +16,36 @@ class UserRole(models.TextChoices):
     OPERATOR = "OPERATOR", _("Operacional")
 
 
+class Empresa(models.Model):
+    """Cliente da plataforma; todo registro da frota pertence a uma empresa.
+
+    `banco` é o alias em `settings.DATABASES` onde ficam os dados da empresa
+    (ver `fleet.empresas.RoteadorEmpresas` e o comando `mover_empresa`).
+    """
+
+    nome = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=50, unique=True)
+    banco = models.CharField(max_length=50, default="default")
+    ativo = models.BooleanField(default=True)
+    em_migracao = models.BooleanField(default=False)
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("empresa")
+        verbose_name_plural = _("empresas")
+        ordering = ["nome"]
+
+    def __str__(self) -> str:
+        return self.nome
+
+
+class UsuarioManager(UserManager):
+    # A empresa é lida em toda requisição autenticada (ver fleet.empresas)
+    def get_queryset(self):
+        return super().get_queryset().select_related("empresa")
+
+
 class User(AbstractUser):
     role = models.CharField(
         max_length=20,
@@ -18,12 +53,44 @@ class User(AbstractUser):
         default=UserRole.OPERATOR,
         verbose_name=_("perfil"),
     )
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="usuarios",
+    )
+
+    objects = UsuarioManager()
 
     class Meta:
         verbose_name = _("usuário")
         verbose_name_plural = _("usuários")
 
 
+class ModeloEmpresa(models.Model):
+    """Base dos modelos da frota: coluna `empresa` e escopo automático.
+
+    `objects` filtra pela empresa ativa (`fleet.empresas.atual()`); `todos`
+    ignora o escopo. A FK não tem constraint porque a tabela de empresas
+    fica no banco `default` e os dados podem estar em outro banco.
+    """
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.PROTECT,
+        db_constraint=False,
+        default=empresa_atual_ou_padrao,
+        related_name="+",
+    )
+
+    objects = EmpresaManager()
+    todos = models.Manager()
+
+    class Meta:
+        abstract = True
+
+
 class CombustivelChoices(models.TextChoices):
     GASOLINA = "GASOLINA", _("Gasolina")
     DIESEL = "DIESEL", _("Diesel")
@@ -39,7 +106,7 @@ class StatusVeiculoChoices(models.TextChoices):
     INATIVO = "INATIVO", _("Inativo")
 
 
-class Veiculo(models.Model):
+class Veiculo(ModeloEmpresa):
     placa = models.CharField(max_length=10, unique=True)
     marca = models.CharField(max_length=100)
     modelo = models.CharField(max_length=100)
@@ -55,6 +122,9 @@ class Veiculo(models.Model):
         default=StatusVeiculoChoices.ATIVO,
     )
     hodometro_atual = models.PositiveIntegerField(default=0)
+    capacidade_tanque_l = models.DecimalField(
+        max_digits=6, decimal_places=1, null=True, blank=True
+    )
 
     ipva_validade = models.DateField(null=True, blank=True)
     licenciamento_validade = models.DateField(null=True, blank=True)
@@ -68,6 +138,9 @@ class Veiculo(models.Model):
         verbose_name = _("veículo")
         verbose_name_plural = _("veículos")
         ordering = ["placa"]
+        indexes = [
+            models.Index(fields=["empresa", "placa"], name="veiculo_empresa_placa_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.placa} - {self.marca} {self.modelo}"
@@ -83,7 +156,16 @@ class Veiculo(models.Model):
         )
 
 
-class Motorista(models.Model):
+class Motorista(ModeloEmpresa):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="motorista",
+        verbose_name=_("usuário"),
+    )
     nome_completo = models.CharField(max_length=200)
     cpf = models.CharField(max_length=14, unique=True)
     cnh_numero = models.CharField(max_length=20, unique=True)
@@ -98,6 +180,11 @@ class Motorista(models.Model):
         verbose_name = _("motorista")
         verbose_name_plural = _("motoristas")
         ordering = ["nome_completo"]
+        indexes = [
+            models.Index(
+                fields=["empresa", "nome_completo"], name="motorista_empresa_nome_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.nome_completo
@@ -107,7 +194,7 @@ class Motorista(models.Model):
         return self.cnh_validade < date.today()
 
 
-class VinculoVeiculoMotorista(models.Model):
+class VinculoVeiculoMotorista(ModeloEmpresa):
     veiculo = models.ForeignKey(Veiculo, on_delete=models.CASCADE)
     motorista = models.ForeignKey(Motorista, on_delete=models.CASCADE)
     data_inicio = models.DateField()
@@ -117,6 +204,12 @@ class VinculoVeiculoMotorista(models.Model):
         verbose_name = _("vínculo veículo/motorista")
         verbose_name_plural = _("vínculos veículos/motoristas")
         ordering = ["-data_inicio"]
+        indexes = [
+            models.Index(
+                fields=["motorista", "data_inicio", "data_fim", "veiculo"],
+                name="vinculo_motorista_periodo_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.veiculo} - {self.motorista}"
@@ -133,7 +226,7 @@ class StatusManutencaoChoices(models.TextChoices):
     VENCIDA = "VENCIDA", _("Vencida")
 
 
-class Manutencao(models.Model):
+class Manutencao(ModeloEmpresa):
     veiculo = models.ForeignKey(Veiculo, on_delete=models.CASCADE)
     data = models.DateField()
     tipo = models.CharField(max_length=20, choices=TipoManutencaoChoices.choices)
@@ -157,12 +250,19 @@ class Manutencao(models.Model):
         verbose_name = _("manutenção")
         verbose_name_plural = _("manutenções")
         ordering = ["-data"]
+        indexes = [
+            models.Index(fields=["empresa", "-data"], name="manutencao_empresa_data_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.veiculo} - {self.data} - {self.tipo}"
 
 
-class Abastecimento(models.Model):
+# Campos que alteram a média de consumo de um abastecimento ou do seu sucessor
+CAMPOS_CONSUMO = {"veiculo", "veiculo_id", "data", "hodometro", "litros"}
+
+
+class Abastecimento(ModeloEmpresa):
     veiculo = models.ForeignKey(Veiculo, on_delete=models.CASCADE)
     data = models.DateField()
     hodometro = models.PositiveIntegerField()
@@ -184,33 +284,241 @@ class Abastecimento(models.Model):
         verbose_name = _("abastecimento")
         verbose_name_plural = _("abastecimentos")
         ordering = ["-data"]
+        indexes = [
+            models.Index(
+                fields=["veiculo", "data", "hodometro"], name="abastecimento_sequencia_idx"
+            ),
+            models.Index(fields=["empresa", "-data"], name="abastecimento_empresa_data_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.veiculo} - {self.data} - {self.litros} L"
 
     def save(self, *args, **kwargs) -> None:
-        if self.pk is None:
-            ultimo = (
-                Abastecimento.objects.filter(veiculo=self.veiculo)
-                .order_by("-data", "-hodometro")
+        from . import consumo  # consumo importa este módulo
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not set(update_fields) & CAMPOS_CONSUMO:
+            super().save(*args, **kwargs)
+            return
+
+        antes = None
+        if self.pk is not None:
+            antes = (
+                Abastecimento.objects.filter(pk=self.pk)
+                .values("veiculo_id", "data", "hodometro")
                 .first()
             )
-            if ultimo and self.hodometro > ultimo.hodometro and self.litros > 0:
-                distancia = self.hodometro - ultimo.hodometro
-                self.media_km_l = distancia / float(self.litros)
+        self.media_km_l = consumo.calcular_media(
+            self.hodometro,
+            self.litros,
+            consumo.hodometro_anterior(self.veiculo_id, self.data, self.hodometro, self.pk),
+        )
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "media_km_l"}
         super().save(*args, **kwargs)
 
+        # Só o sucessor na nova posição e o da posição antiga mudam de média
+        afetados = {consumo.sucessor(self.veiculo_id, self.data, self.hodometro, self.pk)}
+        if antes is not None:
+            afetados.add(
+                consumo.sucessor(antes["veiculo_id"], antes["data"], antes["hodometro"], self.pk)
+            )
+        afetados.discard(self.pk)
+        consumo.recalcular(afetados)
+
+
+class EstatisticaConsumo(ModeloEmpresa):
+    """Média e variância exponencialmente ponderadas de km/L.
+
+    Linhas com `veiculo` preenchido guardam a série do veículo; linhas sem
+    veículo guardam a referência geral da empresa para o tipo de combustível.
+    """
+
+    veiculo = models.ForeignKey(
+        Veiculo, on_delete=models.CASCADE, null=True, blank=True
+    )
+    tipo_combustivel = models.CharField(
+        max_length=20, choices=CombustivelChoices.choices
+    )
+    amostras = models.PositiveIntegerField(default=0)
+    media = models.FloatField(default=0)
+    variancia = models.FloatField(default=0)
+    ultimo_hodometro = models.PositiveIntegerField(null=True, blank=True)
+    ultima_data = models.DateField(null=True, blank=True)
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("estatística de consumo")
+        verbose_name_plural = _("estatísticas de consumo")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["empresa", "veiculo", "tipo_combustivel"],
+                condition=models.Q(veiculo__isnull=False),
+                name="estatistica_consumo_veiculo_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["empresa", "tipo_combustivel"],
+                condition=models.Q(veiculo__isnull=True),
+                name="estatistica_consumo_combustivel_uniq",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.veiculo or 'Geral'} - {self.tipo_combustivel}"
+
+    @property
+    def desvio(self) -> float:
+        return self.variancia ** 0.5
+
+    def z_score(self, valor: float) -> float | None:
+        if self.desvio == 0:
+            return None
+        return (valor - self.media) / self.desvio
+
+    def atualizar(self, valor: float, alpha: float) -> None:
+        if self.amostras == 0:
+            self.media = valor
+            self.variancia = 0.0
+        else:
+            diferenca = valor - self.media
+            incremento = alpha * diferenca
+            self.media += incremento
+            self.variancia = (1 - alpha) * (self.variancia + diferenca * incremento)
+        self.amostras += 1
+
+
+class IndicePrecoCombustivel(ModeloEmpresa):
+    """Totais diários de litros e custo por combustível e posto.
+
+    Mantido incrementalmente a cada abastecimento (ver `fleet.precos`); a
+    linha com `posto = "*"` soma todos os postos do dia.
+    """
+
+    data = models.DateField()
+    tipo_combustivel = models.CharField(
+        max_length=20, choices=CombustivelChoices.choices
+    )
+    posto = models.CharField(max_length=200)
+    abastecimentos = models.PositiveIntegerField(default=0)
+    litros = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("índice de preço de combustível")
+        verbose_name_plural = _("índices de preço de combustível")
+        ordering = ["-data", "tipo_combustivel", "posto"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["empresa", "data", "tipo_combustivel", "posto"],
+                name="indice_preco_dia_uniq",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.data} - {self.tipo_combustivel} - {self.posto}"
 
-class Viagem(models.Model):
+    @property
+    def preco_litro(self):
+        return self.custo_total / self.litros if self.litros else None
+
+
+class TipoAnomaliaChoices(models.TextChoices):
+    CONSUMO_ATIPICO = "CONSUMO_ATIPICO", _("Consumo atípico")
+    HODOMETRO_REGRESSIVO = "HODOMETRO_REGRESSIVO", _("Hodômetro regressivo")
+    LITROS_ACIMA_TANQUE = "LITROS_ACIMA_TANQUE", _("Litros acima do tanque")
+
+
+class AnomaliaAbastecimento(ModeloEmpresa):
+    abastecimento = models.ForeignKey(
+        Abastecimento, on_delete=models.CASCADE, related_name="anomalias"
+    )
+    veiculo = models.ForeignKey(Veiculo, on_delete=models.CASCADE)
+    tipo = models.CharField(max_length=30, choices=TipoAnomaliaChoices.choices)
+    valor = models.FloatField(null=True, blank=True)
+    esperado = models.FloatField(null=True, blank=True)
+    z_score = models.FloatField(null=True, blank=True)
+    detalhe = models.CharField(max_length=300, blank=True)
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("anomalia de abastecimento")
+        verbose_name_plural = _("anomalias de abastecimento")
+        ordering = ["-criado_em"]
+        indexes = [
+            models.Index(fields=["veiculo", "-criado_em"], name="anomalia_veiculo_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.veiculo} - {self.get_tipo_display()}"
+
+
+class Local(models.Model):
+    """Dicionário de locais normalizados usados como origem/destino de viagens."""
+
+    nome = models.CharField(max_length=200)
+    nome_normalizado = models.CharField(max_length=200, unique=True)
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("local")
+        verbose_name_plural = _("locais")
+        ordering = ["nome"]
+
+    def __str__(self) -> str:
+        return self.nome
+
+    @classmethod
+    def internar(cls, texto: str) -> "Local | None":
+        chave = normalizar_texto(texto)
+        if not chave:
+            return None
+        local, _criado = cls.objects.get_or_create(
+            nome_normalizado=chave, defaults={"nome": " ".join(texto.split())}
+        )
+        return local
+
+
+class StatusViagemChoices(models.TextChoices):
+    NAO_INICIADA = "NÃO_INICIADA", _("Não Iniciada")
+    EM_ANDAMENTO = "EM_ANDAMENTO", _("Em Andamento")
+    FINALIZADA = "FINALIZADA", _("Finalizada")
+
+
+class Viagem(ModeloEmpresa):
     veiculo = models.ForeignKey(Veiculo, on_delete=models.CASCADE)
     motorista = models.ForeignKey(Motorista, on_delete=models.CASCADE)
-    data_hora_inicio = models.DateTimeField()
-    data_hora_fim = models.DateTimeField()
-    hodometro_saida = models.PositiveIntegerField()
-    hodometro_chegada = models.PositiveIntegerField()
+    data_hora_inicio = models.DateTimeField(null=True, blank=True)
+    data_hora_fim = models.DateTimeField(null=True, blank=True)
+    hodometro_saida = models.PositiveIntegerField(default=0)
+    hodometro_chegada = models.PositiveIntegerField(default=0)
     origem = models.CharField(max_length=200)
     destino = models.CharField(max_length=200)
+    origem_local = models.ForeignKey(
+        Local,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="viagens_origem",
+    )
+    destino_local = models.ForeignKey(
+        Local,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="viagens_destino",
+    )
     finalidade = models.CharField(max_length=300, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=StatusViagemChoices.choices,
+        default=StatusViagemChoices.NAO_INICIADA,
+    )
 
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
@@ -219,12 +527,140 @@ class Viagem(models.Model):
         verbose_name = _("viagem")
         verbose_name_plural = _("viagens")
         ordering = ["-data_hora_inicio"]
+        indexes = [
+            models.Index(
+                fields=["origem_local", "destino_local", "data_hora_inicio"],
+                name="viagem_rota_inicio_idx",
+            ),
+            models.Index(
+                fields=["motorista", "data_hora_inicio"],
+                name="viagem_motorista_inicio_idx",
+            ),
+            models.Index(
+                fields=["veiculo", "data_hora_inicio"],
+                name="viagem_veiculo_inicio_idx",
+            ),
+            models.Index(
+                fields=["empresa", "-data_hora_inicio"],
+                name="viagem_empresa_inicio_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.veiculo} - {self.origem} -> {self.destino}"
 
+    def save(self, *args, **kwargs) -> None:
+        # Mantém origem/destino internados no dicionário de locais
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"origem", "destino"} & set(update_fields):
+            self.origem_local = Local.internar(self.origem)
+            self.destino_local = Local.internar(self.destino)
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "origem_local",
+                    "destino_local",
+                }
+        super().save(*args, **kwargs)
+
     @property
     def km_percorridos(self) -> int:
         return max(self.hodometro_chegada - self.hodometro_saida, 0)
 
 
+class OperacaoAlteracaoChoices(models.TextChoices):
+    SALVO = "SALVO", _("Criado/atualizado")
+    REMOVIDO = "REMOVIDO", _("Removido")
+
+
+class AlteracaoRegistro(ModeloEmpresa):
+    """Última alteração de cada registro, numerada por uma sequência crescente.
+
+    `(seq, id)` é a posição no feed de alterações: cada escrita atualiza a
+    entrada do registro (upsert) com um `seq` novo, maior que os anteriores
+    (ver `fleet.alteracoes.proxima_seq`). Remoções guardam o veículo e o
+    motorista do registro, usados para escopar o feed do OPERATOR.
+    """
+
+    modelo = models.CharField(max_length=30)
+    objeto_id = models.BigIntegerField()
+    operacao = models.CharField(max_length=10, choices=OperacaoAlteracaoChoices.choices)
+    seq = models.BigIntegerField(default=0)
+    escopo_veiculo = models.BigIntegerField(null=True, blank=True)
+    escopo_motorista = models.BigIntegerField(null=True, blank=True)
+    registrado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("alteração de registro")
+        verbose_name_plural = _("alterações de registros")
+        ordering = ["seq", "id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["modelo", "objeto_id"], name="alteracao_modelo_objeto_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["operacao", "registrado_em"], name="alteracao_expurgo_idx"
+            ),
+            models.Index(fields=["empresa", "seq", "id"], name="alteracao_empresa_seq_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.modelo}:{self.objeto_id} {self.operacao}"
+
+
+class StatusTarefaChoices(models.TextChoices):
+    PENDENTE = "PENDENTE", _("Pendente")
+    EXECUTANDO = "EXECUTANDO", _("Executando")
+    CONCLUIDA = "CONCLUIDA", _("Concluída")
+    FALHOU = "FALHOU", _("Falhou")
+
+
+class Tarefa(models.Model):
+    """Tarefa em segundo plano (exportações, recálculos, backfills).
+
+    A fila é a própria tabela: workers reservam a próxima tarefa pendente com
+    `SELECT ... FOR UPDATE SKIP LOCKED` ou, sem esse recurso, com um UPDATE
+    condicional no status.
+    """
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=StatusTarefaChoices.choices,
+        default=StatusTarefaChoices.PENDENTE,
+    )
+    progresso = models.PositiveSmallIntegerField(default=0)
+    mensagem = models.CharField(max_length=300, blank=True)
+    erro = models.TextField(blank=True)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    max_tentativas = models.PositiveSmallIntegerField(default=3)
+    worker = models.CharField(max_length=100, blank=True)
+    arquivo = models.CharField(max_length=300, blank=True)
+    criado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="tarefas",
+    )
+
+    disponivel_em = models.DateTimeField(default=timezone.now)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    sinal_vida_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    baixado_em = models.DateTimeField(null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("tarefa")
+        verbose_name_plural = _("tarefas")
+        ordering = ["-criado_em"]
+        indexes = [
+            models.Index(fields=["status", "disponivel_em"], name="tarefa_fila_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.tipo} ({self.get_status_display()})"
@@ -0,0 +1,205 @@
+"""Endpoints e dados do orçamento de consultas SQL.
+
+Usados pelos testes em `fleet.tests.test_orcamento_consultas` (número de
+consultas por endpoint, constante entre volumes de dados) e pelos comandos
+`orcamento_consultas` (tempo e memória) e `consultas_lentas`. `semear`
+escreve no banco ativo: chame-o só em bancos de teste.
+"""
+
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import alteracoes, precos
+from .models import (
+    Abastecimento,
+    AnomaliaAbastecimento,
+    Local,
+    Manutencao,
+    Motorista,
+    TipoAnomaliaChoices,
+    User,
+    UserRole,
+    Veiculo,
+    Viagem,
+    VinculoVeiculoMotorista,
+)
+
+# (nome, perfil, caminho); "{veiculo}" e "{viagem}" são trocados por ids reais
+ENDPOINTS = [
+    ("veiculos", "gestor", "/api/veiculos/"),
+    ("veiculo", "gestor", "/api/veiculos/{veiculo}/"),
+    ("motoristas", "gestor", "/api/motoristas/"),
+    ("manutencoes", "gestor", "/api/manutencoes/"),
+    ("abastecimentos", "gestor", "/api/abastecimentos/"),
+    ("viagens", "gestor", "/api/viagens/"),
+    ("viagem", "gestor", "/api/viagens/{viagem}/"),
+    ("viagens_conflitos", "gestor", "/api/viagens/conflitos/"),
+    ("anomalias", "gestor", "/api/anomalias/"),
+    ("vinculos", "gestor", "/api/vinculos/"),
+    ("jobs", "gestor", "/api/jobs/"),
+    ("me", "gestor", "/api/auth/me/"),
+    ("changes", "gestor", "/api/changes/?since={cursor}"),
+    ("dashboard", "gestor", "/api/dashboard/resumo/"),
+    ("analytics_rotas", "gestor", "/api/analytics/rotas/"),
+    ("analytics_motoristas", "gestor", "/api/analytics/motoristas/"),
+    ("analytics_custo_km", "gestor", "/api/analytics/custo-km/"),
+    ("autocomplete", "gestor", "/api/autocomplete/?q=a"),
+    (
+        "relatorio_pivot",
+        "gestor",
+        "/api/relatorios/pivot/?fonte=manutencao&dimensoes=marca,mes&medidas=soma:custo,media:custo",
+    ),
+    ("operador_veiculos", "operador", "/api/veiculos/"),
+    ("operador_abastecimentos", "operador", "/api/abastecimentos/"),
+    ("operador_viagens", "operador", "/api/viagens/"),
+    ("operador_vinculos", "operador", "/api/vinculos/"),
+    ("operador_em_andamento", "operador", "/api/viagens/em-andamento/"),
+    ("operador_autocomplete", "operador", "/api/autocomplete/?q=a"),
+]
+
+LOTE = 2000
+
+
+def semear(tamanho):
+    """Completa cada tabela até `tamanho` linhas (incremental entre volumes).
+
+    Devolve os clientes autenticados por perfil e os ids usados nos caminhos.
+    """
+    inicio = Veiculo.objects.count()
+    base = datetime(2025, 1, 1, 8, tzinfo=dt_timezone.utc)
+    locais = list(Local.objects.all()) or [
+        Local.internar(f"Cidade {n}") for n in range(20)
+    ]
+
+    novos = range(inicio, tamanho)
+    veiculos = Veiculo.objects.bulk_create(
+        [
+            Veiculo(
+                placa=f"ORC{i:07d}",
+                marca=f"Marca {i % 7}",
+                modelo=f"Modelo {i % 13}",
+                ano=2015 + i % 10,
+                tipo_combustivel=("FLEX", "DIESEL", "GASOLINA")[i % 3],
+                hodometro_atual=10_000 + i,
+            )
+            for i in novos
+        ],
+        batch_size=LOTE,
+    )
+    motoristas = Motorista.objects.bulk_create(
+        [
+            Motorista(
+                nome_completo=f"Motorista {i}",
+                cpf=f"{i:011d}",
+                cnh_numero=f"CNH{i:09d}",
+                cnh_categoria="B",
+                cnh_validade=date(2030, 1, 1),
+            )
+            for i in novos
+        ],
+        batch_size=LOTE,
+    )
+    VinculoVeiculoMotorista.objects.bulk_create(
+        [
+            VinculoVeiculoMotorista(veiculo=v, motorista=m, data_inicio=date(2024, 1, 1))
+            for v, m in zip(veiculos, motoristas)
+        ],
+        batch_size=LOTE,
+    )
+    manutencoes = Manutencao.objects.bulk_create(
+        [
+            Manutencao(
+                veiculo=veiculos[n],
+                data=base.date() + timedelta(days=i % 365),
+                tipo=("PREVENTIVA", "CORRETIVA")[i % 2],
+                descricao="Revisão",
+                custo=Decimal("100.00") + i % 900,
+            )
+            for n, i in enumerate(novos)
+        ],
+        batch_size=LOTE,
+    )
+    abastecimentos = Abastecimento.objects.bulk_create(
+        [
+            Abastecimento(
+                veiculo=veiculos[n],
+                data=base.date() + timedelta(days=i % 365),
+                hodometro=10_000 + i,
+                litros=Decimal("40.00"),
+                custo_total=Decimal("240.00") + i % 60,
+                tipo_combustivel=veiculos[n].tipo_combustivel,
+                media_km_l=Decimal("10.50"),
+            )
+            for n, i in enumerate(novos)
+        ],
+        batch_size=LOTE,
+    )
+    AnomaliaAbastecimento.objects.bulk_create(
+        [
+            AnomaliaAbastecimento(
+                abastecimento=a,
+                veiculo_id=a.veiculo_id,
+                tipo=TipoAnomaliaChoices.values[0],
+                valor=1.0,
+            )
+            for a in abastecimentos[::10]
+        ],
+        batch_size=LOTE,
+    )
+    viagens = Viagem.objects.bulk_create(
+        [
+            Viagem(
+                veiculo=veiculos[n],
+                motorista=motoristas[n],
+                data_hora_inicio=base + timedelta(hours=i),
+                data_hora_fim=base + timedelta(hours=i, minutes=45),
+                hodometro_saida=10_000 + i,
+                hodometro_chegada=10_050 + i,
+                origem=locais[i % len(locais)].nome,
+                destino=locais[(i + 1) % len(locais)].nome,
+                origem_local=locais[i % len(locais)],
+                destino_local=locais[(i + 1) % len(locais)],
+                status="FINALIZADA",
+            )
+            for n, i in enumerate(novos)
+        ],
+        batch_size=LOTE,
+    )
+    for modelo, objetos in (
+        (Veiculo, veiculos),
+        (Motorista, motoristas),
+        (Manutencao, manutencoes),
+        (Abastecimento, abastecimentos),
+        (Viagem, viagens),
+    ):
+        alteracoes.registrar(modelo, [o.pk for o in objetos])
+    # bulk_create não dispara os sinais que mantêm o índice de preços
+    precos.reconstruir()
+
+    gestor, _ = User.objects.get_or_create(
+        username="orcamento_gestor", defaults={"role": UserRole.MANAGER}
+    )
+    operador, criado = User.objects.get_or_create(
+        username="orcamento_operador", defaults={"role": UserRole.OPERATOR}
+    )
+    if criado:
+        Motorista.objects.filter(pk=Motorista.objects.order_by("pk").values("pk")[:1]).update(
+            user=operador
+        )
+
+    clientes = {}
+    for perfil, user in (("gestor", gestor), ("operador", operador)):
+        token = str(RefreshToken.for_user(user).access_token)
+        clientes[perfil] = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return {
+        "clientes": clientes,
+        "ids": {
+            "veiculo": Veiculo.objects.order_by("pk").values_list("pk", flat=True).first(),
+            "viagem": Viagem.objects.order_by("pk").values_list("pk", flat=True).first(),
+            "cursor": alteracoes.gerar_cursor(0),
+        },
+    }
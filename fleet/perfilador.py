@@ -0,0 +1,283 @@
+"""Perfilamento sob demanda de requisições da API (cProfile + linha do tempo SQL).
+
+Ligado por `PERFILADOR_ATIVO`. Perfila uma fração `PERFILADOR_AMOSTRA` das
+requisições em /api/ e toda requisição de um administrador que envie o
+cabeçalho `PERFILADOR_CABECALHO`. Cada perfil gera, em `PERFILADOR_DIR`:
+
+- `<id>.json`: resumo, funções mais caras e as consultas SQL em ordem;
+- `<id>.prof`: estatísticas do cProfile (pstats, snakeviz);
+- `<id>.folded`: pilhas colapsadas para flamegraph.pl, speedscope ou inferno.
+
+Só os `PERFILADOR_MAX_PERFIS` mais recentes são mantidos. O cProfile mede a
+thread da requisição; um perfil por vez por processo (os demais seguem sem
+perfil), já que a partir do Python 3.12 o profiler é global ao interpretador.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import (
+    async_to_sync,
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import UserRole
+
+PREFIXO = "/api/"
+PREFIXO_IGNORADO = "/api/_debug/"
+ID_VALIDO = re.compile(r"^\d{8}-\d{6}-\d{6}-[0-9a-f]{4}$")
+EXTENSOES = (".json", ".prof", ".folded")
+# Pilhas colapsadas: limita a profundidade e descarta ramos abaixo de 1 µs
+PROFUNDIDADE_MAX = 200
+TEMPO_MINIMO = 1e-6
+
+_em_uso = threading.Lock()
+
+
+def diretorio() -> Path:
+    return Path(getattr(settings, "PERFILADOR_DIR", settings.BASE_DIR / "perfis"))
+
+
+def _rotulo(funcao) -> str:
+    arquivo, linha, nome = funcao
+    if arquivo == "~":
+        rotulo = nome
+    else:
+        rotulo = f"{nome} ({os.path.basename(arquivo)}:{linha})"
+    return rotulo.replace(";", ",")
+
+
+def pilhas_colapsadas(stats: dict) -> dict[str, float]:
+    """Reconstrói pilhas a partir das arestas chamador→chamado do cProfile.
+
+    O cProfile guarda só o tempo de cada aresta, não a pilha inteira; o tempo
+    de uma função é repartido entre os filhos na proporção de cada aresta,
+    como fazem os conversores de pstats para flamegraph.
+    """
+    chamados = defaultdict(dict)
+    for funcao, (_cc, _nc, _tt, _ct, chamadores) in stats.items():
+        for chamador, aresta in chamadores.items():
+            chamados[chamador][funcao] = aresta[3]
+
+    pilhas = defaultdict(float)
+    pendentes = [
+        (funcao, dados[3], ()) for funcao, dados in stats.items() if not dados[4]
+    ]
+    while pendentes:
+        funcao, tempo, caminho = pendentes.pop()
+        _cc, _nc, proprio, acumulado, _chamadores = stats[funcao]
+        escala = tempo / acumulado if acumulado else 0
+        caminho = caminho + (funcao,)
+        if proprio * escala >= TEMPO_MINIMO:
+            pilhas[";".join(_rotulo(f) for f in caminho)] += proprio * escala
+        if len(caminho) >= PROFUNDIDADE_MAX:
+            continue
+        for filho, tempo_aresta in chamados.get(funcao, {}).items():
+            # Recursão: o tempo do filho já está contado no ancestral
+            if filho not in caminho and tempo_aresta * escala >= TEMPO_MINIMO:
+                pendentes.append((filho, tempo_aresta * escala, caminho))
+    return pilhas
+
+
+def _mais_caras(stats: dict, limite=25) -> list[dict]:
+    ordenadas = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "funcao": _rotulo(funcao),
+            "chamadas": nc,
+            "tempo_proprio_ms": round(tt * 1000, 3),
+            "tempo_acumulado_ms": round(ct * 1000, 3),
+        }
+        for funcao, (_cc, nc, tt, ct, _chamadores) in ordenadas[:limite]
+    ]
+
+
+class LinhaDoTempoSQL:
+    """`execute_wrapper` que anota início, duração e banco de cada consulta."""
+
+    def __init__(self, inicio: float, alias: str, consultas: list):
+        self.inicio = inicio
+        self.alias = alias
+        self.consultas = consultas
+
+    def __call__(self, execute, sql, params, many, context):
+        comeco = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            fim = time.perf_counter()
+            self.consultas.append(
+                {
+                    "inicio_ms": round((comeco - self.inicio) * 1000, 3),
+                    "duracao_ms": round((fim - comeco) * 1000, 3),
+                    "banco": self.alias,
+                    "sql": sql[:2000],
+                }
+            )
+
+
+def _remover_antigos(pasta: Path) -> None:
+    maximo = getattr(settings, "PERFILADOR_MAX_PERFIS", 200)
+    ids = sorted({arquivo.stem for arquivo in pasta.glob("*.json")})
+    for antigo in ids[: max(len(ids) - maximo, 0)]:
+        for extensao in EXTENSOES:
+            (pasta / f"{antigo}{extensao}").unlink(missing_ok=True)
+
+
+def gravar(perfil: cProfile.Profile, resumo: dict) -> str:
+    pasta = diretorio()
+    pasta.mkdir(parents=True, exist_ok=True)
+    # Ordem alfabética = ordem cronológica (listagem e retenção dependem disso)
+    id_perfil = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:4]}"
+    stats = pstats.Stats(perfil).stats
+    perfil.dump_stats(pasta / f"{id_perfil}.prof")
+    with open(pasta / f"{id_perfil}.folded", "w", encoding="utf-8") as arquivo:
+        for pilha, segundos in sorted(pilhas_colapsadas(stats).items()):
+            # Unidade: microssegundos
+            arquivo.write(f"{pilha} {max(round(segundos * 1_000_000), 1)}\n")
+    resumo = {"id": id_perfil, **resumo, "funcoes": _mais_caras(stats)}
+    # O .json é gravado por último: é ele que marca o perfil como completo
+    with open(pasta / f"{id_perfil}.json", "w", encoding="utf-8") as arquivo:
+        json.dump(resumo, arquivo, ensure_ascii=False)
+    _remover_antigos(pasta)
+    return id_perfil
+
+
+def listar() -> list[dict]:
+    """Resumos dos perfis gravados, do mais recente ao mais antigo (sem o SQL)."""
+    perfis = []
+    for caminho in sorted(diretorio().glob("*.json"), reverse=True):
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                resumo = json.load(arquivo)
+        except (OSError, ValueError):
+            continue
+        resumo.pop("sql", None)
+        resumo.pop("funcoes", None)
+        perfis.append(resumo)
+    return perfis
+
+
+def caminho(id_perfil: str, extensao: str) -> Path | None:
+    if not ID_VALIDO.match(id_perfil) or extensao not in EXTENSOES:
+        return None
+    arquivo = diretorio() / f"{id_perfil}{extensao}"
+    return arquivo if arquivo.exists() else None
+
+
+def _admin(request) -> bool:
+    """Usuário de sessão (admin do Django) ou do token JWT, sem ativar empresa."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        try:
+            autenticado = JWTAuthentication().authenticate(Request(request))
+        except Exception:
+            return False
+        user = autenticado[0] if autenticado else None
+    return bool(user is not None and getattr(user, "role", "") == UserRole.ADMIN)
+
+
+class PerfiladorMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PERFILADOR_ATIVO", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.amostra = getattr(settings, "PERFILADOR_AMOSTRA", 0.0)
+        cabecalho = getattr(settings, "PERFILADOR_CABECALHO", "X-Fleet-Profile")
+        self.cabecalho = "HTTP_" + cabecalho.upper().replace("-", "_")
+
+    def _motivo(self, request) -> str | None:
+        if not request.path.startswith(PREFIXO) or request.path.startswith(PREFIXO_IGNORADO):
+            return None
+        if request.META.get(self.cabecalho) and _admin(request):
+            return "cabecalho"
+        if self.amostra and random.random() < self.amostra:
+            return "amostra"
+        return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        motivo = self._motivo(request)
+        if motivo is None or not _em_uso.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self._perfilar(request, motivo, self.get_response)
+        finally:
+            _em_uso.release()
+
+    async def __acall__(self, request):
+        # Sem o cabeçalho, _motivo não consulta o banco e roda no próprio loop
+        if request.META.get(self.cabecalho):
+            motivo = await sync_to_async(self._motivo)(request)
+        else:
+            motivo = self._motivo(request)
+        if motivo is None or not _em_uso.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            # Perfilada, a requisição roda numa thread: views síncronas voltam
+            # para ela pelo async_to_sync, onde o cProfile e o SQL são medidos
+            return await sync_to_async(self._perfilar)(
+                request, motivo, async_to_sync(self.get_response)
+            )
+        finally:
+            _em_uso.release()
+
+    def _perfilar(self, request, motivo, get_response):
+        consultas = []
+        perfil = cProfile.Profile()
+        inicio = time.perf_counter()
+        with ExitStack() as pilha:
+            for alias in connections:
+                pilha.enter_context(
+                    connections[alias].execute_wrapper(LinhaDoTempoSQL(inicio, alias, consultas))
+                )
+            perfil.enable()
+            try:
+                response = get_response(request)
+            finally:
+                perfil.disable()
+        duracao = time.perf_counter() - inicio
+
+        user = getattr(request, "user", None)
+        id_perfil = gravar(
+            perfil,
+            {
+                "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "metodo": request.method,
+                "caminho": request.get_full_path(),
+                "status": response.status_code,
+                "usuario": user.get_username() if user and user.is_authenticated else None,
+                "motivo": motivo,
+                "duracao_ms": round(duracao * 1000, 3),
+                "consultas": len(consultas),
+                "tempo_sql_ms": round(sum(c["duracao_ms"] for c in consultas), 3),
+                "sql": consultas,
+            },
+        )
+        response["X-Fleet-Profile-Id"] = id_perfil
+        return response
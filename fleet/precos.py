@@ -0,0 +1,110 @@
+"""Índice diário de preço por litro, por combustível e por posto.
+
+Cada abastecimento soma (ou, ao ser editado/removido, subtrai) seus litros e
+seu custo em duas linhas de `IndicePrecoCombustivel`: a do posto e a do dia
+inteiro (`posto = "*"`). O preço do índice é custo_total / litros, então
+médias de qualquer período saem de somas, sem reler os abastecimentos.
+"""
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from . import cache
+from .models import Abastecimento, IndicePrecoCombustivel
+
+TODOS_POSTOS = "*"
+CAMPOS_INDICE = ("empresa_id", "data", "tipo_combustivel", "posto", "litros", "custo_total")
+# Nomes aceitos em save(update_fields=...) que mudam o índice
+CAMPOS_MODELO = {"empresa", "empresa_id", *CAMPOS_INDICE}
+
+
+def nome_posto(posto: str) -> str:
+    return " ".join((posto or "").split())[:200]
+
+
+def valores(abastecimento) -> dict:
+    return {campo: getattr(abastecimento, campo) for campo in CAMPOS_INDICE}
+
+
+def _somar(banco, chave, abastecimentos, litros, custo) -> None:
+    linhas = IndicePrecoCombustivel.todos.using(banco).filter(**chave)
+    incremento = {
+        "abastecimentos": F("abastecimentos") + abastecimentos,
+        "litros": F("litros") + litros,
+        "custo_total": F("custo_total") + custo,
+    }
+    if not linhas.update(**incremento):
+        try:
+            with transaction.atomic(using=banco):
+                IndicePrecoCombustivel.todos.using(banco).create(
+                    **chave, abastecimentos=abastecimentos, litros=litros, custo_total=custo
+                )
+        except IntegrityError:
+            # Outra escrita criou a linha do dia primeiro
+            linhas.update(**incremento)
+    if abastecimentos < 0:
+        linhas.filter(abastecimentos__lte=0).delete()
+
+
+def aplicar(banco, dados: dict, sinal: int) -> None:
+    """Soma (`sinal=1`) ou subtrai (`sinal=-1`) um abastecimento do índice."""
+    litros = Decimal(dados["litros"] or 0) * sinal
+    custo = Decimal(dados["custo_total"] or 0) * sinal
+    for posto in (nome_posto(dados["posto"]), TODOS_POSTOS):
+        chave = {
+            "empresa_id": dados["empresa_id"],
+            "data": dados["data"],
+            "tipo_combustivel": dados["tipo_combustivel"],
+            "posto": posto,
+        }
+        _somar(banco, chave, sinal, litros, custo)
+
+
+def atualizar(banco, antes: dict | None, depois: dict | None) -> None:
+    """Troca a contribuição `antes` pela `depois` (qualquer uma pode ser None)."""
+    if antes == depois:
+        return
+    with transaction.atomic(using=banco):
+        if antes is not None:
+            aplicar(banco, antes, -1)
+        if depois is not None:
+            aplicar(banco, depois, 1)
+
+
+def reconstruir(banco="default") -> int:
+    """Refaz o índice inteiro de um banco com duas agregações; retorna as linhas gravadas."""
+    abastecimentos = Abastecimento.todos.using(banco).order_by()
+    linhas = []
+    for por_posto in (True, False):
+        campos = ["empresa_id", "data", "tipo_combustivel"] + (["posto"] if por_posto else [])
+        grupos = abastecimentos.values(*campos).annotate(
+            n=Count("id"), soma_litros=Sum("litros"), soma_custo=Sum("custo_total")
+        )
+        totais: dict[tuple, list] = {}
+        for grupo in grupos:
+            posto = nome_posto(grupo["posto"]) if por_posto else TODOS_POSTOS
+            chave = (grupo["empresa_id"], grupo["data"], grupo["tipo_combustivel"], posto)
+            # Nomes de posto que só diferem em espaços caem na mesma linha
+            total = totais.setdefault(chave, [0, Decimal(0), Decimal(0)])
+            total[0] += grupo["n"]
+            total[1] += grupo["soma_litros"] or 0
+            total[2] += grupo["soma_custo"] or 0
+        linhas.extend(
+            IndicePrecoCombustivel(
+                empresa_id=empresa_id,
+                data=data,
+                tipo_combustivel=tipo,
+                posto=posto,
+                abastecimentos=n,
+                litros=litros,
+                custo_total=custo,
+            )
+            for (empresa_id, data, tipo, posto), (n, litros, custo) in totais.items()
+        )
+    with transaction.atomic(using=banco):
+        IndicePrecoCombustivel.todos.using(banco).all().delete()
+        IndicePrecoCombustivel.todos.using(banco).bulk_create(linhas, batch_size=2000)
+    cache.invalidar("custos")
+    return len(linhas)
@@ -0,0 +1,290 @@
+"""Relatórios pivô de custo e uso compilados para um único GROUP BY.
+
+Dimensões, medidas e filtros vêm de listas fechadas por fonte de dados; nada
+da requisição chega ao SQL além de valores parametrizados. No PostgreSQL e no
+MySQL os subtotais saem do próprio banco (ROLLUP); nos demais são somados em
+memória a partir das linhas agrupadas.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest, TruncMonth, TruncQuarter
+
+from .models import Abastecimento, Manutencao, Viagem
+
+AGREGACOES = ("soma", "media", "contagem")
+
+
+@dataclass(frozen=True)
+class Fonte:
+    modelo: type
+    campo_data: str
+    dimensoes: dict
+    campos: dict
+    filtros: dict = field(default_factory=dict)
+
+
+def _dimensoes_comuns(campo_data, tipo_combustivel):
+    return {
+        "veiculo": F("veiculo__placa"),
+        "marca": F("veiculo__marca"),
+        "tipo_combustivel": F(tipo_combustivel),
+        "mes": TruncMonth(campo_data),
+        "trimestre": TruncQuarter(campo_data),
+    }
+
+
+def _filtros_comuns(tipo_combustivel):
+    return {
+        "veiculo": "veiculo_id",
+        "marca": "veiculo__marca__iexact",
+        "tipo_combustivel": tipo_combustivel,
+    }
+
+
+FONTES = {
+    "manutencao": Fonte(
+        modelo=Manutencao,
+        campo_data="data",
+        dimensoes={
+            **_dimensoes_comuns("data", "veiculo__tipo_combustivel"),
+            "tipo": F("tipo"),
+        },
+        campos={"custo": F("custo")},
+        filtros={**_filtros_comuns("veiculo__tipo_combustivel"), "tipo": "tipo"},
+    ),
+    "abastecimento": Fonte(
+        modelo=Abastecimento,
+        campo_data="data",
+        dimensoes=_dimensoes_comuns("data", "tipo_combustivel"),
+        campos={"custo_total": F("custo_total"), "litros": F("litros")},
+        filtros=_filtros_comuns("tipo_combustivel"),
+    ),
+    "viagem": Fonte(
+        modelo=Viagem,
+        campo_data="data_hora_inicio",
+        dimensoes={
+            **_dimensoes_comuns("data_hora_inicio", "veiculo__tipo_combustivel"),
+            "motorista": F("motorista__nome_completo"),
+        },
+        campos={"km": Greatest(F("hodometro_chegada") - F("hodometro_saida"), 0)},
+        filtros={**_filtros_comuns("veiculo__tipo_combustivel"), "motorista": "motorista_id"},
+    ),
+}
+
+
+class ConsultaInvalida(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Consulta:
+    fonte: str
+    dimensoes: tuple
+    medidas: tuple  # (agregacao, campo)
+    filtros: tuple  # (nome, valor)
+    data_inicio: object = None
+    data_fim: object = None
+
+    def chave_cache(self) -> str:
+        bruto = json.dumps(
+            [self.fonte, self.dimensoes, self.medidas, self.filtros,
+             str(self.data_inicio), str(self.data_fim)]
+        )
+        return hashlib.sha1(bruto.encode()).hexdigest()
+
+
+def _lista(valor) -> list[str]:
+    return [item.strip() for item in (valor or "").split(",") if item.strip()]
+
+
+def interpretar(params, data_inicio=None, data_fim=None) -> Consulta:
+    """Valida a query string contra as listas permitidas e normaliza a ordem."""
+    nome_fonte = params.get("fonte", "")
+    fonte = FONTES.get(nome_fonte)
+    if fonte is None:
+        raise ConsultaInvalida(f"Fonte inválida. Use: {', '.join(FONTES)}.")
+
+    dimensoes = list(dict.fromkeys(_lista(params.get("dimensoes"))))
+    invalidas = [d for d in dimensoes if d not in fonte.dimensoes]
+    if invalidas:
+        raise ConsultaInvalida(
+            f"Dimensões inválidas: {', '.join(invalidas)}. Use: {', '.join(fonte.dimensoes)}."
+        )
+
+    medidas = set()
+    for medida in _lista(params.get("medidas")) or ["contagem"]:
+        agregacao, _, campo = medida.partition(":")
+        if agregacao == "contagem" and not campo:
+            medidas.add(("contagem", ""))
+            continue
+        if agregacao not in AGREGACOES or campo not in fonte.campos:
+            raise ConsultaInvalida(
+                f"Medida inválida: '{medida}'. Use <{'|'.join(AGREGACOES)}>:<campo> "
+                f"com campo em: {', '.join(fonte.campos)}."
+            )
+        medidas.add((agregacao, campo))
+
+    filtros = []
+    for nome in fonte.filtros:
+        valor = params.get(nome)
+        if valor:
+            filtros.append((nome, valor))
+
+    return Consulta(
+        fonte=nome_fonte,
+        dimensoes=tuple(dimensoes),
+        medidas=tuple(sorted(medidas)),
+        filtros=tuple(filtros),
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+    )
+
+
+def _nome_medida(agregacao, campo) -> str:
+    return f"{agregacao}_{campo}" if campo else agregacao
+
+
+def _agregados(consulta: Consulta, fonte: Fonte) -> dict:
+    """Média vira soma + contagem, para que os subtotais em memória fiquem exatos."""
+    agregados = {}
+    for agregacao, campo in consulta.medidas:
+        if not campo:
+            agregados["contagem"] = Count("pk")
+            continue
+        expressao = fonte.campos[campo]
+        if agregacao in ("soma", "media"):
+            agregados[f"soma_{campo}"] = Sum(expressao)
+        if agregacao in ("contagem", "media"):
+            agregados[f"contagem_{campo}"] = Count(expressao)
+    return agregados
+
+
+def montar_queryset(consulta: Consulta, queryset=None):
+    """Queryset agrupado pelas dimensões, sem ordenação, e os agregados usados."""
+    fonte = FONTES[consulta.fonte]
+    qs = fonte.modelo.objects.all() if queryset is None else queryset
+    if consulta.fonte == "viagem":
+        qs = qs.filter(data_hora_inicio__isnull=False)
+    if consulta.data_inicio:
+        qs = qs.filter(**{f"{fonte.campo_data}__date__gte": consulta.data_inicio})
+    if consulta.data_fim:
+        qs = qs.filter(**{f"{fonte.campo_data}__date__lte": consulta.data_fim})
+    qs = qs.filter(**{fonte.filtros[nome]: valor for nome, valor in consulta.filtros})
+
+    dimensoes = {f"d_{nome}": fonte.dimensoes[nome] for nome in consulta.dimensoes}
+    agregados = _agregados(consulta, fonte)
+    return qs.values(**dimensoes).annotate(**agregados).order_by(), agregados
+
+
+def _linhas_rollup(qs, chaves, colunas, vendor):
+    """ROLLUP sobre o GROUP BY do ORM, ainda em uma única consulta.
+
+    Os agregados são somas e contagens (a média é derivada depois), então os
+    subtotais podem ser somados a partir das linhas já agrupadas.
+    """
+    conexao = connections[qs.db]
+    nome = conexao.ops.quote_name
+    sql, params = qs.query.sql_with_params()
+    grupos = ", ".join(nome(c) for c in chaves)
+    agrupamento = f"ROLLUP ({grupos})" if vendor == "postgresql" else f"{grupos} WITH ROLLUP"
+    somas = ", ".join(f"SUM({nome(c)}) AS {nome(c)}" for c in colunas)
+    sql = f"SELECT {grupos}, {somas} FROM ({sql}) pivot GROUP BY {agrupamento}"
+    with conexao.cursor() as cursor:
+        cursor.execute(sql, params)
+        nomes = [coluna[0] for coluna in cursor.description]
+        return [dict(zip(nomes, linha)) for linha in cursor.fetchall()]
+
+
+def _somar(linhas, colunas) -> dict:
+    total = {}
+    for coluna in colunas:
+        valores = [linha[coluna] for linha in linhas if linha[coluna] is not None]
+        total[coluna] = sum(valores) if valores else None
+    return total
+
+
+def _linhas_subtotais_memoria(linhas, chaves, colunas):
+    """Equivalente ao ROLLUP: um subtotal por prefixo das dimensões."""
+    subtotais = []
+    for nivel in range(len(chaves) - 1, -1, -1):
+        grupos = {}
+        for linha in linhas:
+            grupos.setdefault(tuple(linha[c] for c in chaves[:nivel]), []).append(linha)
+        for prefixo, grupo in grupos.items():
+            subtotal = dict.fromkeys(chaves)
+            subtotal.update(zip(chaves[:nivel], prefixo))
+            subtotal.update(_somar(grupo, colunas))
+            subtotais.append(subtotal)
+    return subtotais
+
+
+def _rotulo(dimensao, valor):
+    if dimensao == "mes":
+        return f"{valor.year:04d}-{valor.month:02d}"
+    if dimensao == "trimestre":
+        return f"{valor.year:04d}-T{(valor.month - 1) // 3 + 1}"
+    return valor
+
+
+def _numero(valor):
+    if valor is None:
+        return None
+    return round(float(valor), 2) if isinstance(valor, Decimal) else valor
+
+
+def _formatar(linha, consulta: Consulta) -> dict:
+    resultado = {
+        dimensao: _rotulo(dimensao, linha[f"d_{dimensao}"])
+        for dimensao in consulta.dimensoes
+        if linha[f"d_{dimensao}"] is not None
+    }
+    for agregacao, campo in consulta.medidas:
+        nome = _nome_medida(agregacao, campo)
+        if agregacao == "media":
+            soma, quantidade = linha[f"soma_{campo}"], linha[f"contagem_{campo}"]
+            resultado[nome] = round(float(soma) / float(quantidade), 2) if quantidade else None
+        elif agregacao == "contagem":
+            resultado[nome] = int(linha[nome] or 0)
+        else:
+            resultado[nome] = _numero(linha[nome])
+    return resultado
+
+
+def executar(consulta: Consulta, queryset=None) -> dict:
+    qs, agregados = montar_queryset(consulta, queryset)
+    chaves = [f"d_{nome}" for nome in consulta.dimensoes]
+    vendor = connections[qs.db].vendor
+
+    if not chaves:
+        linhas, subtotais = [], [qs.aggregate(**agregados)]
+    elif vendor in ("postgresql", "mysql"):
+        todas = _linhas_rollup(qs, chaves, list(agregados), vendor)
+        linhas = [linha for linha in todas if linha[chaves[-1]] is not None]
+        subtotais = [linha for linha in todas if linha[chaves[-1]] is None]
+    else:
+        linhas = list(qs)
+        subtotais = _linhas_subtotais_memoria(linhas, chaves, list(agregados))
+
+    linhas.sort(key=lambda linha: tuple(linha[c] for c in chaves))
+    subtotais.sort(
+        key=lambda linha: (
+            -sum(linha.get(c) is not None for c in chaves),
+            tuple((linha.get(c) is None, linha.get(c) or 0) for c in chaves),
+        )
+    )
+    total = subtotais.pop(-1) if subtotais else dict.fromkeys(agregados)
+    return {
+        "fonte": consulta.fonte,
+        "dimensoes": list(consulta.dimensoes),
+        "medidas": [_nome_medida(a, c) for a, c in consulta.medidas],
+        "rollup_sql": bool(chaves) and vendor in ("postgresql", "mysql"),
+        "linhas": [_formatar(linha, consulta) for linha in linhas],
+        "subtotais": [_formatar(linha, consulta) for linha in subtotais],
+        "total": _formatar({**dict.fromkeys(chaves), **total}, consulta),
+    }
@@ -0,0 +1,174 @@
+"""Schema OpenAPI pré-calculado.
+
+O schema é gerado uma única vez (pelo comando `gerar_schema` ou no primeiro
+acesso), mantido em memória em JSON e YAML e servido com ETag. Os arquivos
+gerados levam a versão do código que os produziu (`schema.versao`); se ela não
+bate com a do processo (ex.: um release novo sem `gerar_schema`), o schema é
+refeito em memória. Em DEBUG ele também é refeito quando a configuração de
+URLs ou os módulos de views mudam.
+
+Só é importado com o drf_spectacular instalado (FleetConfig.ready).
+"""
+
+import hashlib
+import sys
+import threading
+from pathlib import Path
+
+import drf_spectacular
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+FORMATOS = {
+    "yaml": "application/vnd.oai.openapi; charset=utf-8",
+    "json": "application/vnd.oai.openapi+json; charset=utf-8",
+}
+
+
+class JWTEmpresaScheme(SimpleJWTScheme):
+    """O autenticador da API é o JWT do simplejwt (securityScheme `jwtAuth`)."""
+
+    target_class = "fleet.empresas.JWTEmpresaAuthentication"
+
+
+class SchemaPrecomputado:
+    def __init__(self, conteudos: dict[str, bytes], assinatura=None):
+        self.conteudos = conteudos
+        self.etags = {
+            formato: '"%s"' % hashlib.sha256(conteudo).hexdigest()[:32]
+            for formato, conteudo in conteudos.items()
+        }
+        self.assinatura = assinatura
+
+
+_atual: SchemaPrecomputado | None = None
+_lock = threading.Lock()
+
+
+def _diretorio() -> Path:
+    return Path(getattr(settings, "SCHEMA_DIR", settings.BASE_DIR / "openapi"))
+
+
+def gerar() -> dict[str, bytes]:
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    gerador = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = gerador.get_schema(request=None, public=True)
+    return {
+        "yaml": OpenApiYamlRenderer().render(schema, renderer_context={}),
+        "json": OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+
+def salvar(conteudos: dict[str, bytes], diretorio: Path | None = None) -> list[Path]:
+    diretorio = diretorio or _diretorio()
+    diretorio.mkdir(parents=True, exist_ok=True)
+    arquivos = []
+    for formato, conteudo in conteudos.items():
+        arquivo = diretorio / f"schema.{formato}"
+        arquivo.write_bytes(conteudo)
+        arquivos.append(arquivo)
+    # Gravada por último: arquivos de uma geração interrompida não valem
+    arquivo = diretorio / "schema.versao"
+    arquivo.write_text(versao(), encoding="utf-8")
+    arquivos.append(arquivo)
+    return arquivos
+
+
+def _carregar_arquivos(versao_atual: str, mais_novo_que: float = 0) -> dict[str, bytes] | None:
+    marcador = _diretorio() / "schema.versao"
+    if not marcador.exists() or marcador.read_text(encoding="utf-8").strip() != versao_atual:
+        return None
+    conteudos = {}
+    for formato in FORMATOS:
+        arquivo = _diretorio() / f"schema.{formato}"
+        if not arquivo.exists() or arquivo.stat().st_mtime < mais_novo_que:
+            return None
+        conteudos[formato] = arquivo.read_bytes()
+    return conteudos
+
+
+def _modulos_urls(padroes, modulos: set[str]) -> None:
+    for padrao in padroes:
+        if isinstance(padrao, URLResolver):
+            modulo = getattr(padrao.urlconf_module, "__name__", None)
+            if modulo:
+                modulos.add(modulo)
+            _modulos_urls(padrao.url_patterns, modulos)
+        elif isinstance(padrao, URLPattern):
+            view = getattr(padrao.callback, "cls", padrao.callback)
+            modulos.add(view.__module__)
+            serializer = getattr(view, "serializer_class", None)
+            if serializer is not None:
+                modulos.add(serializer.__module__)
+
+
+def _arquivos_urls() -> dict[str, Path]:
+    """Arquivos das URLconfs, views e serializers que entram no schema."""
+    modulos = {settings.ROOT_URLCONF}
+    _modulos_urls(get_resolver().url_patterns, modulos)
+    return {
+        nome: Path(sys.modules[nome].__file__)
+        for nome in sorted(modulos)
+        if getattr(sys.modules.get(nome), "__file__", None)
+    }
+
+
+def versao() -> str:
+    """Hash do código que produz o schema: muda a cada release que altera a API."""
+    resumo = hashlib.sha256(drf_spectacular.__version__.encode())
+    resumo.update(repr(getattr(settings, "SPECTACULAR_SETTINGS", {})).encode())
+    for nome, arquivo in _arquivos_urls().items():
+        resumo.update(nome.encode())
+        resumo.update(arquivo.read_bytes())
+    return resumo.hexdigest()[:32]
+
+
+def _assinatura_urls() -> tuple[int, float]:
+    mtimes = [arquivo.stat().st_mtime for arquivo in _arquivos_urls().values()]
+    return id(get_resolver()), max(mtimes, default=0)
+
+
+def obter() -> SchemaPrecomputado:
+    global _atual
+    assinatura = _assinatura_urls() if settings.DEBUG else None
+    if _atual is not None and _atual.assinatura == assinatura:
+        return _atual
+    with _lock:
+        if _atual is None or _atual.assinatura != assinatura:
+            # Arquivos de outra versão do código (ou, em DEBUG, anteriores à
+            # última mudança) são ignorados
+            conteudos = (
+                _carregar_arquivos(versao(), assinatura[1] if assinatura else 0) or gerar()
+            )
+            _atual = SchemaPrecomputado(conteudos, assinatura)
+    return _atual
+
+
+@require_safe
+def schema_view(request):
+    formato = request.GET.get("format")
+    if formato not in FORMATOS:
+        formato = "json" if "json" in request.headers.get("Accept", "") else "yaml"
+
+    schema = obter()
+    etag = schema.etags[formato]
+    if etag in request.headers.get("If-None-Match", ""):
+        resposta = HttpResponseNotModified()
+    else:
+        resposta = HttpResponse(schema.conteudos[formato], content_type=FORMATOS[formato])
+        resposta["Content-Disposition"] = f'inline; filename="schema.{formato}"'
+    resposta["ETag"] = etag
+    resposta["Vary"] = "Accept"
+    if settings.DEBUG:
+        patch_cache_control(resposta, no_cache=True)
+    else:
+        patch_cache_control(
+            resposta, public=True, max_age=getattr(settings, "SCHEMA_CACHE_MAX_AGE", 86400)
+        )
+    return resposta
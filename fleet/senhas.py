@@ -0,0 +1,111 @@
+"""Hash e verificação de senhas fora da thread da requisição.
+
+O PBKDF2 roda em um pool de threads limitado (o hashlib libera o GIL), com
+fila limitada e métricas de tempo de espera. Views assíncronas aguardam o
+resultado sem bloquear o event loop nem a thread compartilhada das views
+síncronas no ASGI.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class PBKDF2ConfiguravelHasher(PBKDF2PasswordHasher):
+    """PBKDF2 com custo definido por instalação (`SENHAS_PBKDF2_ITERACOES`).
+
+    Mantém o nome do algoritmo, então hashes existentes continuam válidos e
+    são refeitos com o novo custo no próximo login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, "SENHAS_PBKDF2_ITERACOES", PBKDF2PasswordHasher.iterations)
+
+
+class FilaSenhasCheia(Exception):
+    pass
+
+
+class ExecutorSenhas:
+    def __init__(self, max_workers: int, fila_max: int, janela_metricas: int = 1000):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="senhas")
+        self._vagas = threading.BoundedSemaphore(max_workers + fila_max)
+        self._esperas = deque(maxlen=janela_metricas)
+        self._execucoes = deque(maxlen=janela_metricas)
+        self.rejeitadas = 0
+
+    def submeter(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            self.rejeitadas += 1
+            raise FilaSenhasCheia()
+        enviado = time.perf_counter()
+
+        def executar():
+            inicio = time.perf_counter()
+            self._esperas.append(inicio - enviado)
+            try:
+                return funcao(*args)
+            finally:
+                self._execucoes.append(time.perf_counter() - inicio)
+                self._vagas.release()
+
+        return self._executor.submit(executar)
+
+    def metricas(self) -> dict:
+        def percentis(amostras):
+            ordenadas = sorted(amostras)
+            if not ordenadas:
+                return {"p50_ms": None, "p99_ms": None}
+            return {
+                "p50_ms": round(ordenadas[len(ordenadas) // 2] * 1000, 2),
+                "p99_ms": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))] * 1000, 2),
+            }
+
+        return {
+            "espera": percentis(self._esperas),
+            "execucao": percentis(self._execucoes),
+            "rejeitadas": self.rejeitadas,
+        }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def obter_executor() -> ExecutorSenhas:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ExecutorSenhas(
+                    max_workers=getattr(settings, "SENHAS_MAX_WORKERS", 4),
+                    fila_max=getattr(settings, "SENHAS_FILA_MAX", 200),
+                )
+    return _executor
+
+
+def _verificar(user, senha: str) -> bool:
+    if user is None:
+        # Mesmo custo de um usuário existente, para não revelar quais contas existem
+        make_password(senha)
+        return False
+
+    def atualizar_hash(senha_bruta):
+        user.set_password(senha_bruta)
+        user.save(update_fields=["password"])
+
+    return check_password(senha, user.password, atualizar_hash)
+
+
+async def verificar_senha(user, senha: str) -> bool:
+    return await asyncio.wrap_future(obter_executor().submeter(_verificar, user, senha))
+
+
+async def gerar_hash(senha: str) -> str:
+    return await asyncio.wrap_future(obter_executor().submeter(make_password, senha))
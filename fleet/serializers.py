@@ -1,10 +1,15 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
+from . import empresas
+from .conflitos import buscar_conflitos
 from .models import (
     Abastecimento,
+    AnomaliaAbastecimento,
     Manutencao,
     Motorista,
+    Tarefa,
     Veiculo,
     Viagem,
     VinculoVeiculoMotorista,
@@ -61,12 +66,18 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         password = validated_data.pop("password")
+        # Hash já calculado fora da thread da requisição (ver fleet.senhas)
+        password_hash = validated_data.pop("password_hash", None)
         # Campos de uso apenas na validação (e opcionais)
         validated_data.pop("cpf", None)
         validated_data.pop("manager_code", None)
         validated_data.pop("driver_code", None)
-        user = User(**validated_data)
-        user.set_password(password)
+        # Cadastro público entra na empresa padrão; outras empresas são criadas no admin
+        user = User(empresa_id=empresas.empresa_padrao(), **validated_data)
+        if password_hash:
+            user.password = password_hash
+        else:
+            user.set_password(password)
         user.save()
         return user
 
@@ -77,6 +88,9 @@ class VeiculoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Veiculo
         fields = "__all__"
+        read_only_fields = ["empresa"]
+        # Placa é única no banco inteiro, não só na empresa ativa
+        extra_kwargs = {"placa": {"validators": [UniqueValidator(Veiculo.todos.all())]}}
 
 
 class MotoristaSerializer(serializers.ModelSerializer):
@@ -85,6 +99,17 @@ class MotoristaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Motorista
         fields = "__all__"
+        read_only_fields = ["empresa"]
+        extra_kwargs = {
+            campo: {"validators": [UniqueValidator(Motorista.todos.all())]}
+            for campo in ("user", "cpf", "cnh_numero")
+        }
+
+    def validate_user(self, user):
+        ativa = empresas.atual()
+        if user is not None and ativa is not None and user.empresa_id != ativa.id:
+            raise serializers.ValidationError("Usuário de outra empresa.")
+        return user
 
 
 class VinculoVeiculoMotoristaSerializer(serializers.ModelSerializer):
@@ -94,18 +119,33 @@ class VinculoVeiculoMotoristaSerializer(serializers.ModelSerializer):
     class Meta:
         model = VinculoVeiculoMotorista
         fields = "__all__"
+        read_only_fields = ["empresa"]
+
+    @staticmethod
+    def preparar(queryset):
+        """Carrega veículo e motorista aninhados no mesmo SELECT (evita N+1)."""
+        return queryset.select_related("veiculo", "motorista")
 
 
 class ManutencaoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Manutencao
         fields = "__all__"
+        read_only_fields = ["empresa"]
 
 
 class AbastecimentoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Abastecimento
         fields = "__all__"
+        read_only_fields = ["empresa"]
+
+
+class AnomaliaAbastecimentoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnomaliaAbastecimento
+        fields = "__all__"
+        read_only_fields = ["empresa"]
 
 
 class ViagemSerializer(serializers.ModelSerializer):
@@ -114,6 +154,38 @@ class ViagemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Viagem
         fields = "__all__"
+        read_only_fields = ["empresa", "origem_local", "destino_local"]
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+
+        def valor(campo):
+            return attrs[campo] if campo in attrs else getattr(self.instance, campo, None)
+
+        inicio, fim = valor("data_hora_inicio"), valor("data_hora_fim")
+        if inicio and fim and fim <= inicio:
+            raise serializers.ValidationError(
+                {"data_hora_fim": "A data/hora de fim deve ser posterior ao início."}
+            )
+        conflitos = buscar_conflitos(
+            valor("veiculo").pk,
+            valor("motorista").pk,
+            inicio,
+            fim,
+            excluir_pk=getattr(self.instance, "pk", None),
+        )
+        mensagens = {
+            "veiculo": "Veículo já possui viagem no período (viagens {ids}).",
+            "motorista": "Motorista já possui viagem no período (viagens {ids}).",
+        }
+        if conflitos:
+            raise serializers.ValidationError(
+                {
+                    recurso: mensagens[recurso].format(ids=", ".join(map(str, ids)))
+                    for recurso, ids in conflitos.items()
+                }
+            )
+        return attrs
 
 
 class DashboardResumoSerializer(serializers.Serializer):
@@ -125,3 +197,48 @@ class DashboardResumoSerializer(serializers.Serializer):
     documentacao_vencida = serializers.IntegerField()
 
 
+class TarefaSerializer(serializers.ModelSerializer):
+    download_disponivel = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Tarefa
+        fields = [
+            "id",
+            "tipo",
+            "parametros",
+            "status",
+            "progresso",
+            "mensagem",
+            "erro",
+            "tentativas",
+            "max_tentativas",
+            "download_disponivel",
+            "criado_em",
+            "iniciado_em",
+            "concluido_em",
+            "baixado_em",
+        ]
+        read_only_fields = [f for f in fields if f not in ("tipo", "parametros")]
+
+    def get_download_disponivel(self, obj) -> bool:
+        return bool(obj.arquivo) and obj.baixado_em is None
+
+    def validate_parametros(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Informe um objeto JSON.")
+        return value
+
+    def validate(self, attrs):
+        from . import tarefas
+
+        tipo = tarefas.TIPOS.get(attrs["tipo"])
+        if tipo is None:
+            raise serializers.ValidationError(
+                {"tipo": f"Tipo inválido. Use: {', '.join(sorted(tarefas.TIPOS))}."}
+            )
+        if tipo.validar is not None:
+            try:
+                tipo.validar(attrs.get("parametros") or {})
+            except tarefas.ParametrosInvalidos as exc:
+                raise serializers.ValidationError({"parametros": str(exc)})
+        return attrs
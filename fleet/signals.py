@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import alteracoes, autocompletar, cache, consumo, precos
+from .anomalias import processar_abastecimento
+from .models import (
+    Abastecimento,
+    Manutencao,
+    Motorista,
+    OperacaoAlteracaoChoices,
+    Veiculo,
+    Viagem,
+)
+
+
+def publicar_evento_viagem(viagem) -> None:
+    from . import eventos  # carregado só na primeira escrita (ver settings.PERFIL)
+
+    evento = eventos.evento_viagem(viagem)
+    transaction.on_commit(
+        lambda: eventos.obter_barramento().publicar(evento), using=viagem._state.db
+    )
+
+
+def notificar_alteracao_viagem(viagem) -> None:
+    """Efeitos de uma escrita em Viagem feita sem save() (ex.: UPDATE condicional)."""
+    cache.invalidar("relatorios")
+    alteracoes.registrar(
+        Viagem, [viagem.pk], empresa_id=viagem.empresa_id, using=viagem._state.db
+    )
+    publicar_evento_viagem(viagem)
+
+
+@receiver([post_save, post_delete], sender=Veiculo)
+@receiver([post_save, post_delete], sender=Manutencao)
+@receiver([post_save, post_delete], sender=Abastecimento)
+@receiver([post_save, post_delete], sender=Viagem)
+def invalidar_cache_relatorios(sender, **kwargs) -> None:
+    cache.invalidar("relatorios")
+
+
+@receiver([post_save, post_delete], sender=Abastecimento)
+def invalidar_cache_custos(sender, **kwargs) -> None:
+    cache.invalidar("custos")
+
+
+@receiver([post_save, post_delete], sender=Veiculo)
+@receiver([post_save, post_delete], sender=Motorista)
+def invalidar_autocompletar(sender, update_fields=None, **kwargs) -> None:
+    if update_fields is None or autocompletar.CAMPOS_INDICE & set(update_fields):
+        cache.invalidar(autocompletar.GRUPO)
+
+
+@receiver(post_delete, sender=Abastecimento)
+def remover_do_indice_precos(sender, instance, **kwargs) -> None:
+    precos.atualizar(instance._state.db, precos.valores(instance), None)
+
+
+@receiver(post_save, sender=Viagem)
+def publicar_evento_viagem_salva(sender, instance, raw=False, **kwargs) -> None:
+    if not raw:
+        publicar_evento_viagem(instance)
+
+
+@receiver(post_save, sender=Abastecimento)
+def detectar_anomalias_abastecimento(sender, instance, created, raw=False, **kwargs) -> None:
+    if created and not raw:
+        processar_abastecimento(instance)
+
+
+@receiver(pre_save, sender=Abastecimento)
+def guardar_indice_anterior(sender, instance, raw=False, update_fields=None, **kwargs) -> None:
+    instance._indice_anterior = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & precos.CAMPOS_MODELO:
+        return
+    instance._indice_anterior = (
+        Abastecimento.todos.using(instance._state.db or "default")
+        .filter(pk=instance.pk)
+        .values(*precos.CAMPOS_INDICE)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Abastecimento)
+def atualizar_indice_precos(sender, instance, created, raw=False, **kwargs) -> None:
+    if raw:
+        return
+    antes = getattr(instance, "_indice_anterior", None)
+    if created or antes is not None:
+        precos.atualizar(instance._state.db, antes, precos.valores(instance))
+
+
+@receiver(post_delete, sender=Abastecimento)
+def recalcular_consumo_sucessor(sender, instance, **kwargs) -> None:
+    consumo.recalcular(
+        [consumo.sucessor(instance.veiculo_id, instance.data, instance.hodometro, instance.pk)]
+    )
+
+
+def registrar_alteracao_salva(sender, instance, raw=False, **kwargs) -> None:
+    if not raw:
+        alteracoes.registrar(
+            sender, [instance.pk], empresa_id=instance.empresa_id, using=instance._state.db
+        )
+
+
+def registrar_alteracao_removida(sender, instance, **kwargs) -> None:
+    alteracoes.registrar(
+        sender,
+        [instance.pk],
+        OperacaoAlteracaoChoices.REMOVIDO,
+        empresa_id=instance.empresa_id,
+        using=instance._state.db,
+        escopo=alteracoes.escopo(instance),
+    )
+
+
+for _modelo in alteracoes.MODELOS_FEED:
+    post_save.connect(registrar_alteracao_salva, sender=_modelo)
+    post_delete.connect(registrar_alteracao_removida, sender=_modelo)
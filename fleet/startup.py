@@ -0,0 +1,28 @@
+"""Pré-aquecimento de workers: executado logo após criar a aplicação WSGI/ASGI."""
+
+from django.conf import settings
+from django.urls import get_resolver, reverse
+
+
+def preaquecer() -> None:
+    if not getattr(settings, "PREAQUECER_INICIALIZACAO", False):
+        return
+
+    # Importa as views, compila as regex e monta o índice de reverse()
+    resolver = get_resolver()
+    for caminho in ("/api/veiculos/", "/api/viagens/1/", "/api/auth/token/"):
+        resolver.resolve(caminho)
+    reverse("veiculo-list")
+
+    # Autenticação JWT e caches de _meta usados na construção dos campos
+    from rest_framework.serializers import ModelSerializer
+    from rest_framework.settings import api_settings
+
+    from . import serializers
+
+    api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    api_settings.DEFAULT_RENDERER_CLASSES
+    for classe in vars(serializers).values():
+        if isinstance(classe, type) and issubclass(classe, ModelSerializer):
+            if classe is not ModelSerializer:
+                classe().fields
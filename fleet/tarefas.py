@@ -0,0 +1,352 @@
+"""Fila de tarefas em segundo plano apoiada no banco.
+
+Exportações, recálculos e backfills são enfileirados como `Tarefa` e
+executados pelo comando `executar_tarefas`. No PostgreSQL a reserva usa
+`SELECT ... FOR UPDATE SKIP LOCKED`; no SQLite, sem bloqueio de linha, um
+UPDATE condicional no status garante que só um worker leve cada tarefa.
+O resultado vai para um arquivo em `TAREFAS_DIR`, baixado uma única vez.
+"""
+
+import csv
+import io
+import threading
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import colunar, empresas
+from .models import (
+    Abastecimento,
+    Manutencao,
+    Motorista,
+    StatusTarefaChoices,
+    Tarefa,
+    Veiculo,
+    Viagem,
+)
+
+# `superusuario`: só superusuários (sem empresa) enfileiram o tipo
+TipoTarefa = namedtuple("TipoTarefa", ["executar", "validar", "superusuario"])
+
+TIPOS: dict[str, TipoTarefa] = {}
+
+
+class ParametrosInvalidos(ValueError):
+    """Erro nos parâmetros: a tarefa falha sem novas tentativas."""
+
+
+def tipo_tarefa(nome, validar=None, superusuario=False):
+    def registrar(funcao):
+        TIPOS[nome] = TipoTarefa(funcao, validar, superusuario)
+        return funcao
+
+    return registrar
+
+
+def diretorio() -> Path:
+    return Path(getattr(settings, "TAREFAS_DIR", settings.BASE_DIR / "tarefas"))
+
+
+class Execucao:
+    """Contexto entregue ao handler: parâmetros, progresso e arquivo de saída."""
+
+    def __init__(self, tarefa: Tarefa):
+        self.tarefa = tarefa
+        self.parametros = tarefa.parametros or {}
+        self.arquivo = ""
+
+    def _minha(self):
+        return Tarefa.objects.filter(
+            pk=self.tarefa.pk,
+            status=StatusTarefaChoices.EXECUTANDO,
+            worker=self.tarefa.worker,
+        )
+
+    def progresso(self, percentual, mensagem="") -> None:
+        self._minha().update(
+            progresso=max(0, min(100, int(percentual))),
+            mensagem=mensagem[:300],
+            sinal_vida_em=timezone.now(),
+        )
+
+    def caminho_saida(self, nome: str) -> Path:
+        pasta = diretorio()
+        pasta.mkdir(parents=True, exist_ok=True)
+        caminho = pasta / f"{self.tarefa.pk}-{nome}"
+        self.arquivo = str(caminho)
+        return caminho
+
+
+def _superusuario(usuario) -> bool:
+    return bool(usuario is not None and usuario.is_superuser and usuario.empresa_id is None)
+
+
+def permitido(tipo: str, usuario) -> bool:
+    definicao = TIPOS.get(tipo)
+    return definicao is None or not definicao.superusuario or _superusuario(usuario)
+
+
+@contextmanager
+def sinal_de_vida(minha):
+    """Renova `sinal_vida_em` numa thread enquanto o bloco roda.
+
+    Sem isso uma tarefa longa (um comando, por exemplo) passaria do
+    `TAREFAS_TIMEOUT_SEGUNDOS` e `recuperar_abandonadas` a executaria de novo
+    com a primeira execução ainda em andamento.
+    """
+    intervalo = getattr(settings, "TAREFAS_SINAL_VIDA_SEGUNDOS", 60)
+    parar = threading.Event()
+
+    def renovar():
+        try:
+            while not parar.wait(intervalo):
+                try:
+                    minha.update(sinal_vida_em=timezone.now())
+                except DatabaseError:
+                    # Banco indisponível por um instante: tenta no próximo intervalo
+                    pass
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=renovar, name="tarefa-sinal-de-vida", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        thread.join()
+
+
+def enfileirar(tipo: str, parametros=None, usuario=None) -> Tarefa:
+    definicao = TIPOS.get(tipo)
+    if definicao is None:
+        raise ParametrosInvalidos(f"Tipo de tarefa desconhecido. Use: {', '.join(sorted(TIPOS))}.")
+    parametros = parametros or {}
+    if definicao.validar is not None:
+        definicao.validar(parametros)
+    return Tarefa.objects.create(
+        tipo=tipo,
+        parametros=parametros,
+        criado_por=usuario,
+        max_tentativas=getattr(settings, "TAREFAS_MAX_TENTATIVAS", 3),
+    )
+
+
+def _marcar_reservada(filtro, worker, agora) -> int:
+    return filtro.update(
+        status=StatusTarefaChoices.EXECUTANDO,
+        worker=worker,
+        iniciado_em=agora,
+        sinal_vida_em=agora,
+        tentativas=F("tentativas") + 1,
+    )
+
+
+def reservar(worker: str) -> Tarefa | None:
+    agora = timezone.now()
+    pendentes = Tarefa.objects.filter(
+        status=StatusTarefaChoices.PENDENTE, disponivel_em__lte=agora
+    ).order_by("disponivel_em", "id")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = pendentes.select_for_update(skip_locked=True).values_list("pk", flat=True).first()
+            if pk is None:
+                return None
+            _marcar_reservada(Tarefa.objects.filter(pk=pk), worker, agora)
+    else:
+        for pk in pendentes.values_list("pk", flat=True)[:10]:
+            filtro = Tarefa.objects.filter(pk=pk, status=StatusTarefaChoices.PENDENTE)
+            if _marcar_reservada(filtro, worker, agora):
+                break
+        else:
+            return None
+    return Tarefa.objects.get(pk=pk)
+
+
+def executar(tarefa: Tarefa) -> None:
+    execucao = Execucao(tarefa)
+    minha = execucao._minha()
+    try:
+        definicao = TIPOS.get(tarefa.tipo)
+        if definicao is None:
+            raise ParametrosInvalidos(f"Tipo de tarefa desconhecido: {tarefa.tipo}")
+        if definicao.superusuario and not _superusuario(tarefa.criado_por):
+            raise ParametrosInvalidos("Tipo de tarefa restrito a superusuários.")
+        # A tarefa enxerga só os dados da empresa de quem a criou
+        empresa = tarefa.criado_por.empresa if tarefa.criado_por_id else None
+        if empresa is not None and empresa.em_migracao:
+            raise empresas.EmpresaIndisponivel()
+        with empresas.usar(empresa), sinal_de_vida(minha):
+            mensagem = definicao.executar(execucao) or ""
+    except Exception as exc:
+        if execucao.arquivo:
+            Path(execucao.arquivo).unlink(missing_ok=True)
+        agora = timezone.now()
+        erro = traceback.format_exc()[-5000:]
+        if isinstance(exc, ParametrosInvalidos) or tarefa.tentativas >= tarefa.max_tentativas:
+            minha.update(status=StatusTarefaChoices.FALHOU, erro=erro, concluido_em=agora)
+        else:
+            atraso = getattr(settings, "TAREFAS_BACKOFF_SEGUNDOS", 30) * 2 ** (tarefa.tentativas - 1)
+            minha.update(
+                status=StatusTarefaChoices.PENDENTE,
+                erro=erro,
+                worker="",
+                disponivel_em=agora + timedelta(seconds=atraso),
+            )
+        return
+    minha.update(
+        status=StatusTarefaChoices.CONCLUIDA,
+        progresso=100,
+        mensagem=mensagem[:300],
+        erro="",
+        arquivo=execucao.arquivo,
+        concluido_em=timezone.now(),
+    )
+
+
+def recuperar_abandonadas() -> int:
+    """Devolve à fila tarefas cujo worker parou de dar sinal de vida."""
+    limite = timezone.now() - timedelta(
+        seconds=getattr(settings, "TAREFAS_TIMEOUT_SEGUNDOS", 600)
+    )
+    abandonadas = Tarefa.objects.filter(
+        status=StatusTarefaChoices.EXECUTANDO, sinal_vida_em__lt=limite
+    )
+    falhas = abandonadas.filter(tentativas__gte=F("max_tentativas")).update(
+        status=StatusTarefaChoices.FALHOU,
+        erro="Worker interrompido durante a execução.",
+        concluido_em=timezone.now(),
+    )
+    return falhas + abandonadas.update(status=StatusTarefaChoices.PENDENTE, worker="")
+
+
+def reservar_download(tarefa: Tarefa) -> bool:
+    """Marca o arquivo como baixado; só a primeira chamada recebe True."""
+    return bool(
+        Tarefa.objects.filter(
+            pk=tarefa.pk, status=StatusTarefaChoices.CONCLUIDA, baixado_em__isnull=True
+        ).update(baixado_em=timezone.now())
+    )
+
+
+EXPORTAVEIS = {
+    "veiculo": (Veiculo, None),
+    "motorista": (Motorista, None),
+    "manutencao": (Manutencao, "data"),
+    "abastecimento": (Abastecimento, "data"),
+    "viagem": (Viagem, "data_hora_inicio__date"),
+}
+
+
+def _validar_exportacao(parametros) -> None:
+    if parametros.get("modelo") not in EXPORTAVEIS:
+        raise ParametrosInvalidos(f"Modelo inválido. Use: {', '.join(EXPORTAVEIS)}.")
+    for campo in ("data_inicio", "data_fim"):
+        valor = parametros.get(campo)
+        if valor and (not isinstance(valor, str) or parse_date(valor) is None):
+            raise ParametrosInvalidos(f"Parâmetro '{campo}' inválido. Use o formato AAAA-MM-DD.")
+
+
+def _queryset_exportacao(parametros):
+    modelo, campo_data = EXPORTAVEIS[parametros["modelo"]]
+    qs = modelo.objects.order_by("pk")
+    if campo_data:
+        if parametros.get("data_inicio"):
+            qs = qs.filter(**{f"{campo_data}__gte": parametros["data_inicio"]})
+        if parametros.get("data_fim"):
+            qs = qs.filter(**{f"{campo_data}__lte": parametros["data_fim"]})
+    return qs
+
+
+@tipo_tarefa("exportar_csv", validar=_validar_exportacao)
+def exportar_csv(execucao: Execucao) -> str:
+    _validar_exportacao(execucao.parametros)
+    qs = _queryset_exportacao(execucao.parametros)
+    campos = [campo.attname for campo in qs.model._meta.concrete_fields]
+    total = qs.count()
+    lote = 5000
+    caminho = execucao.caminho_saida(f"{execucao.parametros['modelo']}.csv")
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(campos)
+        linhas = 0
+        for linha in qs.values_list(*campos).iterator(chunk_size=lote):
+            escritor.writerow(linha)
+            linhas += 1
+            if linhas % lote == 0:
+                execucao.progresso(linhas * 100 // max(total, 1), f"{linhas}/{total} linhas")
+    return f"{linhas} linhas exportadas"
+
+
+def _validar_exportacao_colunar(parametros) -> None:
+    _validar_exportacao(parametros)
+    formato = parametros.get("formato", "parquet")
+    disponiveis = colunar.formatos_disponiveis()
+    if formato not in disponiveis:
+        raise ParametrosInvalidos(
+            f"Formato '{formato}' indisponível. Use: {', '.join(disponiveis) or 'nenhum'}."
+        )
+
+
+@tipo_tarefa("exportar_colunar", validar=_validar_exportacao_colunar)
+def exportar_colunar(execucao: Execucao) -> str:
+    _validar_exportacao_colunar(execucao.parametros)
+    qs = _queryset_exportacao(execucao.parametros)
+    formato = execucao.parametros.get("formato", "parquet")
+    total = qs.count()
+    caminho = execucao.caminho_saida(
+        f"{execucao.parametros['modelo']}.{colunar.EXTENSOES[formato]}"
+    )
+    linhas = colunar.exportar(
+        qs,
+        caminho,
+        formato,
+        progresso=lambda linhas: execucao.progresso(
+            linhas * 100 // max(total, 1), f"{linhas}/{total} linhas"
+        ),
+    )
+    return f"{linhas} linhas exportadas ({formato})"
+
+
+COMANDOS_PERMITIDOS = {
+    "auditar_conflitos",
+    "backfill_locais",
+    "detectar_anomalias",
+    "expurgar_alteracoes",
+    "recalcular_indice_precos",
+}
+
+
+def _validar_comando(parametros) -> None:
+    if parametros.get("comando") not in COMANDOS_PERMITIDOS:
+        raise ParametrosInvalidos(
+            f"Comando inválido. Use: {', '.join(sorted(COMANDOS_PERMITIDOS))}."
+        )
+    if not isinstance(parametros.get("argumentos", []), list):
+        raise ParametrosInvalidos("'argumentos' deve ser uma lista.")
+
+
+@tipo_tarefa("comando", validar=_validar_comando, superusuario=True)
+def executar_comando(execucao: Execucao) -> str:
+    """Roda um comando de manutenção; a saída vira o arquivo de resultado.
+
+    Os comandos agem sobre todas as empresas e bancos (`empresas.usar` não
+    limita um comando), por isso o tipo é restrito a superusuários.
+    """
+    _validar_comando(execucao.parametros)
+    comando = execucao.parametros["comando"]
+    saida = io.StringIO()
+    execucao.progresso(0, f"Executando {comando}")
+    call_command(comando, *map(str, execucao.parametros.get("argumentos", [])), stdout=saida)
+    execucao.caminho_saida(f"{comando}.txt").write_text(saida.getvalue(), encoding="utf-8")
+    return f"{comando} concluído"
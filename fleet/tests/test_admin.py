@@ -0,0 +1,107 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from fleet import empresas
+from fleet.models import Empresa, User, Veiculo
+from fleet.orcamento import semear
+
+# Sessão, usuário, estatística (sqlite_stat1), COUNT e a página (com
+# list_select_related); date_hierarchy acrescenta duas consultas
+CHANGELISTS = {
+    "veiculo": 5,
+    "motorista": 5,
+    "vinculoveiculomotorista": 7,
+    "manutencao": 7,
+    "abastecimento": 7,
+    "anomaliaabastecimento": 7,
+    "viagem": 7,
+}
+
+
+class ChangelistTests(TestCase):
+    """As listagens do admin fazem um número fixo de consultas, com uma ou várias páginas."""
+
+    def setUp(self):
+        admin = User.objects.create_superuser("admin", password="senha-forte-1")
+        self.client.force_login(admin)
+
+    def test_consultas_por_listagem_nao_crescem_com_os_dados(self):
+        # 150 linhas: mais que uma página (list_per_page = 100)
+        for tamanho in (5, 150):
+            semear(tamanho)
+            for modelo, consultas in CHANGELISTS.items():
+                url = f"/admin/fleet/{modelo}/"
+                with self.subTest(modelo=modelo, tamanho=tamanho):
+                    self.client.get(url)  # aquecimento (content types)
+                    with self.assertNumQueries(consultas):
+                        resposta = self.client.get(url)
+                    self.assertEqual(resposta.status_code, 200)
+
+
+@override_settings(ADMIN_CONTAGEM_ESTIMADA_LIMIAR=10)
+class ContagemEstimadaTests(TestCase):
+    """Com estatísticas (ANALYZE), a listagem sem filtro usa a estimativa e não o COUNT(*)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", slug="a")
+        outra = Empresa.objects.create(nome="B", slug="b")
+        for empresa in (cls.empresa, outra):
+            with empresas.usar(empresa):
+                for n in range(12):
+                    Veiculo.objects.create(
+                        placa=f"{empresa.slug.upper()}{n:05d}",
+                        marca="Fiat",
+                        modelo="Strada",
+                        ano=2022,
+                        tipo_combustivel="FLEX",
+                    )
+
+    def listar(self, user, **filtros):
+        self.client.force_login(user)
+        self.client.get("/admin/fleet/veiculo/")  # aquecimento
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get("/admin/fleet/veiculo/", filtros)
+        self.assertEqual(resposta.status_code, 200)
+        contou = any("COUNT(" in consulta["sql"] for consulta in consultas.captured_queries)
+        return resposta.context["cl"].result_count, contou
+
+    def analisar(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def test_sem_estatisticas_conta_exato(self):
+        admin = User.objects.create_superuser("admin", password="senha-forte-1")
+
+        self.assertEqual(self.listar(admin), (24, True))
+
+    def test_sem_filtro_usa_o_total_estimado(self):
+        admin = User.objects.create_superuser("admin", password="senha-forte-1")
+        self.analisar()
+
+        self.assertEqual(self.listar(admin), (24, False))
+
+    def test_filtro_de_empresa_conta_como_sem_filtro(self):
+        admin = User.objects.create_superuser(
+            "admin", password="senha-forte-1", empresa=self.empresa
+        )
+        self.analisar()
+
+        # Estimativa por empresa (média do índice em empresa_id), não o total da tabela
+        self.assertEqual(self.listar(admin), (12, False))
+
+    def test_busca_conta_exato(self):
+        admin = User.objects.create_superuser(
+            "admin", password="senha-forte-1", empresa=self.empresa
+        )
+        self.analisar()
+
+        self.assertEqual(self.listar(admin, q="A0000"), (10, True))
+
+    @override_settings(ADMIN_CONTAGEM_ESTIMADA_LIMIAR=100)
+    def test_abaixo_do_limiar_conta_exato(self):
+        admin = User.objects.create_superuser("admin", password="senha-forte-1")
+        self.analisar()
+
+        self.assertEqual(self.listar(admin), (24, True))
@@ -0,0 +1,164 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from fleet import alteracoes
+from fleet.models import (
+    Abastecimento,
+    AlteracaoRegistro,
+    Motorista,
+    OperacaoAlteracaoChoices,
+    User,
+    UserRole,
+    Veiculo,
+    Viagem,
+    VinculoVeiculoMotorista,
+)
+
+
+def criar_veiculo(placa="ABC1D23"):
+    return Veiculo.objects.create(
+        placa=placa, marca="Fiat", modelo="Strada", ano=2022, tipo_combustivel="FLEX"
+    )
+
+
+class RegistrarTests(TestCase):
+    def test_nova_escrita_atualiza_a_entrada_com_seq_maior(self):
+        veiculo = criar_veiculo()
+        entrada = AlteracaoRegistro.todos.get(modelo="veiculo", objeto_id=veiculo.pk)
+
+        alteracoes.registrar(Veiculo, [veiculo.pk, veiculo.pk], OperacaoAlteracaoChoices.REMOVIDO)
+
+        atualizada = AlteracaoRegistro.todos.get(modelo="veiculo", objeto_id=veiculo.pk)
+        self.assertEqual(atualizada.pk, entrada.pk)
+        self.assertGreater(atualizada.seq, entrada.seq)
+        self.assertEqual(atualizada.operacao, OperacaoAlteracaoChoices.REMOVIDO)
+
+    def test_seq_cresce_dentro_do_processo(self):
+        inicio = alteracoes.proxima_seq(3)
+        self.assertGreater(alteracoes.proxima_seq(), inicio + 2)
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("gestor", role=UserRole.MANAGER))
+
+    def _feed(self, cursor):
+        resposta = self.client.get("/api/changes/", {"since": cursor})
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def test_entradas_dentro_da_janela_ficam_para_depois(self):
+        cursor = alteracoes.gerar_cursor(0)
+        veiculo = criar_veiculo()
+
+        with override_settings(ALTERACOES_JANELA_MS=60_000):
+            dados = self._feed(cursor)
+        self.assertEqual(dados["veiculo"]["salvos"], [])
+
+        with override_settings(ALTERACOES_JANELA_MS=0):
+            dados = self._feed(dados["cursor"])
+        self.assertEqual([v["id"] for v in dados["veiculo"]["salvos"]], [veiculo.pk])
+
+    @override_settings(ALTERACOES_JANELA_MS=0)
+    def test_cursor_avanca_por_seq_e_id(self):
+        primeiro, segundo = criar_veiculo("AAA1A11"), criar_veiculo("BBB2B22")
+
+        pagina = self.client.get(
+            "/api/changes/", {"since": alteracoes.gerar_cursor(0), "limit": 1}
+        ).json()
+        self.assertTrue(pagina["mais"])
+        self.assertEqual([v["id"] for v in pagina["veiculo"]["salvos"]], [primeiro.pk])
+
+        pagina = self._feed(pagina["cursor"])
+        self.assertEqual([v["id"] for v in pagina["veiculo"]["salvos"]], [segundo.pk])
+        self.assertEqual(self._feed(pagina["cursor"])["veiculo"]["salvos"], [])
+
+    def test_cursor_da_versao_anterior_expira(self):
+        from django.core import signing
+
+        antigo = signing.dumps({"s": 10, "t": 2_000_000_000}, salt=alteracoes._SALT_CURSOR)
+        self.assertEqual(self.client.get("/api/changes/", {"since": antigo}).status_code, 410)
+
+
+@override_settings(ALTERACOES_JANELA_MS=0)
+class RemocoesEscopoTests(TestCase):
+    """O OPERATOR só recebe remoções de registros que poderia ver."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operador = User.objects.create_user("operador", role=UserRole.OPERATOR)
+        cls.frota = {}
+        for n, user in enumerate((cls.operador, None)):
+            veiculo = criar_veiculo(f"ABC1D2{n}")
+            motorista = Motorista.objects.create(
+                nome_completo=f"Motorista {n}",
+                cpf=f"1234567890{n}",
+                cnh_numero=f"CNH{n}",
+                cnh_categoria="B",
+                cnh_validade=date(2030, 1, 1),
+                user=user,
+            )
+            VinculoVeiculoMotorista.objects.create(
+                veiculo=veiculo, motorista=motorista, data_inicio=date(2024, 1, 1)
+            )
+            cls.frota[n] = {
+                "veiculo": veiculo,
+                "motorista": motorista,
+                "viagem": Viagem.objects.create(
+                    veiculo=veiculo, motorista=motorista, origem="A", destino="B"
+                ),
+                "abastecimento": Abastecimento.objects.create(
+                    veiculo=veiculo,
+                    data=date(2025, 3, 10),
+                    hodometro=1000,
+                    litros=Decimal("40"),
+                    custo_total=Decimal("240"),
+                    tipo_combustivel="FLEX",
+                ),
+            }
+
+    def remover_e_ler(self, user):
+        cursor = alteracoes.gerar_cursor(alteracoes.seq_assentada())
+        removidos = {}
+        for n, registros in self.frota.items():
+            for nome in ("viagem", "abastecimento"):
+                removidos.setdefault(nome, {})[n] = registros[nome].pk
+                registros[nome].delete()
+        removidos["motorista"] = self.frota[1]["motorista"].pk
+        self.frota[1]["motorista"].delete()
+
+        client = APIClient()
+        client.force_authenticate(user)
+        resposta = client.get("/api/changes/", {"since": cursor})
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json(), removidos
+
+    def test_operador_recebe_so_as_proprias_remocoes(self):
+        dados, removidos = self.remover_e_ler(self.operador)
+
+        self.assertEqual(dados["viagem"]["removidos"], [removidos["viagem"][0]])
+        self.assertEqual(dados["abastecimento"]["removidos"], [removidos["abastecimento"][0]])
+        self.assertEqual(dados["motorista"]["removidos"], [])
+
+    def test_operador_sem_motorista_nao_recebe_remocoes(self):
+        avulso = User.objects.create_user("avulso", role=UserRole.OPERATOR)
+
+        dados, _removidos = self.remover_e_ler(avulso)
+
+        for nome in ("viagem", "abastecimento", "motorista"):
+            self.assertEqual(dados[nome]["removidos"], [])
+
+    def test_gestor_recebe_todas_as_remocoes(self):
+        gestor = User.objects.create_user("gestor", role=UserRole.MANAGER)
+
+        dados, removidos = self.remover_e_ler(gestor)
+
+        self.assertCountEqual(dados["viagem"]["removidos"], removidos["viagem"].values())
+        self.assertCountEqual(
+            dados["abastecimento"]["removidos"], removidos["abastecimento"].values()
+        )
+        self.assertEqual(dados["motorista"]["removidos"], [removidos["motorista"]])
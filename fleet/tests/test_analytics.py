@@ -0,0 +1,178 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from fleet.models import Abastecimento, Motorista, User, UserRole, Veiculo, Viagem
+
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+
+class AnalyticsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.gestor = User.objects.create_user("gestor", role=UserRole.MANAGER)
+        cls.veiculo = Veiculo.objects.create(
+            placa="ABC1D23", marca="Fiat", modelo="Strada", ano=2022, tipo_combustivel="FLEX"
+        )
+        cls.motorista = Motorista.objects.create(
+            nome_completo="Ana Souza",
+            cpf="12345678901",
+            cnh_numero="CNH123",
+            cnh_categoria="B",
+            cnh_validade=date(2030, 1, 1),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gestor)
+
+    def criar_viagem(self, inicio, km=10, origem="A", destino="B"):
+        return Viagem.objects.create(
+            veiculo=self.veiculo,
+            motorista=self.motorista,
+            data_hora_inicio=inicio,
+            data_hora_fim=inicio,
+            hodometro_saida=1000,
+            hodometro_chegada=1000 + km,
+            origem=origem,
+            destino=destino,
+            status="FINALIZADA",
+        )
+
+
+class RankingMotoristasTests(AnalyticsTestCase):
+    def test_periodo_inclui_o_dia_inteiro_no_fuso_local(self):
+        self.criar_viagem(datetime(2025, 3, 9, 23, 59, tzinfo=FUSO), km=10)
+        self.criar_viagem(datetime(2025, 3, 10, 0, 0, tzinfo=FUSO), km=20)
+        self.criar_viagem(datetime(2025, 3, 10, 23, 59, tzinfo=FUSO), km=40)
+        self.criar_viagem(datetime(2025, 3, 11, 0, 0, tzinfo=FUSO), km=80)
+
+        resposta = self.client.get(
+            "/api/analytics/motoristas/", {"data_inicio": "2025-03-10", "data_fim": "2025-03-10"}
+        )
+
+        self.assertEqual(resposta.status_code, 200)
+        [linha] = resposta.json()
+        self.assertEqual((linha["viagens"], linha["km_total"]), (2, 60))
+
+    def test_abastecimento_invalida_a_eficiencia(self):
+        self.criar_viagem(datetime(2025, 3, 10, 8, tzinfo=FUSO))
+        [linha] = self.client.get("/api/analytics/motoristas/").json()
+        self.assertIsNone(linha["eficiencia_km_l"])
+
+        # A média do segundo abastecimento vem do trecho desde o primeiro (500 km / 40 l)
+        for dia, hodometro in ((9, 1000), (10, 1500)):
+            Abastecimento.objects.create(
+                veiculo=self.veiculo,
+                data=date(2025, 3, dia),
+                hodometro=hodometro,
+                litros=Decimal("40"),
+                custo_total=Decimal("240"),
+                tipo_combustivel="FLEX",
+            )
+        [linha] = self.client.get("/api/analytics/motoristas/").json()
+        self.assertEqual(linha["eficiencia_km_l"], 12.5)
+
+
+class OrdenacaoRankingTests(AnalyticsTestCase):
+    """Ana: 2 viagens de duração zero; Bruno: a viagem mais longa, sem consumo;
+    Carla: viagem sem fim (duração nula). Ana e Carla usam o veículo com 12,5 km/l."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        sem_consumo = Veiculo.objects.create(
+            placa="XYZ9K87", marca="VW", modelo="Saveiro", ano=2021, tipo_combustivel="FLEX"
+        )
+        for dia, hodometro in ((1, 1000), (2, 1500)):
+            Abastecimento.objects.create(
+                veiculo=cls.veiculo,
+                data=date(2025, 3, dia),
+                hodometro=hodometro,
+                litros=Decimal("40"),
+                custo_total=Decimal("240"),
+                tipo_combustivel="FLEX",
+            )
+        inicio = datetime(2025, 3, 10, 8, tzinfo=FUSO)
+        motoristas = {}
+        for n, nome in enumerate(("Bruno Lima", "Carla Dias")):
+            motoristas[nome] = Motorista.objects.create(
+                nome_completo=nome,
+                cpf=f"9876543210{n}",
+                cnh_numero=f"CNH9{n}",
+                cnh_categoria="B",
+                cnh_validade=date(2030, 1, 1),
+            )
+        viagens = [
+            (cls.motorista, cls.veiculo, inicio, 10),
+            (cls.motorista, cls.veiculo, inicio, 10),
+            (motoristas["Bruno Lima"], sem_consumo, inicio + timedelta(hours=1), 50),
+            (motoristas["Carla Dias"], cls.veiculo, None, None),
+        ]
+        for motorista, veiculo, fim, km in viagens:
+            Viagem.objects.create(
+                veiculo=veiculo,
+                motorista=motorista,
+                data_hora_inicio=inicio,
+                data_hora_fim=fim,
+                hodometro_saida=1000,
+                hodometro_chegada=1000 + km if km is not None else 0,
+                origem="A",
+                destino="B",
+                status="FINALIZADA" if fim else "EM_ANDAMENTO",
+            )
+
+    def ranking(self, ordenar):
+        resposta = self.client.get("/api/analytics/motoristas/", {"ordenar": ordenar})
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def test_cada_ordenacao(self):
+        esperado = {
+            "viagens": ["Ana Souza", "Bruno Lima", "Carla Dias"],
+            "km": ["Bruno Lima", "Ana Souza", "Carla Dias"],
+            "duracao": ["Bruno Lima", "Ana Souza", "Carla Dias"],
+            "eficiencia": ["Ana Souza", "Carla Dias", "Bruno Lima"],
+        }
+        for ordenar, nomes in esperado.items():
+            with self.subTest(ordenar=ordenar):
+                self.assertEqual([linha["nome"] for linha in self.ranking(ordenar)], nomes)
+
+    def test_valores(self):
+        linhas = {linha["nome"]: linha for linha in self.ranking("duracao")}
+
+        self.assertEqual(
+            {nome: (l["viagens"], l["km_total"]) for nome, l in linhas.items()},
+            {"Ana Souza": (2, 20), "Bruno Lima": (1, 50), "Carla Dias": (1, 0)},
+        )
+        self.assertEqual(linhas["Ana Souza"]["duracao_media_min"], 0)
+        self.assertEqual(linhas["Bruno Lima"]["duracao_media_min"], 60)
+        self.assertIsNone(linhas["Carla Dias"]["duracao_media_min"])
+        self.assertEqual(linhas["Ana Souza"]["eficiencia_km_l"], 12.5)
+        self.assertIsNone(linhas["Bruno Lima"]["eficiencia_km_l"])
+
+    def test_ordenacao_invalida(self):
+        resposta = self.client.get("/api/analytics/motoristas/", {"ordenar": "nome"})
+
+        self.assertEqual(resposta.status_code, 400)
+
+
+class RotasTests(AnalyticsTestCase):
+    def test_periodo_inclui_o_dia_inteiro_no_fuso_local(self):
+        rota = {"origem": "Campinas", "destino": "Santos"}
+        self.criar_viagem(datetime(2025, 3, 9, 23, 59, tzinfo=FUSO), **rota)
+        self.criar_viagem(datetime(2025, 3, 10, 0, 0, tzinfo=FUSO), **rota)
+        self.criar_viagem(datetime(2025, 3, 10, 23, 59, tzinfo=FUSO), **rota)
+        self.criar_viagem(datetime(2025, 3, 11, 0, 0, tzinfo=FUSO), **rota)
+
+        resposta = self.client.get(
+            "/api/analytics/rotas/", {"data_inicio": "2025-03-10", "data_fim": "2025-03-10"}
+        )
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()["total_viagens"], 2)
+        [linha] = resposta.json()["rotas"]
+        self.assertEqual((linha["origem"], linha["destino"]), ("Campinas", "Santos"))
@@ -0,0 +1,161 @@
+import importlib.util
+import sys
+import tempfile
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from fleet import colunar
+from fleet.models import Abastecimento, Motorista, Veiculo, Viagem
+
+TEM_PYARROW = importlib.util.find_spec("pyarrow") is not None
+TEM_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+class ExportacaoColunarTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        veiculo = Veiculo.objects.create(
+            placa="ABC1D23", marca="Fiat", modelo="Strada", ano=2022, tipo_combustivel="FLEX"
+        )
+        motorista = Motorista.objects.create(
+            nome_completo="Ana Souza",
+            cpf="12345678901",
+            cnh_numero="CNH123",
+            cnh_categoria="B",
+            cnh_validade=date(2030, 1, 1),
+        )
+        # O primeiro abastecimento fica sem média (media_km_l nulo); o segundo tem 12,50
+        for dia, hodometro, litros in ((9, 1000, "40.00"), (10, 1500, "40.00"), (11, 1900, "33.33")):
+            Abastecimento.objects.create(
+                veiculo=veiculo,
+                data=date(2025, 3, dia),
+                hodometro=hodometro,
+                litros=Decimal(litros),
+                custo_total=Decimal("240.10"),
+                tipo_combustivel="FLEX",
+            )
+        # Uma viagem iniciada (data/hora e locais preenchidos) e outra não
+        Viagem.objects.create(
+            veiculo=veiculo,
+            motorista=motorista,
+            origem="Campinas",
+            destino="Santos",
+            data_hora_inicio=datetime(2025, 3, 10, 11, 30, 15, 123456, tzinfo=timezone.utc),
+        )
+        Viagem.objects.create(veiculo=veiculo, motorista=motorista, origem="", destino="")
+
+    def exportar(self, queryset, formato, lote=2):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        caminho = Path(pasta.name) / f"saida.{colunar.EXTENSOES[formato]}"
+        # Lote menor que a tabela: vários record batches / row groups / blocos
+        linhas = colunar.exportar(queryset.order_by("pk"), caminho, formato, lote=lote)
+        return caminho, linhas
+
+    def assertReleitura(self, caminho, formato, queryset):
+        colunas, lidas = colunar.ler_linhas(caminho, formato)
+        nomes = [c["nome"] for c in colunas]
+        originais = list(queryset.order_by("pk").values_list(*nomes))
+        self.assertEqual(lidas, originais)
+        for original, lida in zip(originais, lidas):
+            self.assertEqual([type(v) for v in lida], [type(v) for v in original])
+
+
+@skipUnless(TEM_PYARROW, "pyarrow não instalado")
+class ArrowParquetTests(ExportacaoColunarTestCase):
+    def tabela(self, caminho, formato):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if formato == "parquet":
+            return pq.read_table(caminho)
+        with pa.memory_map(str(caminho)) as origem:
+            return pa.ipc.open_file(origem).read_all()
+
+    def test_tipos_e_linhas(self):
+        import pyarrow as pa
+
+        for formato in ("parquet", "arrow"):
+            with self.subTest(formato=formato):
+                caminho, linhas = self.exportar(Abastecimento.objects.all(), formato)
+                tabela = self.tabela(caminho, formato)
+                self.assertEqual((linhas, tabela.num_rows), (3, 3))
+                self.assertEqual(tabela.schema.field("litros").type, pa.decimal128(10, 2))
+                self.assertEqual(tabela.schema.field("veiculo_id").type, pa.int64())
+                self.assertEqual(tabela.schema.field("data").type, pa.date32())
+                media = tabela.schema.field("media_km_l")
+                self.assertTrue(media.nullable)
+                self.assertEqual(tabela.column("media_km_l").null_count, 1)
+                self.assertEqual(tabela.column("litros").to_pylist()[2], Decimal("33.33"))
+                self.assertReleitura(caminho, formato, Abastecimento.objects.all())
+
+                caminho, linhas = self.exportar(Viagem.objects.all(), formato)
+                tabela = self.tabela(caminho, formato)
+                self.assertEqual((linhas, tabela.num_rows), (2, 2))
+                inicio = tabela.schema.field("data_hora_inicio").type
+                self.assertEqual(inicio, pa.timestamp("us", tz="UTC"))
+                self.assertEqual(tabela.schema.field("origem_local_id").type, pa.int64())
+                self.assertEqual(tabela.column("origem_local_id").null_count, 1)
+                self.assertReleitura(caminho, formato, Viagem.objects.all())
+
+
+@skipUnless(TEM_NUMPY, "numpy não instalado")
+class NpzTests(ExportacaoColunarTestCase):
+    def test_tipos_e_linhas(self):
+        import numpy as np
+
+        caminho, linhas = self.exportar(Abastecimento.objects.all(), "npz")
+        _colunas, dados = colunar.ler_npz(caminho)
+        self.assertEqual(linhas, 3)
+        self.assertEqual(len(dados["litros"]), 3)
+        # Decimais: inteiros escalados por 10**casas
+        self.assertEqual(dados["litros"].dtype, np.int64)
+        self.assertEqual(dados["litros"].tolist(), [4000, 4000, 3333])
+        self.assertEqual(dados["data"].dtype, np.dtype("datetime64[D]"))
+        self.assertEqual(dados["media_km_l.nulo"].tolist(), [True, False, False])
+        self.assertReleitura(caminho, "npz", Abastecimento.objects.all())
+
+        caminho, linhas = self.exportar(Viagem.objects.all(), "npz")
+        _colunas, dados = colunar.ler_npz(caminho)
+        self.assertEqual((linhas, len(dados["id"])), (2, 2))
+        self.assertEqual(dados["data_hora_inicio"].dtype, np.dtype("datetime64[us]"))
+        self.assertEqual(dados["origem_local_id"].dtype, np.int64)
+        self.assertEqual(dados["origem_local_id.nulo"].tolist(), [False, True])
+        self.assertReleitura(caminho, "npz", Viagem.objects.all())
+
+
+class ComandoExportarColunarTests(ExportacaoColunarTestCase):
+    def executar(self, formato):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        saida = StringIO()
+        call_command(
+            "exportar_colunar",
+            "abastecimento",
+            str(Path(pasta.name) / "saida"),
+            formato=formato,
+            verificar=True,
+            stdout=saida,
+        )
+        return saida.getvalue()
+
+    @skipUnless(TEM_PYARROW, "pyarrow não instalado")
+    def test_verifica_a_releitura(self):
+        self.assertIn("conferidos em 3 linhas", self.executar("parquet"))
+
+    def test_sem_pyarrow_recusa_parquet_e_arrow(self):
+        # None em sys.modules faz `import pyarrow` lançar ImportError
+        with mock.patch.dict(sys.modules, {"pyarrow": None}):
+            self.assertNotIn("parquet", colunar.formatos_disponiveis())
+            for formato in ("parquet", "arrow"):
+                with self.subTest(formato=formato):
+                    with self.assertRaisesMessage(CommandError, "instale pyarrow"):
+                        self.executar(formato)
+            if TEM_NUMPY:
+                self.assertIn("conferidos em 3 linhas", self.executar("npz"))
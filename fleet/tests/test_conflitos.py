@@ -0,0 +1,178 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from fleet.conflitos import auditar, buscar_conflitos, sem_conflito_ao_iniciar
+from fleet.models import Motorista, User, UserRole, Veiculo, Viagem
+
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+
+def hora(dia, horas, minutos=0):
+    return datetime(2025, 3, dia, horas, minutos, tzinfo=FUSO)
+
+
+class ConflitosTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veiculo_a, cls.veiculo_b, cls.veiculo_c = (
+            Veiculo.objects.create(
+                placa=placa, marca="Fiat", modelo="Strada", ano=2022, tipo_combustivel="FLEX"
+            )
+            for placa in ("AAA1A11", "BBB2B22", "CCC3C33")
+        )
+        cls.motorista_x, cls.motorista_y, cls.motorista_z = (
+            Motorista.objects.create(
+                nome_completo=nome,
+                cpf=cpf,
+                cnh_numero=f"CNH{cpf}",
+                cnh_categoria="B",
+                cnh_validade=date(2030, 1, 1),
+            )
+            for nome, cpf in (
+                ("Ana", "11111111111"),
+                ("Bia", "22222222222"),
+                ("Caio", "33333333333"),
+            )
+        )
+
+    @staticmethod
+    def viagem(veiculo, motorista, inicio=None, fim=None):
+        return Viagem.objects.create(
+            veiculo=veiculo,
+            motorista=motorista,
+            origem="A",
+            destino="B",
+            data_hora_inicio=inicio,
+            data_hora_fim=fim,
+        )
+
+
+class AuditoriaTests(ConflitosTestCase):
+    """Varredura por veículo e por motorista; intervalos semiabertos [inicio, fim)."""
+
+    def setUp(self):
+        self.v1 = self.viagem(self.veiculo_a, self.motorista_x, hora(10, 8), hora(10, 10))
+        self.v2 = self.viagem(self.veiculo_a, self.motorista_y, hora(10, 9), hora(10, 11))
+        # Começa quando a v2 termina: encostar não é sobrepor
+        self.v3 = self.viagem(self.veiculo_a, self.motorista_x, hora(10, 11), hora(10, 12))
+        # Em andamento: aberta até o infinito
+        self.v4 = self.viagem(self.veiculo_b, self.motorista_x, hora(10, 11, 30))
+        self.v5 = self.viagem(self.veiculo_b, self.motorista_y, hora(10, 15), hora(10, 16))
+        self.nao_iniciada = self.viagem(self.veiculo_b, self.motorista_z)
+
+    def test_encontra_os_pares_sobrepostos(self):
+        relatorio = auditar()
+
+        self.assertEqual(
+            relatorio["veiculo"],
+            {
+                "total": 2,
+                "pares": [
+                    {"veiculo": self.veiculo_a.pk, "viagem_a": self.v1.pk, "viagem_b": self.v2.pk},
+                    {"veiculo": self.veiculo_b.pk, "viagem_a": self.v4.pk, "viagem_b": self.v5.pk},
+                ],
+            },
+        )
+        self.assertEqual(
+            relatorio["motorista"],
+            {
+                "total": 1,
+                "pares": [
+                    {
+                        "motorista": self.motorista_x.pk,
+                        "viagem_a": self.v3.pk,
+                        "viagem_b": self.v4.pk,
+                    }
+                ],
+            },
+        )
+
+    def test_limite_trunca_os_pares_mas_nao_o_total(self):
+        self.viagem(self.veiculo_a, self.motorista_z, hora(10, 9, 30), hora(10, 9, 45))
+
+        relatorio = auditar(limite=1)
+
+        self.assertEqual(relatorio["veiculo"]["total"], 4)
+        self.assertEqual(len(relatorio["veiculo"]["pares"]), 1)
+
+    def test_buscar_conflitos(self):
+        conflitos = buscar_conflitos(
+            self.veiculo_a.pk, self.motorista_x.pk, hora(10, 10, 30), hora(10, 11, 30)
+        )
+
+        self.assertCountEqual(conflitos["veiculo"], [self.v2.pk, self.v3.pk])
+        # A v4 começa exatamente no fim do intervalo pedido
+        self.assertEqual(conflitos["motorista"], [self.v3.pk])
+
+    def test_buscar_conflitos_exclui_a_propria_viagem(self):
+        conflitos = buscar_conflitos(
+            self.veiculo_a.pk,
+            self.motorista_z.pk,
+            hora(10, 11),
+            hora(10, 12),
+            excluir_pk=self.v3.pk,
+        )
+
+        self.assertEqual(conflitos, {})
+        self.assertEqual(buscar_conflitos(self.veiculo_a.pk, self.motorista_x.pk, None, None), {})
+
+    def test_sem_conflito_ao_iniciar(self):
+        livre = self.viagem(self.veiculo_c, self.motorista_z)
+
+        def pode_iniciar(viagem):
+            condicao = sem_conflito_ao_iniciar(hora(10, 17))
+            return Viagem.objects.filter(condicao, pk=viagem.pk).exists()
+
+        # A v4 segue em andamento no veículo B
+        self.assertFalse(pode_iniciar(self.nao_iniciada))
+        self.assertTrue(pode_iniciar(livre))
+
+
+class ConflitosViewTests(ConflitosTestCase):
+    """O período da auditoria usa limites de data/hora no fuso atual."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.gestor = User.objects.create_user("gestor", role=UserRole.MANAGER)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gestor)
+        # 23h em São Paulo já é o dia seguinte em UTC
+        self.tarde_a = self.viagem(self.veiculo_a, self.motorista_x, hora(10, 23), hora(10, 23, 30))
+        self.tarde_b = self.viagem(
+            self.veiculo_a, self.motorista_y, hora(10, 23, 15), hora(10, 23, 45)
+        )
+        self.seguinte_a = self.viagem(self.veiculo_b, self.motorista_x, hora(11, 0), hora(11, 1))
+        self.seguinte_b = self.viagem(
+            self.veiculo_b, self.motorista_y, hora(11, 0, 30), hora(11, 2)
+        )
+
+    def pares(self, **periodo):
+        resposta = self.client.get("/api/viagens/conflitos/", periodo)
+        self.assertEqual(resposta.status_code, 200)
+        return [(par["viagem_a"], par["viagem_b"]) for par in resposta.data["veiculo"]["pares"]]
+
+    def test_periodo_inclui_o_dia_inteiro(self):
+        self.assertEqual(
+            self.pares(data_inicio="2025-03-10", data_fim="2025-03-10"),
+            [(self.tarde_a.pk, self.tarde_b.pk)],
+        )
+        self.assertEqual(
+            self.pares(data_inicio="2025-03-11"), [(self.seguinte_a.pk, self.seguinte_b.pk)]
+        )
+
+    def test_viagem_em_andamento_entra_em_qualquer_periodo_posterior(self):
+        self.viagem(self.veiculo_c, self.motorista_z, hora(1, 8))
+        self.viagem(self.veiculo_c, self.motorista_y, hora(20, 8), hora(20, 9))
+
+        self.assertEqual(len(self.pares(data_inicio="2025-03-20", data_fim="2025-03-20")), 1)
+
+    def test_data_invalida(self):
+        resposta = self.client.get("/api/viagens/conflitos/", {"data_inicio": "10/03/2025"})
+
+        self.assertEqual(resposta.status_code, 400)
@@ -0,0 +1,109 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from fleet.models import Abastecimento, Veiculo
+
+
+class ConsumoTestCase(TestCase):
+    """Histórico inicial (40 l cada): dia 1 a 1000 km, dia 3 a 1500, dia 5 a 2000."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.veiculo = cls.criar_veiculo("ABC1D23")
+        cls.outro = cls.criar_veiculo("XYZ9K87")
+
+    @staticmethod
+    def criar_veiculo(placa):
+        return Veiculo.objects.create(
+            placa=placa, marca="Fiat", modelo="Strada", ano=2022, tipo_combustivel="FLEX"
+        )
+
+    def setUp(self):
+        self.dia1, self.dia3, self.dia5 = (
+            self.abastecer(dia, hodometro) for dia, hodometro in ((1, 1000), (3, 1500), (5, 2000))
+        )
+
+    def abastecer(self, dia, hodometro, litros="40", veiculo=None):
+        return Abastecimento.objects.create(
+            veiculo=veiculo or self.veiculo,
+            data=date(2025, 3, dia),
+            hodometro=hodometro,
+            litros=Decimal(litros),
+            custo_total=Decimal("240"),
+            tipo_combustivel="FLEX",
+        )
+
+    def medias(self, veiculo=None):
+        return list(
+            Abastecimento.objects.filter(veiculo=veiculo or self.veiculo)
+            .order_by("data", "hodometro", "pk")
+            .values_list("media_km_l", flat=True)
+        )
+
+
+class ConsumoIncrementalTests(ConsumoTestCase):
+    """A média do abastecimento e a do sucessor acompanham cada escrita."""
+
+    def test_historico_inicial(self):
+        self.assertEqual(self.medias(), [None, Decimal("12.50"), Decimal("12.50")])
+
+    def test_insercao_retroativa_recalcula_o_sucessor(self):
+        self.abastecer(2, 1200, litros="20")
+
+        # 200 km / 20 l e, no sucessor, 300 km / 40 l
+        self.assertEqual(
+            self.medias(), [None, Decimal("10.00"), Decimal("7.50"), Decimal("12.50")]
+        )
+
+    def test_remocao_recalcula_o_sucessor(self):
+        self.dia3.delete()
+
+        self.assertEqual(self.medias(), [None, Decimal("25.00")])
+
+    def test_edicao_do_hodometro(self):
+        self.dia3.hodometro = 1600
+        self.dia3.save(update_fields=["hodometro"])
+
+        self.assertEqual(self.medias(), [None, Decimal("15.00"), Decimal("10.00")])
+
+    def test_troca_de_veiculo_recalcula_as_duas_series(self):
+        self.abastecer(2, 5000, veiculo=self.outro)
+        self.abastecer(4, 5400, veiculo=self.outro)
+
+        self.dia3.veiculo = self.outro
+        self.dia3.hodometro = 5200
+        self.dia3.save()
+
+        self.assertEqual(self.medias(), [None, Decimal("25.00")])
+        self.assertEqual(self.medias(self.outro), [None, Decimal("5.00"), Decimal("5.00")])
+
+
+class RecalcularConsumoComandoTests(ConsumoTestCase):
+    def recalcular(self, *argumentos):
+        saida = StringIO()
+        call_command("recalcular_consumo", *argumentos, stdout=saida)
+        return saida.getvalue()
+
+    def test_corrige_medias_do_banco_informado(self):
+        Abastecimento.objects.update(media_km_l=Decimal("1.00"))
+
+        saida = self.recalcular("--banco", "default", "--veiculos-por-lote", "1")
+
+        self.assertIn("3 abastecimentos verificados, 3 médias corrigidas", saida)
+        self.assertEqual(self.medias(), [None, Decimal("12.50"), Decimal("12.50")])
+
+    def test_dry_run_nao_grava(self):
+        Abastecimento.objects.update(media_km_l=None)
+
+        saida = self.recalcular("--dry-run")
+
+        self.assertIn("2 médias corrigidas", saida)
+        self.assertEqual(self.medias(), [None, None, None])
+
+    def test_banco_inexistente(self):
+        with self.assertRaises(CommandError):
+            self.recalcular("--banco", "nao_existe")
@@ -0,0 +1,90 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from fleet.models import (
+    Abastecimento,
+    Motorista,
+    User,
+    UserRole,
+    Veiculo,
+    Viagem,
+    VinculoVeiculoMotorista,
+)
+
+
+class EscopoOperadorTests(TestCase):
+    """OPERATOR vê só o que é do seu motorista; ADMIN e MANAGER veem a empresa toda."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operador = User.objects.create_user("operador", role=UserRole.OPERATOR)
+        cls.frota = {}
+        for n, user in enumerate((cls.operador, None)):
+            veiculo = Veiculo.objects.create(
+                placa=f"ABC1D2{n}", marca="Fiat", modelo="Strada", ano=2022, tipo_combustivel="FLEX"
+            )
+            motorista = Motorista.objects.create(
+                nome_completo=f"Motorista {n}",
+                cpf=f"1234567890{n}",
+                cnh_numero=f"CNH{n}",
+                cnh_categoria="B",
+                cnh_validade=date(2030, 1, 1),
+                user=user,
+            )
+            cls.frota[n] = {
+                "viagem": Viagem.objects.create(
+                    veiculo=veiculo, motorista=motorista, origem="A", destino="B"
+                ),
+                "abastecimento": Abastecimento.objects.create(
+                    veiculo=veiculo,
+                    data=date(2025, 3, 10),
+                    hodometro=1000,
+                    litros=Decimal("40"),
+                    custo_total=Decimal("240"),
+                    tipo_combustivel="FLEX",
+                ),
+                "vinculo": VinculoVeiculoMotorista.objects.create(
+                    veiculo=veiculo, motorista=motorista, data_inicio=date(2024, 1, 1)
+                ),
+            }
+
+    def ids(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        resposta = client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return {item["id"] for item in resposta.json()}
+
+    def test_operador_ve_apenas_os_proprios_registros(self):
+        proprios = self.frota[0]
+        self.assertEqual(self.ids(self.operador, "/api/viagens/"), {proprios["viagem"].pk})
+        self.assertEqual(
+            self.ids(self.operador, "/api/abastecimentos/"), {proprios["abastecimento"].pk}
+        )
+        self.assertEqual(self.ids(self.operador, "/api/vinculos/"), {proprios["vinculo"].pk})
+
+    def test_operador_nao_acessa_registro_de_outro_motorista(self):
+        client = APIClient()
+        client.force_authenticate(self.operador)
+        resposta = client.get(f"/api/viagens/{self.frota[1]['viagem'].pk}/")
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_operador_sem_motorista_nao_ve_nada(self):
+        sem_motorista = User.objects.create_user("avulso", role=UserRole.OPERATOR)
+        self.assertEqual(self.ids(sem_motorista, "/api/viagens/"), set())
+        self.assertEqual(self.ids(sem_motorista, "/api/abastecimentos/"), set())
+        self.assertEqual(self.ids(sem_motorista, "/api/vinculos/"), set())
+
+    def test_admin_e_gestor_veem_tudo(self):
+        viagens = {registros["viagem"].pk for registros in self.frota.values()}
+        abastecimentos = {registros["abastecimento"].pk for registros in self.frota.values()}
+        vinculos = {registros["vinculo"].pk for registros in self.frota.values()}
+        for role in (UserRole.ADMIN, UserRole.MANAGER):
+            with self.subTest(role=role):
+                user = User.objects.create_user(f"user_{role}", role=role)
+                self.assertEqual(self.ids(user, "/api/viagens/"), viagens)
+                self.assertEqual(self.ids(user, "/api/abastecimentos/"), abastecimentos)
+                self.assertEqual(self.ids(user, "/api/vinculos/"), vinculos)
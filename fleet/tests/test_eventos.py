@@ -0,0 +1,136 @@
+import json
+from datetime import date
+
+from asgiref.testing import ApplicationCommunicator
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from fleet import empresas
+from fleet.eventos import obter_barramento, stream_viagens
+from fleet.models import Empresa, Motorista, User, UserRole
+
+CAMINHO = "/api/eventos/viagens/"
+
+
+class StreamViagensTests(TestCase):
+    """O app ASGI do stream, com conexões abertas pelo ApplicationCommunicator."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", slug="a")
+        cls.outra = Empresa.objects.create(nome="B", slug="b")
+        cls.gestor = User.objects.create_user("gestor", role=UserRole.MANAGER, empresa=cls.empresa)
+        cls.operador = User.objects.create_user(
+            "operador", role=UserRole.OPERATOR, empresa=cls.empresa
+        )
+        with empresas.usar(cls.empresa):
+            cls.motorista = Motorista.objects.create(
+                nome_completo="Ana Souza",
+                cpf="12345678901",
+                cnh_numero="CNH123",
+                cnh_categoria="B",
+                cnh_validade=date(2030, 1, 1),
+                user=cls.operador,
+            )
+
+    async def conectar(self, user=None, token=None, query=""):
+        if user is not None:
+            token = str(AccessToken.for_user(user))
+        if token is not None:
+            query = f"token={token}&{query}"
+        comunicador = ApplicationCommunicator(
+            stream_viagens,
+            {"type": "http", "method": "GET", "path": CAMINHO, "query_string": query.encode()},
+        )
+        inicio = await comunicador.receive_output(2)
+        return comunicador, inicio
+
+    async def encerrar(self, comunicador):
+        await comunicador.send_input({"type": "http.disconnect"})
+        await comunicador.wait(2)
+
+    async def assert401(self, **conexao):
+        comunicador, inicio = await self.conectar(**conexao)
+        corpo = await comunicador.receive_output(2)
+        await comunicador.wait(2)
+        self.assertEqual(inicio["status"], 401)
+        self.assertEqual(json.loads(corpo["body"]), {"detail": "Token ausente ou inválido."})
+
+    def evento(self, **campos):
+        return {
+            "viagem": 1,
+            "empresa": self.empresa.pk,
+            "veiculo": 1,
+            "motorista": self.motorista.pk,
+            "status": "EM_ANDAMENTO",
+            **campos,
+        }
+
+    async def recebidos(self, comunicador) -> list[int]:
+        """Viagens entregues até o stream ficar ocioso."""
+        viagens = []
+        while not await comunicador.receive_nothing(0.2):
+            corpo = (await comunicador.receive_output(1))["body"].decode()
+            if corpo.startswith("event: viagem"):
+                viagens.append(json.loads(corpo.split("data: ", 1)[1])["viagem"])
+        return viagens
+
+    async def test_sem_token_ou_token_invalido_retorna_401(self):
+        await self.assert401()
+        await self.assert401(token="invalido")
+
+    async def test_usuario_removido_ou_inativo_retorna_401(self):
+        removido = await User.objects.acreate(username="removido", role=UserRole.MANAGER)
+        token = str(AccessToken.for_user(removido))
+        await removido.adelete()
+        await self.assert401(token=token)
+
+        inativo = await User.objects.acreate(username="inativo", role=UserRole.MANAGER)
+        token = str(AccessToken.for_user(inativo))
+        await User.objects.filter(pk=inativo.pk).aupdate(is_active=False)
+        await self.assert401(token=token)
+
+    async def test_empresa_em_migracao_retorna_503(self):
+        await Empresa.objects.filter(pk=self.empresa.pk).aupdate(em_migracao=True)
+
+        comunicador, inicio = await self.conectar(self.gestor)
+        await comunicador.receive_output(2)
+        await comunicador.wait(2)
+
+        self.assertEqual(inicio["status"], 503)
+
+    async def test_entrega_so_eventos_da_empresa(self):
+        comunicador, inicio = await self.conectar(self.gestor)
+        self.assertEqual(inicio["status"], 200)
+
+        barramento = obter_barramento()
+        barramento.publicar(self.evento(viagem=1))
+        barramento.publicar(self.evento(viagem=2, empresa=self.outra.pk))
+        barramento.publicar(self.evento(viagem=3, motorista=self.motorista.pk + 1))
+
+        self.assertEqual(await self.recebidos(comunicador), [1, 3])
+        await self.encerrar(comunicador)
+
+    async def test_operador_recebe_so_o_proprio_motorista(self):
+        # O filtro da query não amplia o que o OPERATOR pode ver
+        comunicador, inicio = await self.conectar(
+            self.operador, query=f"motorista={self.motorista.pk + 1}"
+        )
+        self.assertEqual(inicio["status"], 200)
+
+        barramento = obter_barramento()
+        barramento.publicar(self.evento(viagem=1))
+        barramento.publicar(self.evento(viagem=2, motorista=self.motorista.pk + 1))
+
+        self.assertEqual(await self.recebidos(comunicador), [1])
+        await self.encerrar(comunicador)
+
+    async def test_desconexao_cancela_a_assinatura(self):
+        barramento = obter_barramento()
+        antes = len(barramento)
+        comunicador, _inicio = await self.conectar(self.gestor)
+        self.assertEqual(len(barramento), antes + 1)
+
+        await self.encerrar(comunicador)
+
+        self.assertEqual(len(barramento), antes)
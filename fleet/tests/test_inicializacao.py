@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+# Módulos que só devem carregar na primeira requisição que os usa
+PESADOS = [
+    "fleet.colunar",
+    "fleet.custos",
+    "fleet.eventos",
+    "fleet.lote",
+    "fleet.perfilador",
+    "fleet.relatorios",
+    "fleet.tarefas",
+    "pyarrow",
+    "cProfile",
+]
+
+SCRIPT = """
+import json, sys
+import backend.wsgi, backend.asgi
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+class InicializacaoTests(SimpleTestCase):
+    """Processo novo no perfil "api", como um worker recém-criado (com o pré-aquecimento)."""
+
+    def modulos_carregados(self):
+        env = {**os.environ, "FLEET_PERFIL": "api"}
+        env.pop("FLEET_PERFILADOR", None)
+        env.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+        saida = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return set(json.loads(saida.splitlines()[-1]))
+
+    def test_modulos_pesados_nao_carregam_na_inicializacao(self):
+        carregados = self.modulos_carregados()
+
+        self.assertIn("fleet.views", carregados)
+        self.assertIn("fleet.serializers", carregados)
+        self.assertEqual([m for m in PESADOS if m in carregados], [])
@@ -0,0 +1,73 @@
+import json
+import logging
+import tempfile
+
+from asgiref.sync import iscoroutinefunction
+from django.core.handlers.asgi import ASGIHandler
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from fleet import empresas
+from fleet.empresas import EmpresaMiddleware
+from fleet.models import User, UserRole
+from fleet.perfilador import PerfiladorMiddleware
+from fleet.throttling import RateLimitHeadersMiddleware
+
+MIDDLEWARES = (EmpresaMiddleware, RateLimitHeadersMiddleware, PerfiladorMiddleware)
+
+
+@override_settings(PERFILADOR_ATIVO=True)
+class MiddlewareHibridoTests(TestCase):
+    def test_segue_o_modo_da_cadeia(self):
+        async def assincrono(request):
+            return None
+
+        for classe in MIDDLEWARES:
+            with self.subTest(middleware=classe.__name__):
+                self.assertTrue(iscoroutinefunction(classe(assincrono)))
+                self.assertFalse(iscoroutinefunction(classe(lambda request: None)))
+
+    @override_settings(DEBUG=True)
+    def test_asgi_nao_adapta_os_middlewares_do_fleet(self):
+        with self.assertLogs("django.request", "DEBUG") as logs:
+            ASGIHandler()
+            # assertLogs exige ao menos uma mensagem
+            logging.getLogger("django.request").debug("fim")
+        self.assertFalse([m for m in logs.output if "fleet." in m], logs.output)
+
+
+class MiddlewareAsyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", password="senha-forte-1", role=UserRole.ADMIN)
+        self.auth = {"Authorization": f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+
+    async def test_cabecalhos_de_limite_na_view_async(self):
+        resposta = await self.async_client.post(
+            "/api/auth/token/",
+            json.dumps({"username": "admin", "password": "senha-forte-1"}),
+            content_type="application/json",
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("RateLimit-Remaining", resposta.headers)
+
+    async def test_empresa_do_usuario_de_sessao_e_limpa_ao_final(self):
+        self.user.is_staff = self.user.is_superuser = True
+        await self.user.asave()
+        await self.async_client.aforce_login(self.user)
+        resposta = await self.async_client.get("/admin/fleet/veiculo/")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIsNone(empresas.atual())
+
+    async def test_perfilador_mede_requisicao_async(self):
+        with tempfile.TemporaryDirectory() as pasta, override_settings(
+            PERFILADOR_ATIVO=True, PERFILADOR_DIR=pasta
+        ):
+            resposta = await self.async_client.get(
+                "/api/veiculos/", headers={**self.auth, "X-Fleet-Profile": "1"}
+            )
+            self.assertEqual(resposta.status_code, 200)
+            id_perfil = resposta.headers["X-Fleet-Profile-Id"]
+            with open(f"{pasta}/{id_perfil}.json", encoding="utf-8") as arquivo:
+                resumo = json.load(arquivo)
+        self.assertGreater(resumo["consultas"], 0)
+        self.assertEqual(resumo["usuario"], "admin")
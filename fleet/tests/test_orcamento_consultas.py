@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from fleet.orcamento import ENDPOINTS, semear
+
+ORCAMENTO = json.loads((Path(settings.BASE_DIR) / "orcamento_consultas.json").read_text())
+TAMANHOS = (5, 40)
+TAXAS = {escopo: "1000000/s" for escopo in settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]}
+
+
+@override_settings(
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": TAXAS},
+    # O EXPLAIN do log de consultas lentas entraria na contagem
+    CONSULTAS_LENTAS_LIMIAR_MS=None,
+    # As alterações semeadas entram no feed na hora
+    ALTERACOES_JANELA_MS=0,
+)
+class OrcamentoConsultasTests(TestCase):
+    """O número de consultas de cada endpoint é o do orçamento e não cresce com os dados."""
+
+    def _verificar(self, nome, chamada):
+        chamada()  # aquecimento (content types, imports)
+        # Endpoints com cache versionado são medidos sem o cache
+        cache.clear()
+        with self.assertNumQueries(ORCAMENTO[nome]):
+            resposta = chamada()
+        self.assertLess(getattr(resposta, "status_code", 200), 400, nome)
+
+    def test_consultas_por_endpoint_constantes_entre_volumes(self):
+        for tamanho in TAMANHOS:
+            contexto = semear(tamanho)
+            for nome, perfil, caminho in ENDPOINTS:
+                cliente = contexto["clientes"][perfil]
+                url = caminho.format(**contexto["ids"])
+                with self.subTest(endpoint=nome, tamanho=tamanho):
+                    self._verificar(nome, lambda: cliente.get(url))
+
+    def test_orcamento_cobre_todos_os_endpoints(self):
+        self.assertEqual(set(ORCAMENTO), {nome for nome, _perfil, _caminho in ENDPOINTS})
@@ -0,0 +1,70 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from drf_spectacular.drainage import GENERATOR_STATS
+
+from fleet import schema
+
+
+class SchemaTests(SimpleTestCase):
+    def test_endpoints_autenticados_usam_jwt(self):
+        with GENERATOR_STATS.silence():
+            gerado = json.loads(schema.gerar()["json"])
+        self.assertIn("jwtAuth", gerado["components"]["securitySchemes"])
+        veiculos = gerado["paths"]["/api/veiculos/"]["get"]
+        self.assertIn({"jwtAuth": []}, veiculos["security"])
+
+
+class SchemaViewTests(TestCase):
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = Path(diretorio.name)
+        ajuste = override_settings(SCHEMA_DIR=self.diretorio, DEBUG=False)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        schema._atual = None
+        self.addCleanup(setattr, schema, "_atual", None)
+
+    def obter(self, **cabecalhos):
+        with GENERATOR_STATS.silence():
+            return self.client.get("/api/schema/", {"format": "json"}, headers=cabecalhos)
+
+    def test_resposta_com_etag(self):
+        resposta = self.obter()
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta["ETag"], schema.obter().etags["json"])
+        self.assertIn("/api/veiculos/", json.loads(resposta.content)["paths"])
+        self.assertIn("max-age=86400", resposta["Cache-Control"])
+
+    def test_if_none_match_retorna_304(self):
+        etag = self.obter()["ETag"]
+
+        resposta = self.obter(if_none_match=etag)
+
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta["ETag"], etag)
+        self.assertEqual(resposta.content, b"")
+        self.assertEqual(self.obter(if_none_match='"outra"').status_code, 200)
+
+    def test_arquivos_da_versao_atual_sao_servidos(self):
+        schema.salvar({"json": b'{"pre": 1}', "yaml": b"pre: 1\n"})
+
+        self.assertEqual(json.loads(self.obter().content), {"pre": 1})
+
+    def test_arquivos_de_outra_versao_sao_refeitos(self):
+        schema.salvar({"json": b'{"pre": 1}', "yaml": b"pre: 1\n"})
+        (self.diretorio / "schema.versao").write_text("release-anterior")
+
+        conteudo = json.loads(self.obter().content)
+
+        self.assertIn("/api/veiculos/", conteudo["paths"])
+
+    def test_arquivos_sem_versao_sao_refeitos(self):
+        (self.diretorio / "schema.json").write_bytes(b'{"pre": 1}')
+        (self.diretorio / "schema.yaml").write_bytes(b"pre: 1\n")
+
+        self.assertIn("paths", json.loads(self.obter().content))
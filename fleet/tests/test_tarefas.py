@@ -0,0 +1,112 @@
+import time
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from fleet import tarefas
+from fleet.models import Empresa, StatusTarefaChoices, Tarefa, User, UserRole
+
+
+class EscopoTarefasTests(TestCase):
+    """Tarefa não tem empresa: o ADMIN vê as tarefas criadas por usuários da sua."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa_a = Empresa.objects.create(nome="A", slug="a")
+        cls.empresa_b = Empresa.objects.create(nome="B", slug="b")
+        cls.admin_a = User.objects.create_user("admin_a", role=UserRole.ADMIN, empresa=cls.empresa_a)
+        cls.gestor_a = User.objects.create_user(
+            "gestor_a", role=UserRole.MANAGER, empresa=cls.empresa_a
+        )
+        cls.admin_b = User.objects.create_user("admin_b", role=UserRole.ADMIN, empresa=cls.empresa_b)
+        cls.superusuario = User.objects.create_superuser("root", role=UserRole.ADMIN)
+        cls.tarefa_a = Tarefa.objects.create(tipo="exportar_csv", criado_por=cls.gestor_a)
+        cls.tarefa_b = Tarefa.objects.create(
+            tipo="exportar_csv",
+            criado_por=cls.admin_b,
+            status=StatusTarefaChoices.CONCLUIDA,
+            arquivo="/tmp/nao-existe.csv",
+        )
+
+    def cliente(self, user):
+        cliente = APIClient()
+        cliente.force_authenticate(user)
+        return cliente
+
+    def ids(self, user):
+        resposta = self.cliente(user).get("/api/jobs/")
+        self.assertEqual(resposta.status_code, 200)
+        itens = resposta.data["results"] if isinstance(resposta.data, dict) else resposta.data
+        return {item["id"] for item in itens}
+
+    def test_admin_ve_so_tarefas_da_propria_empresa(self):
+        self.assertEqual(self.ids(self.admin_a), {self.tarefa_a.pk})
+        self.assertEqual(self.ids(self.admin_b), {self.tarefa_b.pk})
+
+    def test_admin_nao_consulta_nem_baixa_tarefa_de_outra_empresa(self):
+        cliente = self.cliente(self.admin_a)
+
+        self.assertEqual(cliente.get(f"/api/jobs/{self.tarefa_b.pk}/").status_code, 404)
+        self.assertEqual(cliente.get(f"/api/jobs/{self.tarefa_b.pk}/download/").status_code, 404)
+
+    def test_gestor_ve_so_as_proprias(self):
+        Tarefa.objects.create(tipo="exportar_csv", criado_por=self.admin_a)
+
+        self.assertEqual(self.ids(self.gestor_a), {self.tarefa_a.pk})
+
+    def test_superusuario_sem_empresa_ve_todas(self):
+        self.assertEqual(self.ids(self.superusuario), {self.tarefa_a.pk, self.tarefa_b.pk})
+
+    def test_comando_restrito_a_superusuarios(self):
+        dados = {"tipo": "comando", "parametros": {"comando": "detectar_anomalias"}}
+
+        for user in (self.gestor_a, self.admin_a):
+            resposta = self.cliente(user).post("/api/jobs/", dados, format="json")
+            self.assertEqual(resposta.status_code, 403)
+        resposta = self.cliente(self.superusuario).post("/api/jobs/", dados, format="json")
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertFalse(Tarefa.objects.filter(tipo="comando").exclude(criado_por=self.superusuario))
+
+    def test_worker_recusa_comando_de_quem_nao_e_superusuario(self):
+        tarefa = Tarefa.objects.create(
+            tipo="comando",
+            parametros={"comando": "detectar_anomalias"},
+            criado_por=self.admin_a,
+            status=StatusTarefaChoices.EXECUTANDO,
+            worker="w1",
+            tentativas=1,
+        )
+
+        tarefas.executar(tarefa)
+
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, StatusTarefaChoices.FALHOU)
+        self.assertIn("restrito a superusuários", tarefa.erro)
+
+
+@override_settings(TAREFAS_TIMEOUT_SEGUNDOS=0.3, TAREFAS_SINAL_VIDA_SEGUNDOS=0.05)
+class SinalDeVidaTests(TransactionTestCase):
+    def setUp(self):
+        self.recuperadas = []
+
+        def lenta(execucao):
+            # Mais longa que o timeout, sem chamar progresso()
+            for _ in range(8):
+                time.sleep(0.1)
+                self.recuperadas.append(tarefas.recuperar_abandonadas())
+            return "ok"
+
+        tarefas.TIPOS["teste_lenta"] = tarefas.TipoTarefa(lenta, None, False)
+        self.addCleanup(tarefas.TIPOS.pop, "teste_lenta")
+
+    def test_tarefa_longa_nao_volta_para_a_fila(self):
+        Tarefa.objects.create(tipo="teste_lenta")
+        tarefa = tarefas.reservar("w1")
+
+        tarefas.executar(tarefa)
+
+        tarefa.refresh_from_db()
+        self.assertEqual(self.recuperadas, [0] * 8)
+        self.assertEqual(tarefa.status, StatusTarefaChoices.CONCLUIDA)
+        self.assertEqual(tarefa.tentativas, 1)
@@ -0,0 +1,203 @@
+import threading
+from datetime import date
+from unittest import mock
+
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from fleet.models import (
+    Motorista,
+    StatusVeiculoChoices,
+    StatusViagemChoices,
+    User,
+    UserRole,
+    Veiculo,
+    Viagem,
+)
+from fleet.views import ViagemViewSet
+
+
+class TransicaoViagemTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.gestor = User.objects.create_user("gestor", role=UserRole.MANAGER)
+        cls.veiculo = Veiculo.objects.create(
+            placa="ABC1D23",
+            marca="Fiat",
+            modelo="Strada",
+            ano=2022,
+            tipo_combustivel="FLEX",
+            hodometro_atual=1000,
+        )
+        cls.motorista = Motorista.objects.create(
+            nome_completo="Ana Souza",
+            cpf="12345678901",
+            cnh_numero="CNH123",
+            cnh_categoria="B",
+            cnh_validade=date(2030, 1, 1),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.gestor)
+        self.viagem = self.criar_viagem()
+
+    def criar_viagem(self, **campos):
+        return Viagem.objects.create(
+            veiculo=self.veiculo, motorista=self.motorista, origem="A", destino="B", **campos
+        )
+
+    def iniciar(self, viagem=None, **dados):
+        return self.client.post(f"/api/viagens/{(viagem or self.viagem).pk}/iniciar/", dados)
+
+    def finalizar(self, viagem=None, **dados):
+        return self.client.post(f"/api/viagens/{(viagem or self.viagem).pk}/finalizar/", dados)
+
+    def test_iniciar_usa_o_hodometro_do_veiculo(self):
+        resposta = self.iniciar()
+
+        self.assertEqual(resposta.status_code, 200)
+        self.viagem.refresh_from_db()
+        self.assertEqual(self.viagem.status, StatusViagemChoices.EM_ANDAMENTO)
+        self.assertEqual(self.viagem.hodometro_saida, 1000)
+        self.assertIsNotNone(self.viagem.data_hora_inicio)
+
+    def test_iniciar_duas_vezes_retorna_409(self):
+        self.assertEqual(self.iniciar().status_code, 200)
+
+        resposta = self.iniciar()
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()["status"], StatusViagemChoices.EM_ANDAMENTO)
+
+    def test_finalizar_viagem_nao_iniciada_retorna_409(self):
+        resposta = self.finalizar(hodometro_chegada=1100)
+
+        self.assertEqual(resposta.status_code, 409)
+        self.viagem.refresh_from_db()
+        self.assertEqual(self.viagem.status, StatusViagemChoices.NAO_INICIADA)
+
+    def test_finalizar_atualiza_o_hodometro_do_veiculo(self):
+        self.iniciar()
+
+        resposta = self.finalizar(hodometro_chegada=1250)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()["status"], StatusViagemChoices.FINALIZADA)
+        self.veiculo.refresh_from_db()
+        self.assertEqual(self.veiculo.hodometro_atual, 1250)
+
+    def test_finalizar_com_chegada_menor_que_saida_retorna_400(self):
+        self.iniciar()
+
+        resposta = self.finalizar(hodometro_chegada=900)
+
+        self.assertEqual(resposta.status_code, 400)
+        self.viagem.refresh_from_db()
+        self.assertEqual(self.viagem.status, StatusViagemChoices.EM_ANDAMENTO)
+
+    def test_finalizar_exige_hodometro(self):
+        self.iniciar()
+        self.assertEqual(self.finalizar().status_code, 400)
+        self.assertEqual(self.finalizar(hodometro_chegada=-1).status_code, 400)
+
+    def test_viagem_inexistente_retorna_404(self):
+        self.assertEqual(self.client.post("/api/viagens/999999/iniciar/").status_code, 404)
+
+    def test_veiculo_com_viagem_em_andamento_retorna_409(self):
+        outra = self.criar_viagem()
+        self.assertEqual(self.iniciar(outra).status_code, 200)
+
+        resposta = self.iniciar()
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(
+            resposta.json()["conflitos"], {"veiculo": [outra.pk], "motorista": [outra.pk]}
+        )
+        self.viagem.refresh_from_db()
+        self.assertEqual(self.viagem.status, StatusViagemChoices.NAO_INICIADA)
+
+    def test_transicao_concorrente_perde_com_409(self):
+        """Outra requisição inicia a viagem depois desta ler a viagem e antes do UPDATE."""
+        get_queryset = ViagemViewSet.get_queryset
+
+        def iniciada_por_outra_requisicao(viewset):
+            Viagem.objects.filter(pk=self.viagem.pk).update(
+                status=StatusViagemChoices.EM_ANDAMENTO
+            )
+            return get_queryset(viewset)
+
+        with mock.patch.object(
+            ViagemViewSet, "get_queryset", autospec=True, side_effect=iniciada_por_outra_requisicao
+        ):
+            resposta = self.iniciar()
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()["status"], StatusViagemChoices.EM_ANDAMENTO)
+
+
+class FinalizacaoConcorrenteTests(TransactionTestCase):
+    """Vários clientes finalizando a mesma viagem ao mesmo tempo, cada um em sua thread."""
+
+    CLIENTES = 8
+
+    def setUp(self):
+        self.gestor = User.objects.create_user("gestor", role=UserRole.MANAGER)
+        self.veiculo = Veiculo.objects.create(
+            placa="ABC1D23",
+            marca="Fiat",
+            modelo="Strada",
+            ano=2022,
+            tipo_combustivel="FLEX",
+            hodometro_atual=1000,
+        )
+        motorista = Motorista.objects.create(
+            nome_completo="Ana Souza",
+            cpf="12345678901",
+            cnh_numero="CNH123",
+            cnh_categoria="B",
+            cnh_validade=date(2030, 1, 1),
+        )
+        self.viagem = Viagem.objects.create(
+            veiculo=self.veiculo,
+            motorista=motorista,
+            origem="A",
+            destino="B",
+            status=StatusViagemChoices.EM_ANDAMENTO,
+            hodometro_saida=1000,
+        )
+
+    def test_um_vence_e_os_demais_recebem_409(self):
+        largada = threading.Barrier(self.CLIENTES)
+        respostas = {}
+
+        def finalizar(chegada):
+            cliente = APIClient()
+            cliente.force_authenticate(self.gestor)
+            try:
+                largada.wait()
+                respostas[chegada] = cliente.post(
+                    f"/api/viagens/{self.viagem.pk}/finalizar/", {"hodometro_chegada": chegada}
+                )
+            finally:
+                connections.close_all()
+
+        # Chegadas distintas: dá para saber qual cliente venceu
+        threads = [
+            threading.Thread(target=finalizar, args=(1100 + n,)) for n in range(self.CLIENTES)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        codigos = sorted(resposta.status_code for resposta in respostas.values())
+        self.assertEqual(codigos, [200] + [409] * (self.CLIENTES - 1))
+        [vencedora] = [c for c, resposta in respostas.items() if resposta.status_code == 200]
+        self.viagem.refresh_from_db()
+        self.veiculo.refresh_from_db()
+        self.assertEqual(self.viagem.status, StatusViagemChoices.FINALIZADA)
+        self.assertEqual(self.viagem.hodometro_chegada, vencedora)
+        self.assertEqual(self.veiculo.hodometro_atual, vencedora)
+        self.assertEqual(self.veiculo.status, StatusVeiculoChoices.ATIVO)
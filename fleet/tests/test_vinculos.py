@@ -0,0 +1,74 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from fleet.models import Motorista, User, UserRole
+
+
+class VincularUsuariosMotoristasTests(TestCase):
+    """link_users_to_drivers só vincula pares que são a melhor opção única um do outro."""
+
+    def motorista(self, nome, cpf):
+        return Motorista.objects.create(
+            nome_completo=nome,
+            cpf=cpf,
+            cnh_numero=f"CNH{cpf}",
+            cnh_categoria="B",
+            cnh_validade=date(2030, 1, 1),
+        )
+
+    def operador(self, username, **campos):
+        return User.objects.create_user(username, role=UserRole.OPERATOR, **campos)
+
+    def vincular(self, *argumentos):
+        saida = StringIO()
+        call_command("link_users_to_drivers", *argumentos, stdout=saida)
+        return saida.getvalue()
+
+    def usuario_de(self, motorista):
+        motorista.refresh_from_db()
+        return motorista.user_id
+
+    def test_correspondencia_unica(self):
+        motorista = self.motorista("Bruno Costa", "11111111111")
+        user = self.operador("bruno.costa")
+
+        saida = self.vincular()
+
+        self.assertIn("✓ Vinculado: Bruno Costa -> bruno.costa", saida)
+        self.assertEqual(self.usuario_de(motorista), user.pk)
+
+    def test_empate_entre_usuarios_nao_vincula(self):
+        motorista = self.motorista("Carlos Lima", "22222222222")
+        self.operador("carlos.lima")
+        self.operador("carloslima")
+
+        saida = self.vincular()
+
+        self.assertIn("? Ambíguo: Carlos Lima -> ", saida)
+        self.assertIn("1 motoristas com vínculo ambíguo", saida)
+        self.assertIsNone(self.usuario_de(motorista))
+
+    def test_motorista_preterido_e_reportado(self):
+        # Nome completo (90) contra primeiro + último nome no username (70)
+        preferido = self.motorista("Ana Souza", "33333333333")
+        preterido = self.motorista("Ana Maria Souza", "44444444444")
+        user = self.operador("anasouza", first_name="Ana", last_name="Souza")
+
+        saida = self.vincular()
+
+        self.assertEqual(self.usuario_de(preferido), user.pk)
+        self.assertIsNone(self.usuario_de(preterido))
+        self.assertIn("? Preterido: Ana Maria Souza -> anasouza", saida)
+        self.assertIn("1 motoristas preteridos", saida)
+
+    def test_dry_run_nao_grava(self):
+        motorista = self.motorista("Bruno Costa", "11111111111")
+        self.operador("bruno.costa")
+
+        saida = self.vincular("--dry-run")
+
+        self.assertIn("1 vínculos seriam feitos, 0 ambíguos, 0 preteridos", saida)
+        self.assertIsNone(self.usuario_de(motorista))
@@ -0,0 +1,172 @@
+"""Throttling por token bucket (usuário, IP e classe de rota).
+
+Os buckets são reabastecidos de forma preguiçosa: cada consulta calcula os
+tokens acumulados desde o último acesso, sem timers. O estado fica em memória
+no processo (`THROTTLE_STORE = "memoria"`) ou no cache do Django
+(`"cache"`), compartilhado entre workers quando CACHES aponta para Redis ou
+memcached; o LocMemCache padrão serve de substituto local.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class MemoriaBucketStore:
+    def __init__(self, max_chaves: int = 100_000):
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_chaves = max_chaves
+
+    def consumir(self, chave, capacidade, taxa, agora):
+        with self._lock:
+            tokens, ultimo = self._buckets.pop(chave, (capacidade, agora))
+            tokens = min(capacidade, tokens + (agora - ultimo) * taxa)
+            permitido = tokens >= 1
+            if permitido:
+                tokens -= 1
+            self._buckets[chave] = (tokens, agora)
+            if len(self._buckets) > self._max_chaves:
+                self._buckets.popitem(last=False)
+        return permitido, tokens
+
+
+class CacheBucketStore:
+    """Bucket no cache do Django.
+
+    Leitura e escrita não são atômicas; sob concorrência alta entre workers o
+    limite pode ser excedido em poucas requisições, o que é aceitável aqui.
+    """
+
+    def consumir(self, chave, capacidade, taxa, agora):
+        tokens, ultimo = cache.get(chave, (capacidade, agora))
+        tokens = min(capacidade, tokens + (agora - ultimo) * taxa)
+        permitido = tokens >= 1
+        if permitido:
+            tokens -= 1
+        # Expira quando o bucket estaria cheio de novo
+        cache.set(chave, (tokens, agora), timeout=int((capacidade - tokens) / taxa) + 1)
+        return permitido, tokens
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def obter_store():
+    tipo = getattr(settings, "THROTTLE_STORE", "memoria")
+    if tipo not in _stores:
+        with _stores_lock:
+            if tipo not in _stores:
+                _stores[tipo] = CacheBucketStore() if tipo == "cache" else MemoriaBucketStore()
+    return _stores[tipo]
+
+
+def _registrar_limite(request, limite, restantes, reset) -> None:
+    # Guarda o bucket mais restritivo para os cabeçalhos RateLimit-*
+    atual = getattr(request._request, "fleet_ratelimit", None)
+    if atual is None or restantes < atual[1]:
+        request._request.fleet_ratelimit = (limite, restantes, reset)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope: str | None = None
+    timer = time.time
+    _espera = 0
+
+    def get_scope(self, request, view) -> str | None:
+        return self.scope
+
+    def get_ident_bucket(self, request, view) -> str | None:
+        raise NotImplementedError
+
+    def allow_request(self, request, view) -> bool:
+        scope = self.get_scope(request, view)
+        ident = self.get_ident_bucket(request, view) if scope else None
+        taxa_configurada = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if ident is None or taxa_configurada is None:
+            return True
+
+        num, periodo = taxa_configurada.split("/")
+        capacidade = int(num)
+        taxa = capacidade / {"s": 1, "m": 60, "h": 3600, "d": 86400}[periodo[0]]
+
+        permitido, tokens = obter_store().consumir(
+            f"bucket:{scope}:{ident}", capacidade, taxa, self.timer()
+        )
+        self._espera = 0 if permitido else (1 - tokens) / taxa
+        _registrar_limite(request, capacidade, int(tokens), int((capacidade - tokens) / taxa) + 1)
+        return permitido
+
+    def wait(self):
+        return self._espera
+
+
+class UsuarioBucketThrottle(TokenBucketThrottle):
+    scope = "usuario"
+
+    def get_ident_bucket(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return str(request.user.pk)
+        return None
+
+
+class IPBucketThrottle(TokenBucketThrottle):
+    scope = "ip"
+
+    def get_ident_bucket(self, request, view):
+        return self.get_ident(request)
+
+
+class RotaBucketThrottle(TokenBucketThrottle):
+    """Limita classes de rota: `throttle_scope` da view ou listagens sem paginação."""
+
+    def get_scope(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None and getattr(view, "action", None) == "list":
+            scope = "listagem"
+        return scope
+
+    def get_ident_bucket(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"u{request.user.pk}"
+        return f"ip{self.get_ident(request)}"
+
+
+class AutenticacaoBucketThrottle(IPBucketThrottle):
+    """Endpoints que executam hash de senha (token e cadastro), por IP."""
+
+    scope = "autenticacao"
+
+
+class RateLimitHeadersMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._cabecalhos(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._cabecalhos(request, await self.get_response(request))
+
+    def _cabecalhos(self, request, response):
+        limite = getattr(request, "fleet_ratelimit", None)
+        if limite is not None:
+            response["RateLimit-Limit"] = str(limite[0])
+            response["RateLimit-Remaining"] = str(limite[1])
+            response["RateLimit-Reset"] = str(limite[2])
+        return response
@@ -1,16 +1,30 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from .views import (
     AbastecimentoViewSet,
+    AnomaliaAbastecimentoViewSet,
     ManutencaoViewSet,
     MotoristaViewSet,
+    TarefaViewSet,
+    TokenRefreshView,
     VeiculoViewSet,
     ViagemViewSet,
+    VinculoVeiculoMotoristaViewSet,
+    analytics_custo_km_view,
+    analytics_motoristas_view,
+    analytics_rotas_view,
+    autocomplete_view,
+    batch_view,
+    changes_view,
+    consultas_lentas_view,
     dashboard_resumo_view,
     me_view,
+    perfil_detalhe_view,
+    perfis_view,
     register_view,
+    relatorio_pivot_view,
+    token_obtain_view,
 )
 
 router = DefaultRouter()
@@ -19,14 +33,37 @@ router.register(r"motoristas", MotoristaViewSet, basename="motorista")
 router.register(r"manutencoes", ManutencaoViewSet, basename="manutencao")
 router.register(r"abastecimentos", AbastecimentoViewSet, basename="abastecimento")
 router.register(r"viagens", ViagemViewSet, basename="viagem")
+router.register(r"vinculos", VinculoVeiculoMotoristaViewSet, basename="vinculo")
+router.register(
+    r"anomalias", AnomaliaAbastecimentoViewSet, basename="anomalia-abastecimento"
+)
+router.register(r"jobs", TarefaViewSet, basename="tarefa")
 
 urlpatterns = [
     path("", include(router.urls)),
-    path("auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("auth/token/", token_obtain_view, name="token_obtain_pair"),
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("auth/register/", register_view, name="register"),
     path("auth/me/", me_view, name="me"),
+    path("autocomplete/", autocomplete_view, name="autocomplete"),
+    path("batch/", batch_view, name="batch"),
+    path("changes/", changes_view, name="changes"),
     path("dashboard/resumo/", dashboard_resumo_view, name="dashboard-resumo"),
+    path("analytics/rotas/", analytics_rotas_view, name="analytics-rotas"),
+    path(
+        "analytics/motoristas/",
+        analytics_motoristas_view,
+        name="analytics-motoristas",
+    ),
+    path("analytics/custo-km/", analytics_custo_km_view, name="analytics-custo-km"),
+    path("relatorios/pivot/", relatorio_pivot_view, name="relatorios-pivot"),
+    path("_debug/profiles/", perfis_view, name="debug-perfis"),
+    path(
+        "_debug/consultas-lentas/",
+        consultas_lentas_view,
+        name="debug-consultas-lentas",
+    ),
+    path("_debug/profiles/<str:id_perfil>/", perfil_detalhe_view, name="debug-perfil"),
 ]
 
 
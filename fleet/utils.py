@@ -0,0 +1,10 @@
+import unicodedata
+
+
+def normalizar_texto(texto: str | None) -> str:
+    """Remove acentos, caixa e espaços redundantes para comparação de textos livres."""
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acento = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acento.casefold().split())
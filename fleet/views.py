@@ -1,29 +1,89 @@
-from datetime import date
+import hashlib
+import json
+import math
+import os
+from datetime import date, datetime, time, timedelta
 
-from django.db.models import Q
-from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import api_view, permission_classes
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.core import signing
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import (
+    Avg,
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.http import FileResponse, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import exceptions, mixins, permissions, status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt import views as jwt_views
+from rest_framework_simplejwt.serializers import TokenObtainSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
+# custos, lote, perfilador, relatorios e tarefas (que traz o colunar) são
+# importados nas views que os usam, para não pesar na inicialização do worker
+from . import (
+    alteracoes,
+    autocompletar,
+    conflitos,
+    consultas_lentas,
+    empresas,
+    precos,
+    senhas,
+)
+from . import cache as fleet_cache
 from .models import (
     Abastecimento,
+    AlteracaoRegistro,
+    AnomaliaAbastecimento,
     Manutencao,
     Motorista,
+    OperacaoAlteracaoChoices,
     StatusManutencaoChoices,
     StatusVeiculoChoices,
+    StatusTarefaChoices,
+    StatusViagemChoices,
+    Tarefa,
+    UserRole,
     Veiculo,
     Viagem,
+    VinculoVeiculoMotorista,
 )
+from .signals import notificar_alteracao_viagem
+from .throttling import AutenticacaoBucketThrottle, IPBucketThrottle
+
+User = get_user_model()
 from .serializers import (
     AbastecimentoSerializer,
+    AnomaliaAbastecimentoSerializer,
     DashboardResumoSerializer,
     ManutencaoSerializer,
     MotoristaSerializer,
     RegisterSerializer,
+    TarefaSerializer,
     UserSerializer,
     VeiculoSerializer,
     ViagemSerializer,
+    VinculoVeiculoMotoristaSerializer,
 )
 
 
@@ -38,12 +98,98 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         )
 
 
-class VeiculoViewSet(viewsets.ModelViewSet):
+class IsAdmin(permissions.BasePermission):
+    def has_permission(self, request, view) -> bool:
+        return bool(
+            request.user
+            and request.user.is_authenticated
+            and getattr(request.user, "role", "") == UserRole.ADMIN
+        )
+
+
+class IsAdminOrManager(permissions.BasePermission):
+    def has_permission(self, request, view) -> bool:
+        return bool(
+            request.user
+            and request.user.is_authenticated
+            and getattr(request.user, "role", "") in (UserRole.ADMIN, UserRole.MANAGER)
+        )
+
+
+def _motorista_id(request):
+    """Motorista vinculado ao usuário, resolvido uma vez por requisição."""
+    if not hasattr(request, "_motorista_id"):
+        request._motorista_id = (
+            Motorista.objects.filter(user_id=request.user.pk)
+            .values_list("id", flat=True)
+            .first()
+        )
+    return request._motorista_id
+
+
+def _veiculos_vinculados(motorista_id):
+    hoje = date.today()
+    return VinculoVeiculoMotorista.objects.filter(
+        Q(data_fim__isnull=True) | Q(data_fim__gte=hoje),
+        motorista_id=motorista_id,
+        data_inicio__lte=hoje,
+    ).values("veiculo_id")
+
+
+def escopar_queryset(request, qs):
+    """Restringe o queryset ao que um usuário OPERATOR pode ver.
+
+    O motorista enxerga apenas as próprias viagens e os veículos vinculados a
+    ele (e os registros desses veículos); os demais perfis veem toda a empresa.
+    """
+    qs = empresas.escopar(qs)
+    if getattr(request.user, "role", None) != UserRole.OPERATOR:
+        return qs
+    motorista_id = _motorista_id(request)
+    if motorista_id is None:
+        return qs.none()
+    if qs.model is Viagem:
+        return qs.filter(motorista_id=motorista_id)
+    if qs.model is Motorista:
+        return qs.filter(pk=motorista_id)
+    if qs.model is VinculoVeiculoMotorista:
+        return qs.filter(motorista_id=motorista_id)
+    if qs.model is Veiculo:
+        return qs.filter(pk__in=_veiculos_vinculados(motorista_id))
+    return qs.filter(veiculo_id__in=_veiculos_vinculados(motorista_id))
+
+
+def escopar_remocoes(request, entradas):
+    """Aplica às remoções do feed de alterações as regras de `escopar_queryset`.
+
+    O registro removido não existe mais: o OPERATOR vê a remoção pelo veículo
+    ou motorista gravados nela (ver `alteracoes.escopo`).
+    """
+    if getattr(request.user, "role", None) != UserRole.OPERATOR:
+        return entradas
+    motorista_id = _motorista_id(request)
+    if motorista_id is None:
+        return entradas.exclude(operacao=OperacaoAlteracaoChoices.REMOVIDO)
+    por_motorista = [alteracoes.MODELOS_FEED[Viagem], alteracoes.MODELOS_FEED[Motorista]]
+    visiveis = Q(modelo__in=por_motorista, escopo_motorista=motorista_id) | (
+        ~Q(modelo__in=por_motorista)
+        & Q(escopo_veiculo__in=_veiculos_vinculados(motorista_id))
+    )
+    return entradas.filter(~Q(operacao=OperacaoAlteracaoChoices.REMOVIDO) | visiveis)
+
+
+class EscopoPerfilMixin:
+    def get_queryset(self):
+        return escopar_queryset(self.request, super().get_queryset())
+
+
+class VeiculoViewSet(EscopoPerfilMixin, viewsets.ModelViewSet):
+    queryset = Veiculo.objects.all()
     serializer_class = VeiculoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        qs = Veiculo.objects.all()
+        qs = super().get_queryset()
         placa = self.request.query_params.get("placa")
         status = self.request.query_params.get("status")
         tipo_combustivel = self.request.query_params.get("tipo_combustivel")
@@ -56,29 +202,254 @@ class VeiculoViewSet(viewsets.ModelViewSet):
         return qs
 
 
-class MotoristaViewSet(viewsets.ModelViewSet):
+class MotoristaViewSet(EscopoPerfilMixin, viewsets.ModelViewSet):
     queryset = Motorista.objects.all()
     serializer_class = MotoristaSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ManutencaoViewSet(viewsets.ModelViewSet):
+class ManutencaoViewSet(EscopoPerfilMixin, viewsets.ModelViewSet):
     queryset = Manutencao.objects.all()
     serializer_class = ManutencaoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class AbastecimentoViewSet(viewsets.ModelViewSet):
+class AbastecimentoViewSet(EscopoPerfilMixin, viewsets.ModelViewSet):
     queryset = Abastecimento.objects.all()
     serializer_class = AbastecimentoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ViagemViewSet(viewsets.ModelViewSet):
+class AnomaliaAbastecimentoViewSet(EscopoPerfilMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = AnomaliaAbastecimento.objects.all()
+    serializer_class = AnomaliaAbastecimentoSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        veiculo = self.request.query_params.get("veiculo")
+        tipo = self.request.query_params.get("tipo")
+        if veiculo:
+            qs = qs.filter(veiculo_id=veiculo)
+        if tipo:
+            qs = qs.filter(tipo=tipo)
+        return qs
+
+
+class VinculoVeiculoMotoristaViewSet(EscopoPerfilMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = VinculoVeiculoMotorista.objects.all()
+    serializer_class = VinculoVeiculoMotoristaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = self.serializer_class.preparar(super().get_queryset())
+        veiculo = self.request.query_params.get("veiculo")
+        motorista = self.request.query_params.get("motorista")
+        if veiculo:
+            qs = qs.filter(veiculo_id=veiculo)
+        if motorista:
+            qs = qs.filter(motorista_id=motorista)
+        return qs
+
+
+class ViagemViewSet(EscopoPerfilMixin, viewsets.ModelViewSet):
     queryset = Viagem.objects.all()
     serializer_class = ViagemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @action(detail=False, methods=["get"], url_path="em-andamento")
+    def em_andamento(self, request):
+        motorista = getattr(request.user, "motorista", None)
+        viagem = None
+        if motorista is not None:
+            viagem = (
+                self.get_queryset()
+                .filter(motorista=motorista, status=StatusViagemChoices.EM_ANDAMENTO)
+                .first()
+            )
+        data = self.get_serializer(viagem).data if viagem else None
+        return Response({"viagem": data})
+
+    @action(detail=False, methods=["get"])
+    def conflitos(self, request):
+        try:
+            data_inicio, data_fim = _intervalo_datas(request)
+            limite = min(int(request.query_params.get("limite", 100)), 1000)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        # Viagens que interceptam o período: terminam depois do início e começam antes do fim
+        viagens = self.get_queryset().filter(_filtro_periodo("data_hora_inicio", None, data_fim))
+        if data_inicio:
+            viagens = viagens.filter(
+                Q(data_hora_fim__isnull=True) | _filtro_periodo("data_hora_fim", data_inicio, None)
+            )
+        return Response(conflitos.auditar(viagens, limite=limite))
+
+    @action(detail=True, methods=["post"])
+    def iniciar(self, request, pk=None):
+        agora = timezone.now()
+        campos = {
+            "status": StatusViagemChoices.EM_ANDAMENTO,
+            "data_hora_inicio": agora,
+            "hodometro_saida": Subquery(
+                Veiculo.objects.filter(pk=OuterRef("veiculo")).values("hodometro_atual")
+            ),
+        }
+        if "hodometro_saida" in request.data:
+            try:
+                campos["hodometro_saida"] = self._inteiro_positivo(request.data["hodometro_saida"])
+            except ValueError:
+                return Response(
+                    {"error": "Hodômetro de saída inválido."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        return self._transicao(
+            pk,
+            StatusViagemChoices.NAO_INICIADA,
+            campos,
+            filtro_extra=conflitos.sem_conflito_ao_iniciar(agora),
+            erro_filtro=lambda viagem: Response(
+                {
+                    "error": "Veículo ou motorista já possui viagem em andamento no período.",
+                    "conflitos": conflitos.buscar_conflitos(
+                        viagem.veiculo_id, viagem.motorista_id, agora, None, viagem.pk
+                    ),
+                },
+                status=status.HTTP_409_CONFLICT,
+            ),
+        )
+
+    @action(detail=True, methods=["post"])
+    def finalizar(self, request, pk=None):
+        try:
+            chegada = self._inteiro_positivo(request.data.get("hodometro_chegada"))
+        except ValueError:
+            return Response(
+                {"error": "Informe um hodômetro de chegada válido."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        campos = {
+            "status": StatusViagemChoices.FINALIZADA,
+            "data_hora_fim": timezone.now(),
+            "hodometro_chegada": chegada,
+        }
+        return self._transicao(
+            pk,
+            StatusViagemChoices.EM_ANDAMENTO,
+            campos,
+            filtro_extra=Q(hodometro_saida__lte=chegada),
+            erro_filtro=lambda viagem: Response(
+                {"error": "Hodômetro de chegada menor que o de saída."},
+                status=status.HTTP_400_BAD_REQUEST,
+            ),
+            hodometro_veiculo=chegada,
+        )
+
+    @staticmethod
+    def _inteiro_positivo(valor) -> int:
+        try:
+            numero = int(valor)
+        except (TypeError, ValueError):
+            raise ValueError(valor)
+        if numero < 0:
+            raise ValueError(valor)
+        return numero
+
+    def _transicao(
+        self,
+        pk,
+        status_esperado,
+        campos,
+        filtro_extra=Q(),
+        erro_filtro=None,
+        hodometro_veiculo=None,
+    ):
+        # UPDATE condicional: quem perder a corrida recebe 0 linhas afetadas
+        qs = self.get_queryset().filter(pk=pk)
+        with transaction.atomic(using=qs.db):
+            atualizadas = qs.filter(filtro_extra, status=status_esperado).update(
+                atualizado_em=timezone.now(), **campos
+            )
+            if atualizadas:
+                viagem = qs.get()
+                if hodometro_veiculo is not None and Veiculo.objects.filter(
+                    pk=viagem.veiculo_id, hodometro_atual__lt=hodometro_veiculo
+                ).update(hodometro_atual=hodometro_veiculo, atualizado_em=timezone.now()):
+                    alteracoes.registrar(Veiculo, [viagem.veiculo_id])
+                notificar_alteracao_viagem(viagem)
+        if atualizadas:
+            return Response(self.get_serializer(viagem).data)
+
+        viagem = qs.first()
+        if viagem is None:
+            return Response({"detail": "Viagem não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+        if viagem.status != status_esperado:
+            return Response(
+                {
+                    "error": f"Transição inválida: a viagem está {viagem.get_status_display()}.",
+                    "status": viagem.status,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        return erro_filtro(viagem)
+
+
+class TarefaViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Tarefas em segundo plano; o resultado é baixado uma única vez."""
+
+    serializer_class = TarefaSerializer
+    permission_classes = [IsAdminOrManager]
+
+    def get_queryset(self):
+        # Tarefa não tem empresa: o escopo vem de quem a criou
+        user = self.request.user
+        qs = Tarefa.objects.all()
+        if user.role == UserRole.ADMIN and user.empresa_id is not None:
+            return qs.filter(criado_por__empresa_id=user.empresa_id)
+        if user.is_superuser and user.empresa_id is None:
+            return qs
+        return qs.filter(criado_por=user)
+
+    def perform_create(self, serializer):
+        from . import tarefas
+
+        if not tarefas.permitido(serializer.validated_data["tipo"], self.request.user):
+            raise exceptions.PermissionDenied("Tipo de tarefa restrito a superusuários.")
+        serializer.instance = tarefas.enfileirar(
+            serializer.validated_data["tipo"],
+            serializer.validated_data.get("parametros"),
+            usuario=self.request.user,
+        )
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        from . import tarefas
+
+        tarefa = self.get_object()
+        if tarefa.status != StatusTarefaChoices.CONCLUIDA or not tarefa.arquivo:
+            return Response(
+                {"error": "Tarefa sem arquivo de resultado."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            arquivo = open(tarefa.arquivo, "rb")
+        except FileNotFoundError:
+            arquivo = None
+        if arquivo is None or not tarefas.reservar_download(tarefa):
+            if arquivo is not None:
+                arquivo.close()
+            return Response(
+                {"error": "O arquivo já foi baixado."}, status=status.HTTP_410_GONE
+            )
+        # O arquivo aberto continua legível após a remoção (POSIX)
+        try:
+            os.remove(tarefa.arquivo)
+        except OSError:
+            pass
+        return FileResponse(
+            arquivo, as_attachment=True, filename=os.path.basename(tarefa.arquivo)
+        )
+
 
 @api_view(["GET"])
 @permission_classes([permissions.IsAuthenticated])
@@ -87,20 +458,146 @@ def me_view(request):
     return Response(serializer.data)
 
 
-@api_view(["POST"])
-@permission_classes([permissions.AllowAny])
-def register_view(request):
+def _aplicar_throttles(request, classes):
+    """Aplica throttles do DRF em views Django comuns (as assíncronas abaixo)."""
+    drf_request = Request(request)
+    for classe in classes:
+        throttle = classe()
+        if not throttle.allow_request(drf_request, None):
+            espera = throttle.wait()
+            resposta = JsonResponse(
+                {"detail": str(exceptions.Throttled(espera).detail)},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+            resposta["Retry-After"] = str(math.ceil(espera))
+            return resposta
+    return None
+
+
+def _dados_requisicao(request) -> dict:
+    if request.content_type == "application/json":
+        try:
+            dados = json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+        return dados if isinstance(dados, dict) else {}
+    return request.POST.dict()
+
+
+def _resposta_fila_cheia():
+    resposta = JsonResponse(
+        {"detail": "Serviço de autenticação ocupado. Tente novamente."},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    resposta["Retry-After"] = "1"
+    return resposta
+
+
+def _emitir_tokens(user) -> dict:
+    refresh = RefreshToken.for_user(user)
+    if jwt_settings.UPDATE_LAST_LOGIN:
+        update_last_login(None, user)
+    return {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+
+@csrf_exempt
+@require_POST
+async def token_obtain_view(request):
+    """Equivalente ao TokenObtainPairView, com o PBKDF2 fora da thread da requisição."""
+    bloqueio = _aplicar_throttles(request, [IPBucketThrottle, AutenticacaoBucketThrottle])
+    if bloqueio:
+        return bloqueio
+
+    dados = _dados_requisicao(request)
+    erros = {
+        campo: ["Este campo é obrigatório."]
+        for campo in (User.USERNAME_FIELD, "password")
+        if not dados.get(campo)
+    }
+    if erros:
+        return JsonResponse(erros, status=status.HTTP_400_BAD_REQUEST)
+
+    user = await User.objects.filter(
+        **{User.USERNAME_FIELD: dados[User.USERNAME_FIELD]}
+    ).afirst()
+    try:
+        senha_correta = await senhas.verificar_senha(user, dados["password"])
+    except senhas.FilaSenhasCheia:
+        return _resposta_fila_cheia()
+    if not senha_correta or not user.is_active:
+        return JsonResponse(
+            {
+                "detail": str(TokenObtainSerializer.default_error_messages["no_active_account"]),
+                "code": "no_active_account",
+            },
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+    return JsonResponse(await sync_to_async(_emitir_tokens)(user))
+
+
+@csrf_exempt
+@require_POST
+async def register_view(request):
     """
     Registro público de usuário.
     - role = MANAGER → perfil Gestor
     - role = OPERATOR → perfil Motorista
     """
-    serializer = RegisterSerializer(data=request.data)
-    if serializer.is_valid():
-        user = serializer.save()
-        output = UserSerializer(user)
-        return Response(output.data, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    bloqueio = _aplicar_throttles(request, [IPBucketThrottle, AutenticacaoBucketThrottle])
+    if bloqueio:
+        return bloqueio
+
+    serializer = RegisterSerializer(data=_dados_requisicao(request))
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        senha_hash = await senhas.gerar_hash(serializer.validated_data["password"])
+    except senhas.FilaSenhasCheia:
+        return _resposta_fila_cheia()
+    user = await sync_to_async(serializer.save)(password_hash=senha_hash)
+    return JsonResponse(UserSerializer(user).data, status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_POST
+async def batch_view(request):
+    """
+    Várias leituras da API em uma requisição:
+    {"requisicoes": [{"id": "veiculos", "url": "/api/veiculos/?status=ATIVO"}, ...]}
+    Responde {"respostas": [{"id", "status", "corpo"}, ...]} na mesma ordem.
+    """
+    from . import lote
+
+    try:
+        autenticado = await sync_to_async(
+            empresas.JWTEmpresaAuthentication().authenticate
+        )(Request(request))
+    except exceptions.APIException as exc:
+        detalhe = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+        return JsonResponse(detalhe, status=exc.status_code)
+    if autenticado is None:
+        return JsonResponse(
+            {"detail": str(exceptions.NotAuthenticated.default_detail)},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+    user, _token = autenticado
+
+    itens = _dados_requisicao(request).get("requisicoes")
+    if not isinstance(itens, list) or not itens:
+        return JsonResponse(
+            {"requisicoes": ["Informe uma lista de requisições."]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(itens) > lote.max_requisicoes():
+        return JsonResponse(
+            {"requisicoes": [f"No máximo {lote.max_requisicoes()} requisições por lote."]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    respostas = await lote.executar(
+        request, itens, user, paralelo=isinstance(request, ASGIRequest)
+    )
+    return JsonResponse({"respostas": respostas})
 
 
 @api_view(["GET"])
@@ -140,7 +637,380 @@ def dashboard_resumo_view(request):
     return Response(serializer.data)
 
 
-TokenObtainPairView = TokenObtainPairView
-TokenRefreshView = TokenRefreshView
+def _intervalo_datas(request):
+    """Lê `data_inicio`/`data_fim` (AAAA-MM-DD) da query string."""
+    intervalo = {}
+    for param in ("data_inicio", "data_fim"):
+        valor = request.query_params.get(param)
+        if not valor:
+            intervalo[param] = None
+            continue
+        data = parse_date(valor)
+        if data is None:
+            raise ValueError(f"Parâmetro '{param}' inválido. Use o formato AAAA-MM-DD.")
+        intervalo[param] = data
+    return intervalo["data_inicio"], intervalo["data_fim"]
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _filtro_periodo(campo, data_inicio, data_fim) -> Q:
+    """Datas inclusivas como limites de data/hora no fuso atual.
+
+    Ao contrário de `campo__date`, a comparação direta com a coluna usa o índice.
+    """
+    filtro = Q()
+    if data_inicio:
+        filtro &= Q(**{f"{campo}__gte": _inicio_do_dia(data_inicio)})
+    if data_fim:
+        filtro &= Q(**{f"{campo}__lt": _inicio_do_dia(data_fim + timedelta(days=1))})
+    return filtro
+
+
+FAIXAS_KM_ROTAS = [(0, 10), (10, 50), (50, 100), (100, 300), (300, None)]
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def analytics_rotas_view(request):
+    try:
+        data_inicio, data_fim = _intervalo_datas(request)
+        limite = min(int(request.query_params.get("limite", 10)), 100)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    viagens = Viagem.objects.filter(
+        _filtro_periodo("data_hora_inicio", data_inicio, data_fim),
+        origem_local__isnull=False,
+        destino_local__isnull=False,
+    )
+    viagens = viagens.annotate(
+        km=Greatest(F("hodometro_chegada") - F("hodometro_saida"), 0)
+    )
+
+    rotas = (
+        viagens.values(
+            "origem_local",
+            "destino_local",
+            origem_nome=F("origem_local__nome"),
+            destino_nome=F("destino_local__nome"),
+        )
+        .annotate(viagens=Count("id"), km_total=Sum("km"), km_medio=Avg("km"))
+        .order_by("-viagens", "-km_total")
+    )
+
+    faixas = {}
+    for minimo, maximo in FAIXAS_KM_ROTAS:
+        filtro = Q(km__gte=minimo) if maximo is None else Q(km__gte=minimo, km__lt=maximo)
+        rotulo = f"{minimo}+" if maximo is None else f"{minimo}-{maximo}"
+        faixas[rotulo] = Count("id", filter=filtro)
+    totais = viagens.aggregate(total_viagens=Count("id"), **faixas)
+
+    data = {
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "total_viagens": totais.pop("total_viagens"),
+        "total_rotas": rotas.count(),
+        "distribuicao_km": {rotulo: totais[rotulo] for rotulo in faixas},
+        "rotas": [
+            {
+                "origem_id": rota["origem_local"],
+                "origem": rota["origem_nome"],
+                "destino_id": rota["destino_local"],
+                "destino": rota["destino_nome"],
+                "viagens": rota["viagens"],
+                "km_total": rota["km_total"] or 0,
+                "km_medio": round(float(rota["km_medio"] or 0), 2),
+            }
+            for rota in rotas[:limite]
+        ],
+    }
+    return Response(data)
+
+
+ORDENACOES_MOTORISTAS = {
+    "viagens": "viagens",
+    "km": "km_total",
+    "duracao": "duracao_media",
+    "eficiencia": "eficiencia_km_l",
+}
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def analytics_motoristas_view(request):
+    try:
+        data_inicio, data_fim = _intervalo_datas(request)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    ordenar = request.query_params.get("ordenar", "km")
+    if ordenar not in ORDENACOES_MOTORISTAS:
+        return Response(
+            {"detail": f"Ordenação inválida. Use: {', '.join(ORDENACOES_MOTORISTAS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Grupo "relatorios": viagens e abastecimentos (eficiência) invalidam o ranking
+    chave = fleet_cache.chave_versionada(
+        "relatorios", "motoristas", data_inicio, data_fim, ordenar
+    )
+    data = cache.get(chave)
+    if data is None:
+        data = _ranking_motoristas(data_inicio, data_fim, ordenar)
+        cache.set(chave, data, timeout=getattr(settings, "RELATORIOS_CACHE_TIMEOUT", 3600))
+    return Response(data)
+
+
+def _ranking_motoristas(data_inicio, data_fim, ordenar):
+    # A eficiência da viagem é o consumo médio do veículo que ela usou
+    consumo_veiculo = (
+        Abastecimento.objects.filter(veiculo=OuterRef("veiculo"), media_km_l__isnull=False)
+        .order_by()
+        .values("veiculo")
+        .annotate(media=Avg("media_km_l"))
+        .values("media")
+    )
+    campo = ORDENACOES_MOTORISTAS[ordenar]
+    ranking = (
+        Viagem.objects.filter(_filtro_periodo("data_hora_inicio", data_inicio, data_fim))
+        .annotate(consumo_veiculo=Subquery(consumo_veiculo))
+        .values("motorista")
+        .annotate(
+            nome=F("motorista__nome_completo"),
+            viagens=Count("id"),
+            km_total=Coalesce(Sum(Greatest(F("hodometro_chegada") - F("hodometro_saida"), 0)), 0),
+            duracao_media=Avg(
+                ExpressionWrapper(
+                    F("data_hora_fim") - F("data_hora_inicio"),
+                    output_field=DurationField(),
+                )
+            ),
+            eficiencia_km_l=Avg("consumo_veiculo", output_field=FloatField()),
+        )
+        # Decrescente com vazios por último; empates por nome
+        .order_by(F(campo).desc(nulls_last=True), "nome")
+    )
+
+    resultado = []
+    for linha in ranking:
+        duracao, eficiencia = linha["duracao_media"], linha["eficiencia_km_l"]
+        resultado.append(
+            {
+                "motorista_id": linha["motorista"],
+                "nome": linha["nome"],
+                "viagens": linha["viagens"],
+                "km_total": linha["km_total"],
+                "eficiencia_km_l": round(eficiencia, 2) if eficiencia is not None else None,
+                "duracao_media_min": (
+                    round(duracao.total_seconds() / 60, 1) if duracao is not None else None
+                ),
+            }
+        )
+    return resultado
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminOrManager])
+def relatorio_pivot_view(request):
+    """
+    Relatório pivô agregado no banco.
+    - `fonte`: manutencao, abastecimento ou viagem
+    - `dimensoes`: lista separada por vírgula (ex.: marca,mes); a ordem define os subtotais
+    - `medidas`: <soma|media|contagem>:<campo> ou `contagem` (ex.: soma:custo,media:custo)
+    - filtros: data_inicio, data_fim, veiculo, marca, tipo_combustivel, tipo, motorista
+    """
+    from . import relatorios
+
+    try:
+        data_inicio, data_fim = _intervalo_datas(request)
+        consulta = relatorios.interpretar(request.query_params, data_inicio, data_fim)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    chave = fleet_cache.chave_versionada("relatorios", "pivot", consulta.chave_cache())
+    data = cache.get(chave)
+    if data is None:
+        data = relatorios.executar(consulta)
+        cache.set(chave, data, timeout=getattr(settings, "RELATORIOS_CACHE_TIMEOUT", 3600))
+    return Response(data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminOrManager])
+def analytics_custo_km_view(request):
+    """
+    Custo por km mensal por veículo, com a variação dividida em efeito preço e consumo.
+    - filtros: data_inicio, data_fim, veiculo
+    - `posto`: índice de preço de um posto específico (padrão: todos os postos)
+    """
+    from . import custos
+
+    try:
+        data_inicio, data_fim = _intervalo_datas(request)
+        veiculo = request.query_params.get("veiculo")
+        veiculo = int(veiculo) if veiculo else None
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    posto = request.query_params.get("posto") or precos.TODOS_POSTOS
+
+    posto_chave = hashlib.sha1(posto.encode()).hexdigest()
+    chave = fleet_cache.chave_versionada(
+        "custos", "custo_km", data_inicio, data_fim, veiculo, posto_chave
+    )
+    data = cache.get(chave)
+    if data is None:
+        data = custos.custo_por_km(data_inicio, data_fim, veiculo, posto)
+        # Finito: com cache por processo, a versão nova não chega aos outros workers
+        cache.set(chave, data, timeout=getattr(settings, "RELATORIOS_CACHE_TIMEOUT", 3600))
+    return Response(data)
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def autocomplete_view(request):
+    """
+    Sugestões para os seletores de veículo e motorista (índice de prefixos em memória).
+    - `q`: início da placa, marca/modelo, nome, CPF ou CNH
+    - `tipo`: veiculo ou motorista (padrão: ambos); `limite`: até 50 (padrão 10)
+    """
+    consulta = request.query_params.get("q", "")
+    tipo = request.query_params.get("tipo") or None
+    try:
+        limite = min(max(int(request.query_params.get("limite", 10)), 1), 50)
+    except ValueError:
+        return Response({"detail": "Parâmetro 'limite' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+    if tipo not in (None, autocompletar.VEICULO, autocompletar.MOTORISTA):
+        return Response({"detail": "Parâmetro 'tipo' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+    if not autocompletar.texto(consulta):
+        return Response([])
+
+    visiveis = None
+    if getattr(request.user, "role", None) == UserRole.OPERATOR:
+        # O índice é da empresa inteira; o motorista só vê o que a API já lhe mostra
+        visiveis = {
+            autocompletar.VEICULO: set(
+                escopar_queryset(request, Veiculo.objects.all()).values_list("pk", flat=True)
+            ),
+            autocompletar.MOTORISTA: set(
+                escopar_queryset(request, Motorista.objects.all()).values_list("pk", flat=True)
+            ),
+        }
+    return Response(autocompletar.buscar(consulta, limite, tipo, visiveis))
+
+
+SERIALIZERS_FEED = {
+    "veiculo": VeiculoSerializer,
+    "motorista": MotoristaSerializer,
+    "manutencao": ManutencaoSerializer,
+    "abastecimento": AbastecimentoSerializer,
+    "viagem": ViagemSerializer,
+}
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def changes_view(request):
+    """
+    Feed incremental de alterações.
+    - sem `since`: devolve apenas o cursor atual (após uma carga completa)
+    - com `since`: devolve registros salvos e removidos desde o cursor
+    - 410: cursor expirado, o cliente deve refazer a carga completa
+    """
+    try:
+        limite = min(int(request.query_params.get("limit", 500)), 2000)
+    except ValueError:
+        return Response({"detail": "Parâmetro 'limit' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+    since = request.query_params.get("since")
+    if not since:
+        # Alterações ainda dentro da janela chegam depois, talvez repetidas
+        cursor = alteracoes.gerar_cursor(alteracoes.seq_assentada())
+        return Response({"cursor": cursor, "mais": False})
+
+    try:
+        seq, id_entrada, expirado = alteracoes.ler_cursor(since)
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return Response({"detail": "Cursor inválido."}, status=status.HTTP_400_BAD_REQUEST)
+    if expirado:
+        return Response(
+            {"detail": "Cursor expirado. Refaça a sincronização completa."},
+            status=status.HTTP_410_GONE,
+        )
+
+    entradas = escopar_remocoes(
+        request,
+        AlteracaoRegistro.objects.using(empresas.banco()).filter(
+            Q(seq__gt=seq) | Q(seq=seq, id__gt=id_entrada),
+            seq__lte=alteracoes.seq_assentada(),
+        ),
+    )
+    entradas = list(entradas.order_by("seq", "id")[: limite + 1])
+    mais = len(entradas) > limite
+    entradas = entradas[:limite]
+
+    salvos: dict[str, list[int]] = {nome: [] for nome in SERIALIZERS_FEED}
+    resultado = {nome: {"salvos": [], "removidos": []} for nome in SERIALIZERS_FEED}
+    for entrada in entradas:
+        if entrada.operacao == OperacaoAlteracaoChoices.REMOVIDO:
+            resultado[entrada.modelo]["removidos"].append(entrada.objeto_id)
+        else:
+            salvos[entrada.modelo].append(entrada.objeto_id)
+
+    for modelo, nome in alteracoes.MODELOS_FEED.items():
+        if salvos[nome]:
+            objetos = escopar_queryset(request, modelo.objects.filter(pk__in=salvos[nome]))
+            resultado[nome]["salvos"] = SERIALIZERS_FEED[nome](objetos, many=True).data
+
+    if entradas:
+        seq, id_entrada = entradas[-1].seq, entradas[-1].id
+    return Response(
+        {"cursor": alteracoes.gerar_cursor(seq, id_entrada), "mais": mais, **resultado}
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAdmin])
+def perfis_view(request):
+    """Perfis gravados pelo PerfiladorMiddleware, do mais recente ao mais antigo."""
+    from . import perfilador
+
+    return Response(perfilador.listar())
+
+
+@api_view(["GET"])
+@permission_classes([IsAdmin])
+def perfil_detalhe_view(request, id_perfil):
+    """
+    Resumo completo de um perfil (funções mais caras e linha do tempo SQL).
+    - `formato=prof`: estatísticas do cProfile; `formato=folded`: pilhas para flamegraph
+    """
+    from . import perfilador
+
+    formato = request.query_params.get("formato", "json")
+    arquivo = perfilador.caminho(id_perfil, f".{formato}")
+    if arquivo is None:
+        return Response({"detail": "Perfil não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+    if formato == "json":
+        with open(arquivo, encoding="utf-8") as conteudo:
+            return Response(json.load(conteudo))
+    return FileResponse(open(arquivo, "rb"), as_attachment=True, filename=arquivo.name)
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdmin])
+def consultas_lentas_view(request):
+    """
+    Consultas acima de CONSULTAS_LENTAS_LIMIAR_MS, da mais recente à mais antiga,
+    com SQL normalizado, chamador, linhas e plano. DELETE limpa o buffer.
+    """
+    if request.method == "DELETE":
+        consultas_lentas.obter_store().limpar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(
+        {"limiar_ms": consultas_lentas.limiar_ms(), "consultas": consultas_lentas.listar()}
+    )
 
 
+TokenRefreshView = jwt_views.TokenRefreshView